@@ -1,5 +1,11 @@
 from .base_agent import BaseReActAgent
 from .react_agent import AdvancedReactAgent
 from .verifier_agent import VerifierAgent
+from .iteration_controller import AdaptiveIterationController
+from .conversation import Conversation
+from .model_router import ModelRouter
+from .prefetch import SpeculativePrefetcher
+from .run_context import RunContext
+from .pre_verifier import LocalPreVerifier
 
-__all__ = ['BaseReActAgent', 'AdvancedReactAgent', 'VerifierAgent']
\ No newline at end of file
+__all__ = ['BaseReActAgent', 'AdvancedReactAgent', 'VerifierAgent', 'AdaptiveIterationController', 'Conversation', 'ModelRouter', 'SpeculativePrefetcher', 'RunContext', 'LocalPreVerifier']
\ No newline at end of file
@@ -3,10 +3,13 @@ import json
 import re
 import logging
 import os
+import time
 from pathlib import Path
 
 from utils.prompt_manager import PromptManager
 from utils.config import DEFAULT_CONFIG
+from agents.model_router import ModelRouter
+from agents.conversation import Conversation
 
 
 logger = logging.getLogger(__name__)
@@ -19,42 +22,80 @@ class BaseReActAgent:
     Just the basic reasoning loop.
     """
     
-    def __init__(self, api_key, tools, config=None, prompt_manager=None):
+    def __init__(self, api_key, tools, config=None, prompt_manager=None, router=None, scheduler=None):
         self.api_key = api_key
         self.tools = {tool.name: tool for tool in tools}
         self.config = config or DEFAULT_CONFIG.copy()
         self.prompt_manager = prompt_manager or PromptManager()
         
-        # Setting up logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        # Routing each step type to a model (shared with the verifier when passed in)
+        if router is None and self.config.get("model_routing_enabled", False):
+            router = ModelRouter.from_config(self.config)
+        self.router = router
+        # Shared RequestScheduler pacing all OpenRouter calls (None = call directly)
+        self.scheduler = scheduler
+    
+    def _post_completion(self, model, messages, step_type="synthesis", deadline=None):
+        """Sending one chat completion request (through the scheduler if set) and returning the body."""
+        if self.scheduler:
+            return self.scheduler.submit(
+                "openrouter",
+                lambda: self._send_completion(model, messages, deadline),
+                priority=step_type,
+                # Not waiting in the queue past the query deadline
+                timeout=deadline.remaining() if deadline else None
+            )
+        return self._send_completion(model, messages, deadline)
     
-    def _call_llm(self, prompt):
-        """Calling the LLM through OpenRouter and safely parsing JSON output (single or multi-block)."""
-        url = "https://openrouter.ai/api/v1/chat/completions"
+    def _send_completion(self, model, messages, deadline=None):
+        url = self.config.get("openrouter_url", "https://openrouter.ai/api/v1/chat/completions")
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
         data = {
-            "model": self.config["model"],
-            "messages": [{"role": "user", "content": prompt}],
+            "model": model,
+            "messages": messages,
             "temperature": self.config.get("temperature", 0.3),
+            # Asking OpenRouter to include token accounting in the response
+            "usage": {"include": True},
         }
 
+        timeout = self.config.get("timeout", 45)
+        if deadline:
+            timeout = deadline.timeout(timeout, "LLM call")
+        response = requests.post(
+            url,
+            json=data,
+            headers=headers,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def _call_llm(self, prompt=None, messages=None, step_type="synthesis", deadline=None):
+        """
+        Calling the LLM through OpenRouter and safely parsing JSON output (single or multi-block).
+        Accepts a single prompt string or a full message list; the parsed step
+        carries a 'usage' entry with token counts (including provider-cached tokens).
+        With a router, the model is chosen by step_type and falls back on timeouts/rate limits.
+        With a Deadline, each request's timeout is capped by the query's remaining budget.
+        """
+        messages = messages or [{"role": "user", "content": prompt}]
+
         try:
-            response = requests.post(
-                url,
-                json=data,
-                headers=headers,
-                timeout=self.config.get("timeout", 45)
-            )
-            response.raise_for_status()
+            start_time = time.time()
+            if self.router:
+                body, model = self.router.call(step_type, lambda m: self._post_completion(m, messages, step_type, deadline))
+            else:
+                model = self.config["model"]
+                body = self._post_completion(model, messages, step_type, deadline)
 
-            content = response.json()["choices"][0]["message"]["content"].strip()
+            usage = self._usage_summary(body.get("usage"), time.time() - start_time)
+            usage["model"] = model
+            usage["step_type"] = step_type
+            content = body["choices"][0]["message"]["content"].strip()
             logger.debug(f"🧾 Raw LLM output:\n{content[:800]}")
 
             # Cleaning common artifacts (</think>, etc.)
@@ -81,7 +122,9 @@ class BaseReActAgent:
             if parsed_blocks:
                 if len(parsed_blocks) > 1:
                     logger.info(f"Parsed {len(parsed_blocks)} reasoning blocks — using last as final.")
-                return parsed_blocks[-1]  # returning last reasoning step
+                step = parsed_blocks[-1]  # returning last reasoning step
+                step["usage"] = usage
+                return step
 
             # Fallback: no JSON at all
             logger.warning(f"⚠️ Model returned non-JSON output:\n{content[:400]}")
@@ -90,7 +133,8 @@ class BaseReActAgent:
                 "action": "none",
                 "action_input": "",
                 "observation": "",
-                "final_answer": content or "No output from model"
+                "final_answer": content or "No output from model",
+                "usage": usage
             }
 
         except json.JSONDecodeError as e:
@@ -113,12 +157,39 @@ class BaseReActAgent:
                 "final_answer": ""
             } 
     
-    def _format_tools(self):
-        """Formatting tool descriptions for prompt"""
-        tool_list = []
-        for tool in self.tools.values():
-            tool_list.append(f"- {tool.name}: {tool.description}")
-        return "\n".join(tool_list)
+    @staticmethod
+    def _usage_summary(usage, latency):
+        """Normalizing provider usage, including prompt tokens served from the provider cache."""
+        usage = usage or {}
+        details = usage.get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens")
+        if cached is None:
+            cached = usage.get("cache_read_input_tokens", 0)
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+            "cached_tokens": cached or 0,
+            "cost": usage.get("cost"),
+            "latency": round(latency, 3),
+        }
+    
+    @staticmethod
+    def _sum_usage(steps):
+        """Aggregating per-step usage for the run result."""
+        totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "latency": 0.0}
+        for step in steps:
+            usage = step.get("usage")
+            if not usage:
+                continue
+            totals["calls"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                totals[key] += usage.get(key) or 0
+            totals["latency"] = round(totals["latency"] + (usage.get("latency") or 0), 3)
+        totals["cache_hit_rate"] = (
+            round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+        )
+        return totals
     
     def run(self, query, max_iterations=None):
         """
@@ -128,19 +199,28 @@ class BaseReActAgent:
         max_iter = max_iterations or self.config["max_iterations"]
         steps = []
         
-        # Building initial prompt
-        tools_str = self._format_tools()
-        prompt = self.prompt_manager.get_prompt(
-            "base",
-            tools=tools_str,
-            query=query
-        )
+        # Building the conversation (static system prefix, then the question),
+        # or the legacy single growing prompt in "string" mode
+        if self.config.get("conversation_mode", "messages") == "string":
+            conversation = Conversation.from_prompt(
+                self.prompt_manager.compose_prompt(query=query, tools=self.tools, prompt_type="base")
+            )
+        else:
+            conversation = Conversation.from_messages(self.prompt_manager.compose_messages(
+                query=query,
+                tools=self.tools,
+                prompt_type="base",
+                cache_control=self.config.get("prompt_cache_control", False)
+            ))
         
         for iteration in range(1, max_iter + 1):
             logger.info(f"\n{'='*50}\nIteration {iteration}\n{'='*50}")
             
-            # Calling LLM
-            result = self._call_llm(prompt)
+            # Calling LLM with the history so far, tracking what each iteration sends
+            payload = conversation.payload()
+            result = self._call_llm(messages=payload)
+            conversation.record_sent(iteration, payload, result.get("usage"))
+            conversation.add_assistant(result)
             
             thought = result.get("thought", "")
             action = result.get("action", "none")
@@ -160,6 +240,17 @@ class BaseReActAgent:
                 tool = self.tools.get(action)
                 if tool:
                     try:
+                        # Structured inputs (search filters) go to tools that accept them as-is
+                        structured = None
+                        if isinstance(action_input, str) and action_input.strip().startswith("{"):
+                            try:
+                                action_input = json.loads(action_input)
+                            except json.JSONDecodeError:
+                                pass
+                        if isinstance(action_input, dict) and getattr(tool, "structured_input", False):
+                            structured = dict(action_input)
+                            action_input = structured.get("query", "")
+                        
                         # Normalizing input
                         if isinstance(action_input, list):
                             action_input = " ".join(map(str, action_input))
@@ -173,7 +264,11 @@ class BaseReActAgent:
                             logger.warning(f"⚠️ Empty action_input detected, using original query as fallback")
                             action_input_str = query
                         
-                        observation = tool.execute(action_input_str)
+                        tool_input = action_input_str
+                        if structured and any(k != "query" for k in structured):
+                            tool_input = {**structured, "query": action_input_str}
+                        
+                        observation = tool.execute(tool_input)
                         logger.info(f"👁 Observation (first 200 chars): {observation[:200]}...")
                         
                     except Exception as e:
@@ -183,13 +278,12 @@ class BaseReActAgent:
                     observation = f"Unknown tool: {action}"
                     logger.warning(f"⚠️ {observation}")
                 
-                # Updating result with ACTUAL observation from tool
-                result["observation"] = observation
-                
-                # Adding observation to prompt for next iteration
-                prompt += f"\n\nObservation: {observation}\nContinue reasoning and respond in JSON format."
+                # Adding observation for the next iteration
+                conversation.add_observation(observation)
             
-            # Adding complete step (with real observation) to history
+            # Adding complete step (with the ACTUAL tool observation, empty without a tool) to history;
+            # the answer cache reads the cited sources from these
+            result["observation"] = observation
             steps.append(result)
             
             # Checking if we have final answer
@@ -199,7 +293,9 @@ class BaseReActAgent:
                     "answer": answer,
                     "steps": steps,
                     "iterations": iteration,
-                    "success": True
+                    "success": True,
+                    "usage": self._sum_usage(steps),
+                    "transport": conversation.report()
                 }
         
         # Max iterations reached
@@ -209,5 +305,7 @@ class BaseReActAgent:
             "answer": fallback,
             "steps": steps,
             "iterations": max_iter,
-            "success": False
+            "success": False,
+            "usage": self._sum_usage(steps),
+            "transport": conversation.report()
         }
\ No newline at end of file
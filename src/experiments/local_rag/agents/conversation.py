@@ -0,0 +1,103 @@
+import json
+import logging
+
+from utils.text import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Step fields echoed back as the assistant turn (observation/usage come from us, not the model)
+ASSISTANT_FIELDS = ("thought", "action", "action_input", "final_answer")
+
+
+class Conversation:
+    """
+    Message history for one agent run.
+
+    'messages' mode keeps a structured list (system, question, assistant step,
+    observation, ...) that is sent natively and only grows at the end.
+    'string' mode reproduces the legacy single growing user prompt for compatibility.
+    """
+
+    def __init__(self, messages=None, prompt=None, mode="messages"):
+        if mode not in ("messages", "string"):
+            raise ValueError(f"Unknown conversation mode '{mode}'. Valid: messages, string")
+        self.mode = mode
+        self.messages = list(messages or [])
+        self.prompt = prompt or ""
+        self.transport = []
+
+    @classmethod
+    def from_messages(cls, messages):
+        return cls(messages=messages, mode="messages")
+
+    @classmethod
+    def from_prompt(cls, prompt):
+        return cls(prompt=prompt, mode="string")
+
+    def add_context(self, text):
+        """Appending extra context to the question (e.g. recalled memory)"""
+        if self.mode == "string":
+            self.prompt += f"\n\n{text}"
+        else:
+            self.messages[-1]["content"] += f"\n\n{text}"
+
+    def add_assistant(self, step):
+        """Recording the model's step as an assistant turn"""
+        if self.mode == "string":
+            return
+        content = json.dumps({k: step.get(k, "") for k in ASSISTANT_FIELDS}, ensure_ascii=False)
+        self.messages.append({"role": "assistant", "content": content})
+
+    def add_observation(self, observation):
+        """Adding a tool observation (a user turn, since tools aren't native function calls)"""
+        if self.mode == "string":
+            self.prompt += f"\n\nObservation: {observation}\nContinue reasoning."
+        else:
+            self.messages.append({"role": "user", "content": f"Observation: {observation}\nContinue reasoning."})
+
+    def add_feedback(self, suggestion):
+        """Adding verifier feedback for the next iteration"""
+        if self.mode == "string":
+            self.prompt += f"\n\nVerifier Feedback: {suggestion}\nPlease refine your reasoning."
+        else:
+            self.messages.append({"role": "user", "content": f"Verifier Feedback: {suggestion}\nPlease refine your reasoning."})
+
+    def add_instruction(self, text):
+        """Adding a runtime instruction for the next iteration (e.g. the deadline notice)"""
+        if self.mode == "string":
+            self.prompt += f"\n\n{text}"
+        else:
+            self.messages.append({"role": "user", "content": text})
+
+    def payload(self):
+        """Messages to send for the next LLM call"""
+        if self.mode == "string":
+            return [{"role": "user", "content": self.prompt}]
+        return self.messages
+
+    def record_sent(self, iteration, payload, usage=None):
+        """Tracking bytes and tokens sent for an iteration"""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        text = "".join(m["content"] if isinstance(m["content"], str) else json.dumps(m["content"])
+                       for m in payload)
+        usage = usage or {}
+        record = {
+            "iteration": iteration,
+            "messages": len(payload),
+            "bytes_sent": len(body),
+            "estimated_tokens": estimate_tokens(text),
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "cached_tokens": usage.get("cached_tokens", 0),
+        }
+        self.transport.append(record)
+        logger.debug(f"📤 Iteration {iteration}: {record['bytes_sent']} bytes in {record['messages']} messages")
+        return record
+
+    def report(self):
+        """Summarizing transport metrics for the run result"""
+        return {
+            "mode": self.mode,
+            "total_bytes_sent": sum(r["bytes_sent"] for r in self.transport),
+            "total_estimated_tokens": sum(r["estimated_tokens"] for r in self.transport),
+            "per_iteration": self.transport,
+        }
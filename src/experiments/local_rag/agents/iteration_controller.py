@@ -0,0 +1,173 @@
+import re
+import time
+import logging
+
+import numpy as np
+
+from utils.embeddings import embed_texts
+from utils.text import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+class AdaptiveIterationController:
+    """
+    Decides per iteration whether to verify, continue or stop the agent loop.
+    One controller is created per run; every decision is recorded for the result.
+    """
+
+    def __init__(
+        self,
+        confidence_threshold: float = 0.7,
+        convergence_threshold: float = 0.92,
+        accept_uncertain: bool = True,
+        verify_tool_steps: bool = False,
+        max_tokens: int = None,
+        embed_fn=None,
+        deadline=None
+    ):
+        self.confidence_threshold = confidence_threshold
+        self.convergence_threshold = convergence_threshold
+        self.accept_uncertain = accept_uncertain
+        self.verify_tool_steps = verify_tool_steps
+        self.max_tokens = max_tokens
+        self.embed_fn = embed_fn
+        # Query-wide Deadline shared with the LLM calls and tools of the run; it is the
+        # only time budget (query_time_budget is its default, so --deadline overrides it)
+        self.deadline = deadline
+
+        self.start_time = time.monotonic()
+        self.tokens_used = 0
+        self.previous_answer = ""
+        self.decisions = []
+        self.stop_reason = None
+
+    @classmethod
+    def from_config(cls, config, embed_fn=None, deadline=None):
+        """Building a controller from DEFAULT_CONFIG-style settings"""
+        return cls(
+            confidence_threshold=config.get("stop_confidence_threshold", 0.7),
+            convergence_threshold=config.get("stop_convergence_threshold", 0.92),
+            accept_uncertain=config.get("stop_accept_uncertain", True),
+            verify_tool_steps=config.get("verify_tool_steps", False),
+            max_tokens=config.get("query_token_budget"),
+            embed_fn=embed_fn,
+            deadline=deadline,
+        )
+
+    def elapsed(self):
+        return time.monotonic() - self.start_time
+
+    def record_tokens(self, *texts, usage=None, estimated=0):
+        """Adding token usage, preferring the provider's counts when available"""
+        if usage and usage.get("total_tokens"):
+            self.tokens_used += int(usage["total_tokens"])
+        else:
+            self.tokens_used += estimated + sum(estimate_tokens(t) for t in texts if t)
+
+    def budget_exhausted(self, iteration):
+        """Checking the query deadline and token budget before starting an iteration"""
+        if self.deadline is not None and self.deadline.expired():
+            self._decide(iteration, "stop", "deadline")
+            return True
+        if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
+            self._decide(iteration, "stop", "token_budget")
+            return True
+        return False
+
+    def should_verify(self, iteration, action, answer):
+        """Skipping verification on pure tool-call steps"""
+        is_tool_step = action and action != "none" and not answer
+        if is_tool_step and not self.verify_tool_steps:
+            self._decide(iteration, "skip_verification", "tool_step")
+            return False
+        return True
+
+    def should_stop(self, iteration, action, answer, verification):
+        """
+        Deciding whether the loop can end after this iteration
+
+        Returns:
+            True to stop with the current answer
+        """
+        if not answer or (action and action != "none"):
+            self._decide(iteration, "continue", "no_final_answer")
+            return False
+
+        converged = self._converged(answer)
+        self.previous_answer = answer
+
+        if verification is None:
+            self._decide(iteration, "stop", "final_answer")
+            return True
+
+        verdict = verification.get("verdict")
+        try:
+            confidence = float(verification.get("confidence", 0) or 0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+
+        if verdict == "pass" and confidence >= self.confidence_threshold:
+            reason = "verified"
+        elif verdict == "uncertain" and self.accept_uncertain:
+            # Timeouts and parse errors won't improve by asking again
+            reason = "verifier_uncertain"
+        elif converged:
+            reason = "converged"
+        else:
+            self._decide(iteration, "continue", f"verdict_{verdict}", confidence=confidence)
+            return False
+
+        self._decide(iteration, "stop", reason, confidence=confidence)
+        return True
+
+    def _converged(self, answer):
+        """Comparing the new answer with the previous iteration's answer"""
+        if not self.previous_answer:
+            return False
+
+        if self.embed_fn is not None:
+            try:
+                vectors = embed_texts(self.embed_fn, [self.previous_answer, answer])
+                similarity = float(np.dot(vectors[0], vectors[1]))
+            except Exception as e:
+                logger.warning(f"Embedding answers failed, falling back to word overlap: {e}")
+                similarity = self._word_overlap(self.previous_answer, answer)
+        else:
+            similarity = self._word_overlap(self.previous_answer, answer)
+
+        logger.info(f"🔁 Answer similarity to previous iteration: {similarity:.3f}")
+        return similarity >= self.convergence_threshold
+
+    @staticmethod
+    def _word_overlap(a, b):
+        words_a = set(_WORD.findall(a.lower()))
+        words_b = set(_WORD.findall(b.lower()))
+        if not words_a or not words_b:
+            return 0.0
+        return len(words_a & words_b) / len(words_a | words_b)
+
+    def _decide(self, iteration, decision, reason, **extra):
+        record = {
+            "iteration": iteration,
+            "decision": decision,
+            "reason": reason,
+            "elapsed": round(self.elapsed(), 3),
+            "tokens_used": self.tokens_used,
+            **extra,
+        }
+        self.decisions.append(record)
+        if decision == "stop":
+            self.stop_reason = reason
+            logger.info(f"🛑 Stopping: {reason}")
+
+    def report(self):
+        """Summarizing decisions for the run result"""
+        return {
+            "stop_reason": self.stop_reason or "max_iterations",
+            "elapsed": round(self.elapsed(), 3),
+            "tokens_used": self.tokens_used,
+            "decisions": self.decisions,
+        }
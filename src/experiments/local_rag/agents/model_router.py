@@ -0,0 +1,159 @@
+import time
+import threading
+import logging
+from typing import Dict, List, Callable, Any, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying on another model
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class ModelRouter:
+    """
+    Chooses a model per step type (tool_selection, synthesis, verification)
+    and falls back to the next candidate on timeouts and rate limits.
+    Per-model latency/success statistics are used to demote unhealthy models.
+    """
+
+    STEP_TYPES = ("tool_selection", "synthesis", "verification")
+
+    def __init__(
+        self,
+        routes: Dict[str, List[str]],
+        default_model: str = None,
+        cooldown: float = 30.0,
+        min_samples: int = 3,
+        min_success_rate: float = 0.5,
+        ewma_alpha: float = 0.3
+    ):
+        self.routes = {k: list(v) for k, v in routes.items()}
+        self.default_model = default_model
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.ewma_alpha = ewma_alpha
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._cooldown_until: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """Building a router from DEFAULT_CONFIG-style settings"""
+        routes = config.get("model_routes") or {}
+        return cls(
+            routes=routes,
+            default_model=config.get("model"),
+            cooldown=config.get("model_cooldown", 30.0),
+        )
+
+    def candidates(self, step_type: str) -> List[str]:
+        """Models to try for a step type, healthy ones first in configured order"""
+        configured = self.routes.get(step_type) or [self.default_model]
+        configured = [m for m in configured if m]
+        now = time.monotonic()
+
+        with self._lock:
+            healthy, demoted = [], []
+            for model in configured:
+                stats = self._stats.get(model)
+                cooling = self._cooldown_until.get(model, 0) > now
+                unreliable = (
+                    stats is not None
+                    and stats["calls"] >= self.min_samples
+                    and stats["successes"] / stats["calls"] < self.min_success_rate
+                )
+                (demoted if cooling or unreliable else healthy).append(model)
+
+            # Least-bad demoted models are still tried as a last resort
+            demoted.sort(key=lambda m: self._cooldown_until.get(m, 0))
+
+        return healthy + demoted
+
+    def call(self, step_type: str, send: Callable[[str], Any]) -> Tuple[Any, str]:
+        """
+        Calling send(model) with fallback across the step type's candidates
+
+        Returns:
+            (send result, model used)
+        """
+        last_error = None
+        for model in self.candidates(step_type):
+            start_time = time.monotonic()
+            try:
+                result = send(model)
+            except Exception as e:
+                latency = time.monotonic() - start_time
+                kind = self._classify(e)
+                self.record(model, ok=False, latency=latency, error=kind, retry_after=self._retry_after(e))
+                if kind is None:
+                    raise
+                logger.warning(f"🔀 [{step_type}] {model} failed ({kind}), trying next model")
+                last_error = e
+                continue
+
+            self.record(model, ok=True, latency=time.monotonic() - start_time)
+            return result, model
+
+        raise last_error or RuntimeError(f"No model configured for step type '{step_type}'")
+
+    @staticmethod
+    def _classify(error):
+        """Returning the retryable error kind, or None for errors another model won't fix"""
+        if isinstance(error, requests.Timeout):
+            return "timeout"
+        if isinstance(error, requests.ConnectionError):
+            return "connection"
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status == 429:
+                return "rate_limit"
+            if status in RETRYABLE_STATUS:
+                return f"http_{status}"
+        return None
+
+    @staticmethod
+    def _retry_after(error):
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def record(self, model, ok, latency, error=None, retry_after=None):
+        """Recording the outcome of a call to a model"""
+        with self._lock:
+            stats = self._stats.setdefault(model, {
+                "calls": 0, "successes": 0, "failures": 0, "errors": {}, "latency_ewma": None
+            })
+            stats["calls"] += 1
+            if ok:
+                stats["successes"] += 1
+                previous = stats["latency_ewma"]
+                stats["latency_ewma"] = latency if previous is None else (
+                    self.ewma_alpha * latency + (1 - self.ewma_alpha) * previous
+                )
+            else:
+                stats["failures"] += 1
+                key = error or "other"
+                stats["errors"][key] = stats["errors"].get(key, 0) + 1
+                if error in ("rate_limit", "timeout"):
+                    self._cooldown_until[model] = time.monotonic() + (retry_after or self.cooldown)
+
+    def get_stats(self):
+        """Getting per-model latency and success statistics"""
+        with self._lock:
+            return {
+                model: {
+                    **stats,
+                    "errors": dict(stats["errors"]),
+                    "success_rate": round(stats["successes"] / stats["calls"], 3) if stats["calls"] else None,
+                    "latency_ewma": round(stats["latency_ewma"], 3) if stats["latency_ewma"] is not None else None,
+                }
+                for model, stats in self._stats.items()
+            }
@@ -0,0 +1,175 @@
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.embeddings import embed_texts
+from utils.text import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Document headers and separators added by the tools (not evidence themselves)
+_HEADER = re.compile(r"^\s*=*\s*\[[^\]\n]*\](?: From [^\n]*:)?\s*$|^\s*=+\s*$", re.MULTILINE)
+_SOURCE = re.compile(r"Source: ([^\],\n]+)|From (\S+):")
+_CITATION = re.compile(r"\[(?:Document )?\d+\]|https?://\S+|\b[\w-]+\.pdf\b", re.IGNORECASE)
+# Outputs that are errors rather than answers
+_ERROR_PREFIXES = ("error", "tool error", "json error", "error performing", "error searching")
+# Honest "not found" answers are left to the LLM verifier
+_NON_ANSWERS = ("i couldn't find", "i could not find", "no relevant documents", "i don't know", "i do not know")
+
+
+class LocalPreVerifier:
+    """
+    CPU-only groundedness check run before the LLM verifier.
+
+    Every answer sentence is compared with the evidence the run has gathered (tool
+    observations) using the already loaded sentence-transformer; together with the
+    answer's relevance to the question, citation presence and structural checks this
+    decides the obvious cases locally. Only "escalate" verdicts need the remote verifier.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        support_threshold: float = 0.55,
+        pass_share: float = 0.75,
+        fail_share: float = 0.2,
+        min_relevance: float = 0.3,
+        fail_relevance: float = 0.15,
+        require_citation: bool = False,
+        max_evidence_sentences: int = 300,
+        min_answer_words: int = 8
+    ):
+        self.embed_fn = embed_fn
+        self.support_threshold = support_threshold
+        self.pass_share = pass_share
+        self.fail_share = fail_share
+        self.min_relevance = min_relevance
+        self.fail_relevance = fail_relevance
+        self.require_citation = require_citation
+        self.max_evidence_sentences = max_evidence_sentences
+        self.min_answer_words = min_answer_words
+        self._lock = threading.Lock()
+        self.stats = {"checks": 0, "pass": 0, "fail": 0, "escalate": 0, "seconds": 0.0}
+
+    @classmethod
+    def from_config(cls, config, embed_fn):
+        """Building a pre-verifier from DEFAULT_CONFIG-style settings"""
+        return cls(
+            embed_fn,
+            support_threshold=config.get("pre_verifier_support_threshold", 0.55),
+            pass_share=config.get("pre_verifier_pass_share", 0.75),
+            fail_share=config.get("pre_verifier_fail_share", 0.2),
+            min_relevance=config.get("pre_verifier_min_relevance", 0.3),
+            fail_relevance=config.get("pre_verifier_fail_relevance", 0.15),
+            require_citation=config.get("pre_verifier_require_citation", False),
+            max_evidence_sentences=config.get("pre_verifier_max_evidence", 300),
+        )
+
+    def check(self, query: str, agent_answer: str, observation: str = "",
+              evidence: Optional[List[str]] = None) -> Dict:
+        """
+        Scoring an answer against the run's evidence
+
+        Args:
+            query: Original question
+            agent_answer: Final answer (or thought) being verified
+            observation: Tool output of the current step
+            evidence: Observations of all steps so far (the current one may be included)
+
+        Returns:
+            Verifier-style dict (verdict pass | fail | escalate, reason, suggestion,
+            confidence) with source "local" and the underlying scores
+        """
+        started = time.monotonic()
+        result = self._decide(query, agent_answer or "", observation or "", evidence or [])
+        result["source"] = "local"
+        with self._lock:
+            self.stats["checks"] += 1
+            self.stats[result["verdict"]] += 1
+            self.stats["seconds"] += time.monotonic() - started
+        logger.info(f"🧪 [PreVerifier] {result['verdict']}: {result['reason']}")
+        return result
+
+    def _decide(self, query, answer, observation, evidence):
+        text = answer.strip()
+        lowered = text.lower()
+        if not text:
+            return self._verdict("fail", "Empty answer", "Answer the question from the observations.")
+        if lowered.startswith(_ERROR_PREFIXES):
+            return self._verdict("fail", "Answer is an error message",
+                                 "Retry the search or answer from the observations gathered so far.")
+        if any(marker in lowered for marker in _NON_ANSWERS):
+            return self._verdict("escalate", "Answer reports missing information")
+
+        texts = [t for t in dict.fromkeys([*evidence, observation]) if t]
+        evidence_sentences = [s for t in texts for s in split_sentences(_HEADER.sub(" ", t))]
+        evidence_sentences = evidence_sentences[-self.max_evidence_sentences:]
+        answer_sentences = split_sentences(text) or [text]
+        if not evidence_sentences:
+            return self._verdict("escalate", "No tool evidence to ground the answer in")
+
+        vectors = embed_texts(self.embed_fn, [query] + answer_sentences + evidence_sentences)
+        query_vec = vectors[0]
+        answer_vecs = vectors[1:1 + len(answer_sentences)]
+        evidence_vecs = vectors[1 + len(answer_sentences):]
+
+        support = (answer_vecs @ evidence_vecs.T).max(axis=1)
+        supported_share = float((support >= self.support_threshold).mean())
+        answer_vec = answer_vecs.mean(axis=0)
+        relevance = float(answer_vec @ query_vec / (np.linalg.norm(answer_vec) or 1.0))
+        cited = self._cited(text, texts)
+        scores = {
+            "supported_share": round(supported_share, 3),
+            "mean_support": round(float(support.mean()), 3),
+            "relevance": round(relevance, 3),
+            "cited": cited,
+            "answer_sentences": len(answer_sentences),
+            "evidence_sentences": len(evidence_sentences),
+        }
+
+        if relevance < self.fail_relevance:
+            return self._verdict("fail", f"Answer does not address the question (relevance {relevance:.2f})",
+                                 "Answer the original question directly.", scores=scores)
+        if supported_share <= self.fail_share:
+            return self._verdict("fail", f"Only {supported_share:.0%} of the answer is supported by the observations",
+                                 "Base the answer on the retrieved documents or search again.",
+                                 confidence=1.0 - supported_share, scores=scores)
+        if len(text.split()) < self.min_answer_words:
+            return self._verdict("escalate", "Answer too short to judge locally", scores=scores)
+        if (supported_share >= self.pass_share and relevance >= self.min_relevance
+                and (cited or not self.require_citation)):
+            return self._verdict("pass", f"{supported_share:.0%} of the answer is supported by the observations",
+                                 confidence=supported_share, scores=scores)
+        return self._verdict("escalate", f"Ambiguous grounding ({supported_share:.0%} supported)", scores=scores)
+
+    @staticmethod
+    def _cited(answer, texts):
+        """Whether the answer names a source, a document number or a URL from the evidence"""
+        sources = {name.strip() for t in texts for match in _SOURCE.findall(t) for name in match if name}
+        names = {s for source in sources for s in (source, source.rsplit(".", 1)[0]) if len(s) > 3}
+        lowered = answer.lower()
+        return any(name.lower() in lowered for name in names) or bool(_CITATION.search(answer))
+
+    @staticmethod
+    def _verdict(verdict, reason, suggestion="", confidence=None, scores=None):
+        if confidence is None:
+            confidence = 0.9 if verdict == "fail" else 0.0
+        return {
+            "verdict": verdict,
+            "reason": reason,
+            "suggestion": suggestion,
+            "confidence": round(confidence, 3),
+            "scores": scores or {},
+        }
+
+    def get_stats(self):
+        """Getting verdict counts and the share of checks escalated to the LLM verifier"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["escalation_rate"] = round(stats["escalate"] / stats["checks"], 3) if stats["checks"] else 0.0
+        stats["seconds"] = round(stats["seconds"], 3)
+        return stats
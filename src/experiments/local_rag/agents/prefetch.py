@@ -0,0 +1,156 @@
+import re
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text):
+    return set(_WORD.findall((text or "").lower()))
+
+
+class Speculation:
+    """Prefetched tool calls for one query, keyed by action name."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.futures: Dict[str, tuple] = {}
+        self.outcomes: Dict[str, str] = {}
+
+
+class SpeculativePrefetcher:
+    """
+    Runs likely first tool calls on the raw query while the first LLM call is in flight.
+
+    The prefetched observation is served only if the agent picks the same action with
+    an input close enough to the raw query; otherwise it is discarded and the tool runs
+    normally. Hit/miss counters are kept across runs.
+    """
+
+    def __init__(self, tools: Dict, actions: Iterable[str] = ("vectorstore_search",),
+                 match_threshold: float = 0.8, max_workers: int = 2):
+        self.tools = tools
+        self.actions = [a for a in actions if a in tools]
+        self.match_threshold = match_threshold
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "hits": 0, "misses": 0, "unused": 0, "errors": 0, "saved_seconds": 0.0}
+
+    @classmethod
+    def from_config(cls, tools, config):
+        """Building a prefetcher from DEFAULT_CONFIG-style settings"""
+        return cls(
+            tools,
+            actions=config.get("prefetch_actions", ["vectorstore_search"]),
+            match_threshold=config.get("prefetch_match_threshold", 0.8),
+            max_workers=config.get("prefetch_workers", 2),
+        )
+
+    def start(self, query: str, deadline=None, web_index=None) -> Speculation:
+        """
+        Submitting the configured tools on the raw query in the background
+
+        The run's Deadline and WebSessionIndex are passed to tools that take them,
+        exactly as the agent would, so a prefetched result equals the normal call.
+        """
+        speculation = Speculation(query)
+        for action in self.actions:
+            tool = self.tools[action]
+            kwargs = {"deadline": deadline} if deadline is not None and getattr(tool, "accepts_deadline", False) else {}
+            if web_index is not None and getattr(tool, "uses_web_index", False):
+                kwargs["web_index"] = web_index
+            speculation.futures[action] = (self.executor.submit(self._timed, tool, query, kwargs), time.monotonic())
+        self._bump("started", len(speculation.futures))
+        return speculation
+
+    @staticmethod
+    def _timed(tool, query, kwargs):
+        start_time = time.monotonic()
+        observation = tool.execute(query, **kwargs)
+        return observation, time.monotonic() - start_time
+
+    def matches(self, query: str, action_input: str) -> bool:
+        """Checking whether the agent's tool input is (nearly) the raw query"""
+        if not action_input.strip() or action_input.strip().lower() == query.strip().lower():
+            return True
+        a, b = _words(query), _words(action_input)
+        if not a or not b:
+            return False
+        return len(a & b) / len(a | b) >= self.match_threshold
+
+    def claim(self, speculation: Optional[Speculation], action: str, action_input: str,
+              deadline=None) -> Optional[str]:
+        """
+        Returning the prefetched observation for action/action_input, or None on a miss
+
+        Each prefetched action can be claimed once; a mismatched input discards it.
+        With a Deadline, waiting for an unfinished prefetch stops when it expires
+        (counted as a miss).
+        """
+        if speculation is None or action not in speculation.futures:
+            return None
+
+        future, submitted = speculation.futures.pop(action)
+        if not self.matches(speculation.query, action_input):
+            future.cancel()
+            speculation.outcomes[action] = "miss"
+            self._bump("misses")
+            logger.info(f"🎯 Prefetch miss for {action} (input differs from question)")
+            return None
+
+        claimed_at = time.monotonic()
+        try:
+            observation, duration = future.result(timeout=deadline.remaining() if deadline else None)
+        except FutureTimeoutError:
+            future.cancel()
+            speculation.outcomes[action] = "miss"
+            self._bump("misses")
+            logger.info(f"🎯 Prefetch miss for {action} (not ready before the query deadline)")
+            return None
+        except Exception as e:
+            speculation.outcomes[action] = "error"
+            self._bump("errors")
+            logger.warning(f"⚠️ Prefetch for {action} failed: {e}")
+            return None
+
+        # Time saved = tool duration minus what we still had to wait for it
+        saved = max(0.0, duration - (time.monotonic() - claimed_at))
+        speculation.outcomes[action] = "hit"
+        self._bump("hits")
+        self._bump("saved_seconds", saved)
+        logger.info(f"🎯 Prefetch hit for {action} (saved {saved:.2f}s)")
+        return observation
+
+    def discard(self, speculation: Optional[Speculation]) -> Dict[str, str]:
+        """Dropping unclaimed prefetches at the end of a run; returns per-action outcomes"""
+        if speculation is None:
+            return {}
+        for action, (future, _) in speculation.futures.items():
+            future.cancel()
+            speculation.outcomes[action] = "unused"
+            self._bump("unused")
+        speculation.futures.clear()
+        return dict(speculation.outcomes)
+
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self):
+        """Getting prefetch hit-rate metrics"""
+        with self._lock:
+            stats = dict(self.stats)
+        resolved = stats["hits"] + stats["misses"] + stats["unused"] + stats["errors"]
+        stats["hit_rate"] = round(stats["hits"] / resolved, 3) if resolved else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
+
+    def close(self):
+        """Stopping the worker threads (pending prefetches are cancelled)"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,58 +1,189 @@
+import json
+import time
 import logging
 from agents.base_agent import BaseReActAgent
+from agents.iteration_controller import AdaptiveIterationController
+from agents.conversation import Conversation
+from agents.prefetch import SpeculativePrefetcher
+from agents.pre_verifier import LocalPreVerifier
+from agents.run_context import RunContext
+from utils.answer_cache import is_verified
+from utils.memory_store import format_recall
+from utils.deadline import Deadline
+from utils.web_index import WebSessionIndex
 
 logger = logging.getLogger(__name__)
 
 class AdvancedReactAgent(BaseReActAgent):
     """
     Extended agent that supports verifier and memory plugins.
+    
+    The agent holds only shared components; per-query state lives in a RunContext,
+    so one instance can answer several queries concurrently.
     """
     
     def __init__(self, api_key, tools, config=None, 
-                 verifier=None, memory=None, prompt_manager=None):
-        super().__init__(api_key, tools, config, prompt_manager)
+                 verifier=None, memory=None, prompt_manager=None, answer_cache=None,
+                 embed_fn=None, router=None, scheduler=None, prefetcher=None, pre_verifier=None,
+                 web_cache=None):
+        super().__init__(api_key, tools, config, prompt_manager, router, scheduler)
         self.verifier = verifier
         self.memory = memory
+        self.answer_cache = answer_cache
+        # Used for answer-convergence checks; falls back to word overlap when None
+        self.embed_fn = embed_fn
+        
+        # Running the likely first retrieval while the first LLM call is in flight
+        if prefetcher is None and self.config.get("prefetch_enabled"):
+            prefetcher = SpeculativePrefetcher.from_config(self.tools, self.config)
+        self.prefetcher = prefetcher
+        
+        # Local groundedness check in front of the LLM verifier (reuses the embedding model)
+        if pre_verifier is None and self.config.get("pre_verifier_enabled") and embed_fn is not None:
+            pre_verifier = LocalPreVerifier.from_config(self.config, embed_fn)
+        self.pre_verifier = pre_verifier
+        # WebResultCache receiving the web chunks behind verified answers (optional)
+        self.web_cache = web_cache
     
-    def run(self, query, max_iterations=None, use_verifier=True, use_memory=True):
+    def run(self, query, max_iterations=None, use_verifier=True, use_memory=True, use_cache=True,
+            event_log=None, prompt_mode=None, deadline=None):
         """
-        Run with optional verifier and memory.
+        Run with optional verifier, memory and answer cache.
         
         Args:
             query: User question
             max_iterations: Max reasoning loops
             use_verifier: Enable quality checking
             use_memory: Enable session tracking
+            use_cache: Serve/store verified answers from the semantic answer cache
+            event_log: Optional SessionLog; each step is appended as it completes
+                and an 'end' event with the result is written last
+            prompt_mode: Prompt mode for this run (defaults to the prompt manager's mode)
+            deadline: Seconds or a Deadline for the whole query (defaults to query_time_budget);
+                every LLM call, tool and retrieval gets the remaining budget, optional work is
+                skipped as it nears, and the best answer so far is returned when it passes
             
         Returns:
             dict with answer, steps, iterations, success
         """
-        max_iter = max_iterations or self.config["max_iterations"]
-        steps = []
+        if not isinstance(deadline, Deadline):
+            deadline = Deadline.from_config(self.config, seconds=deadline)
         
-        # Starting memory session
-        if use_memory and self.memory:
-            self.memory.start_session(query)
+        # Cached answers are only reused within the prompt mode that produced them
+        prompt_mode = prompt_mode or getattr(self.prompt_manager, "active_mode", None) or "base"
+        result = None
+        if use_cache and self.answer_cache:
+            result = self.answer_cache.lookup(query, mode=prompt_mode)
         
-        # Building initial prompt
-        prompt_mode = getattr(self.prompt_manager, "active_mode", "base")
-        prompt = self.prompt_manager.compose_prompt(
-            query=query,
-            tools=self.tools,
-            prompt_type=prompt_mode
+        if result is None:
+            result = self._run_loop(query, max_iterations, use_verifier, use_memory, event_log, prompt_mode, deadline)
+            if use_cache and self.answer_cache:
+                self.answer_cache.store(query, result, mode=prompt_mode)
+        
+        if event_log:
+            # Steps are already in the log, so they aren't repeated here
+            event_log.append("end", **{k: v for k, v in result.items() if k != "steps"})
+        
+        return result
+    
+    def _run_loop(self, query, max_iterations, use_verifier, use_memory, event_log=None, prompt_mode=None,
+                  deadline=None):
+        """Running the reasoning loop without the cache layer"""
+        max_iter = max_iterations or self.config["max_iterations"]
+        controller = AdaptiveIterationController.from_config(self.config, self.embed_fn, deadline)
+        answer = ""
+        
+        # Setting up request-scoped state (memory session, prompt mode, steps, metrics)
+        ctx = RunContext(
+            query,
+            prompt_mode=prompt_mode or getattr(self.prompt_manager, "active_mode", None) or "base",
+            memory_session=self.memory.open_session(query) if use_memory and self.memory else None,
+            event_log=event_log,
+            use_verifier=use_verifier and self.verifier is not None,
+            deadline=deadline,
+            web_index=(WebSessionIndex.from_config(self.config, self.embed_fn)
+                       if self.embed_fn is not None and self.config.get("web_index_enabled") else None)
         )
+        steps = ctx.steps
+        logger.info(f"🧵 Run {ctx.run_id} started")
+        
+        # Building the conversation: static system prefix first so providers can cache it,
+        # or the legacy single growing prompt in "string" mode
+        if self.config.get("conversation_mode", "messages") == "string":
+            conversation = Conversation.from_prompt(self.prompt_manager.compose_prompt(
+                query=query,
+                tools=self.tools,
+                prompt_type=ctx.prompt_mode
+            ))
+        else:
+            conversation = Conversation.from_messages(self.prompt_manager.compose_messages(
+                query=query,
+                tools=self.tools,
+                prompt_type=ctx.prompt_mode,
+                cache_control=self.config.get("prompt_cache_control", False)
+            ))
+        
+        # Recalling findings from previous sessions so the agent can skip re-retrieving them
+        if ctx.memory and ctx.memory.store:
+            recalled = ctx.memory.recall(
+                query,
+                k=self.config.get("memory_recall_k", 3),
+                min_score=self.config.get("memory_recall_min_score", 0.5)
+            )
+            if recalled:
+                logger.info(f"🧠 Recalled {len(recalled)} relevant steps from past sessions")
+                conversation.add_context(
+                    "Relevant findings from previous sessions "
+                    "(use them directly if they answer the question instead of searching again):\n"
+                    f"{format_recall(recalled)}"
+                )
+        
+        # Starting speculative retrieval on the raw question before the first LLM round trip
+        speculation = (self.prefetcher.start(query, deadline=ctx.deadline, web_index=ctx.web_index)
+                       if self.prefetcher else None)
+        hurried = False
         
         for iteration in range(1, max_iter + 1):
-            logger.info(f"\n{'='*50}\n🔄 Iteration {iteration}\n{'='*50}")
+            if controller.budget_exhausted(iteration):
+                break
             
-            # Calling LLM
-            result = self._call_llm(prompt)
+            logger.info(f"\n{'='*50}\n🔄 Iteration {iteration} (run {ctx.run_id})\n{'='*50}")
+            ctx.iterations = iteration
+            
+            # Asking for an answer from what was gathered once more tool rounds won't fit the deadline
+            has_observation = any(step.get("observation") for step in steps)
+            if has_observation and not hurried and not ctx.allows_optional(iteration, "further tool use"):
+                hurried = True
+                conversation.add_instruction(
+                    "Time is almost up: do not call any more tools. Give your final_answer now "
+                    "based on the information gathered so far."
+                )
+            
+            # Calling LLM with the full structured history; before any tool output
+            # the model only has to pick a tool and query, so a cheaper model suffices
+            payload = conversation.payload()
+            step_type = "synthesis" if has_observation or hurried or iteration == max_iter else "tool_selection"
+            result = self._call_llm(messages=payload, step_type=step_type, deadline=ctx.deadline)
+            ctx.metrics["llm_calls"] += 1
+            usage = result.get("usage") or {}
+            sent = conversation.record_sent(iteration, payload, usage)
+            controller.record_tokens(
+                json.dumps(result, ensure_ascii=False),
+                usage=usage,
+                estimated=sent["estimated_tokens"]
+            )
+            conversation.add_assistant(result)
+            if usage.get("prompt_tokens"):
+                logger.info(f"🧮 Tokens: {usage['prompt_tokens']} prompt "
+                            f"({usage.get('cached_tokens', 0)} cached), {usage.get('completion_tokens', 0)} completion")
             steps.append(result)
             
             thought = result.get("thought", "")
             action = result.get("action", "none")
             action_input = result.get("action_input", "")
             answer = result.get("final_answer", "")
+            if answer:
+                ctx.best_answer = answer
             
             if thought:
                 logger.info(f"💭 Thought: {thought[:150]}...")
@@ -65,6 +196,17 @@ class AdvancedReactAgent(BaseReActAgent):
                 tool = self.tools.get(action)
                 if tool:
                     try:
+                        # Structured inputs (search filters) go to tools that accept them as-is
+                        structured = None
+                        if isinstance(action_input, str) and action_input.strip().startswith("{"):
+                            try:
+                                action_input = json.loads(action_input)
+                            except json.JSONDecodeError:
+                                pass
+                        if isinstance(action_input, dict) and getattr(tool, "structured_input", False):
+                            structured = dict(action_input)
+                            action_input = structured.get("query", "")
+                        
                         # Normalizing input
                         if isinstance(action_input, list):
                             action_input = " ".join(map(str, action_input))
@@ -79,8 +221,27 @@ class AdvancedReactAgent(BaseReActAgent):
                             logger.warning(f"⚠️ Empty action_input detected, using original query as fallback")
                             action_input_str = query
                         
-                        logger.info(f"📥 Action Input: {action_input_str[:100]}...")
-                        observation = tool.execute(action_input_str)
+                        tool_input = action_input_str
+                        if structured and any(k != "query" for k in structured):
+                            tool_input = {**structured, "query": action_input_str}
+                        
+                        logger.info(f"📥 Action Input: {json.dumps(tool_input, ensure_ascii=False)[:100]}...")
+                        observation = None
+                        tool_start = time.monotonic()
+                        # Prefetched results are unfiltered, so they only serve plain-string searches
+                        if self.prefetcher and isinstance(tool_input, str):
+                            observation = self.prefetcher.claim(speculation, action, action_input_str,
+                                                                deadline=ctx.deadline)
+                        if observation is None and getattr(tool, "optional", False) \
+                                and not ctx.allows_optional(iteration, action):
+                            observation = (f"{action} skipped: the query deadline is near. "
+                                           "Answer from the information gathered so far.")
+                        if observation is None:
+                            kwargs = {"deadline": ctx.deadline} if getattr(tool, "accepts_deadline", False) else {}
+                            if ctx.web_index is not None and getattr(tool, "uses_web_index", False):
+                                kwargs["web_index"] = ctx.web_index
+                            observation = tool.execute(tool_input, **kwargs)
+                        ctx.record_tool(time.monotonic() - tool_start)
                         logger.info(f"👁 Observation: {observation[:200]}...")
                         
                     except Exception as e:
@@ -90,18 +251,36 @@ class AdvancedReactAgent(BaseReActAgent):
                     observation = f"Unknown tool: {action}"
                     logger.warning(f"⚠️ {observation}")
                 
-                prompt += f"\n\nObservation: {observation}\nContinue reasoning."
+                # Keeping the real observation on the step for reports and provenance
+                result["observation"] = observation
+                
+                conversation.add_observation(observation)
             
-            # Verifying if enabled
+            # Verifying if enabled (pure tool-call steps are skipped by the controller)
             verification = None
-            if use_verifier and self.verifier and (thought or answer):
-                logger.info("🔍 Running verifier...")
-                verification = self.verifier.verify(
-                    query=query,
-                    agent_answer=answer or thought,
-                    observation=observation,
-                    context=""  # Can pass domain context here
-                )
+            if (ctx.use_verifier and (thought or answer)
+                    and controller.should_verify(iteration, action, answer)
+                    and ctx.allows_optional(iteration, "verification")):
+                # Deciding clear-cut final answers locally; only ambiguous ones reach the LLM verifier
+                if self.pre_verifier and answer:
+                    ctx.metrics["local_verifications"] += 1
+                    verification = self.pre_verifier.check(
+                        query, answer, observation,
+                        evidence=[step.get("observation") for step in steps]
+                    )
+                    if verification["verdict"] == "escalate":
+                        verification = None
+                
+                if verification is None:
+                    logger.info("🔍 Running verifier...")
+                    ctx.metrics["verifier_calls"] += 1
+                    verification = self.verifier.verify(
+                        query=query,
+                        agent_answer=answer or thought,
+                        observation=observation,
+                        context=ctx.memory.get_context_summary() if ctx.memory else "",
+                        deadline=ctx.deadline
+                    )
                 
                 verdict = verification.get("verdict")
                 confidence = verification.get("confidence", 0)
@@ -112,13 +291,17 @@ class AdvancedReactAgent(BaseReActAgent):
                     logger.warning(f"⚠️ Verified: FAIL (confidence: {confidence})")
                     suggestion = verification.get("suggestion", "")
                     logger.info(f"💡 Suggestion: {suggestion}")
-                    prompt += f"\n\nVerifier Feedback: {suggestion}\nPlease refine your reasoning."
+                    conversation.add_feedback(suggestion)
                 else:
                     logger.info(f"❓ Verified: UNCERTAIN")
             
+            # Keeping the last real verdict for the fallback result (tool-only steps have none)
+            if verification is not None:
+                ctx.verification = verification
+            
             # Saving to memory
-            if use_memory and self.memory:
-                self.memory.add_step(iteration, {
+            if ctx.memory:
+                ctx.memory.add_step(iteration, {
                     "thought": thought,
                     "action": action,
                     "action_input": action_input,
@@ -127,39 +310,56 @@ class AdvancedReactAgent(BaseReActAgent):
                     "verification": verification
                 })
             
-            # Checking if done
-            should_stop = (answer and action == "none")
+            if ctx.event_log:
+                ctx.event_log.append("step", step=iteration, verification=verification,
+                                 **{k: v for k, v in result.items() if k not in ("type", "ts", "step", "verification")})
             
-            # If verifier is enabled, requiring passing verdict
-            if use_verifier and self.verifier and verification:
-                should_stop = should_stop and verification.get("verdict") == "pass"
-            
-            if should_stop:
+            # Checking if done (confidence, verdict and answer convergence)
+            if controller.should_stop(iteration, action, answer, verification):
                 logger.info(f"✅ Final Answer: {answer}")
                 
-                if use_memory and self.memory:
-                    session_path = self.memory.save_session()
+                if ctx.memory:
+                    session_path = ctx.memory.save_session()
                     logger.info(f"📄 Session saved to: {session_path}")
                 
+                # Keeping the web chunks this verified answer drew on for later queries
+                # (local pre-verifier passes only with pre_verifier_trusted)
+                if (self.web_cache and ctx.web_index is not None
+                        and is_verified(verification, self.config.get("pre_verifier_trusted", False))):
+                    self.web_cache.write_back(ctx.web_index.contributing(
+                        answer, min_score=self.config.get("web_cache_contribution_score", 0.5)
+                    ))
+                
                 return {
                     "answer": answer,
                     "steps": steps,
                     "iterations": iteration,
-                    "success": True,
-                    "verification": verification
+                    # A converged answer the verifier still rejects is returned but not marked successful
+                    "success": not (verification and verification.get("verdict") == "fail"),
+                    "verification": verification,
+                    "control": controller.report(),
+                    "usage": self._sum_usage(steps),
+                    "transport": conversation.report(),
+                    "prefetch": self.prefetcher.discard(speculation) if self.prefetcher else {},
+                    "run": ctx.report()
                 }
         
-        # Max iterations reached
-        fallback = answer or "I couldn't find a complete answer."
-        logger.warning("⏱️ Max iterations reached")
+        # Max iterations or budget reached; returning the best answer so far
+        fallback = ctx.best_answer or "I couldn't find a complete answer."
+        logger.warning(f"⏱️ Stopped without accepted answer ({controller.report()['stop_reason']})")
         
-        if use_memory and self.memory:
-            self.memory.save_session()
+        if ctx.memory:
+            ctx.memory.save_session()
         
         return {
             "answer": fallback,
             "steps": steps,
-            "iterations": max_iter,
+            "iterations": ctx.iterations,
             "success": False,
-            "verification": verification
+            "verification": ctx.verification,
+            "control": controller.report(),
+            "usage": self._sum_usage(steps),
+            "transport": conversation.report(),
+            "prefetch": self.prefetcher.discard(speculation) if self.prefetcher else {},
+            "run": ctx.report()
         }
\ No newline at end of file
@@ -0,0 +1,64 @@
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RunContext:
+    """
+    Request-scoped state of one agent run.
+
+    The agent, tools, models, caches and prompt templates are shared and never mutated
+    per query; everything a run writes (steps, memory session, prompt mode, metrics)
+    lives here, so one warm agent can serve concurrent queries from several threads.
+    """
+
+    def __init__(self, query, prompt_mode="base", memory_session=None, event_log=None,
+                 use_verifier=True, deadline=None, web_index=None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.prompt_mode = prompt_mode
+        # MemorySession of this run (None when memory is off)
+        self.memory = memory_session
+        self.event_log = event_log
+        self.use_verifier = use_verifier
+        # Deadline of this query (never expires when no budget was set)
+        self.deadline = deadline
+        # WebSessionIndex over the web results fetched in this run (None when disabled)
+        self.web_index = web_index
+
+        self.steps = []
+        self.best_answer = ""
+        self.verification = None
+        self.iterations = 0
+        self.started_at = time.monotonic()
+        self.metrics = {"llm_calls": 0, "tool_calls": 0, "tool_seconds": 0.0, "verifier_calls": 0,
+                        "local_verifications": 0}
+        # (iteration, stage) of optional work dropped to meet the deadline
+        self.skipped = []
+
+    def record_tool(self, seconds):
+        self.metrics["tool_calls"] += 1
+        self.metrics["tool_seconds"] += seconds
+
+    def allows_optional(self, iteration, stage):
+        """Whether optional work still fits the deadline; recording it as skipped if not"""
+        if self.deadline is None or self.deadline.allows_optional():
+            return True
+        self.skipped.append({"iteration": iteration, "stage": stage})
+        logger.info(f"⏳ Skipping {stage}, query deadline is near")
+        return False
+
+    def report(self):
+        """Summarizing the run for the result dict"""
+        return {
+            "run_id": self.run_id,
+            "prompt_mode": getattr(self.prompt_mode, "value", self.prompt_mode),
+            "session": self.memory.session_id if self.memory else None,
+            "seconds": round(time.monotonic() - self.started_at, 3),
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.metrics.items()},
+            "deadline": self.deadline.report() if self.deadline else None,
+            "skipped": self.skipped,
+            "web_index": self.web_index.get_stats() if self.web_index is not None else None,
+        }
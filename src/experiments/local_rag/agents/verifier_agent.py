@@ -4,6 +4,8 @@ import re
 import logging
 import time
 
+from utils.config import DEFAULT_CONFIG
+
 logger = logging.getLogger(__name__)
 
 class VerifierAgent:
@@ -11,13 +13,19 @@ class VerifierAgent:
     Verifies the quality of agent's reasoning and answers.
     """
     
-    def __init__(self, api_key, model="z-ai/glm-4.5-air:free"):
+    def __init__(self, api_key, model=None, router=None, config=None, scheduler=None):
         self.api_key = api_key
-        self.model = model
-        self.url = "https://openrouter.ai/api/v1/chat/completions"
-
-    def verify(self, query, agent_answer, observation, context=""):
-        """Checking if the agent's reasoning makes sense."""
+        self.config = config or DEFAULT_CONFIG.copy()
+        routes = self.config.get("model_routes", {}).get("verification") or [self.config["model"]]
+        self.model = model or routes[0]
+        # Shared ModelRouter; when set, the "verification" route replaces self.model
+        self.router = router
+        # Shared RequestScheduler; verification requests queue behind agent steps
+        self.scheduler = scheduler
+        self.url = self.config.get("openrouter_url", "https://openrouter.ai/api/v1/chat/completions")
+
+    def verify(self, query, agent_answer, observation, context="", deadline=None):
+        """Checking if the agent's reasoning makes sense (within the query's Deadline, if given)."""
         is_final_answer = not observation or observation.strip() == ""
         
         prompt = f"""You are an answer quality verifier for AI researches from an assistant. Evaluate the reasoning step.
@@ -57,18 +65,35 @@ Respond in JSON:
             "temperature": 0.3,
         }
 
+        def post(model):
+            timeout = self.config.get("verifier_timeout", 45)
+            if deadline:
+                timeout = deadline.timeout(timeout, "verification")
+            response = requests.post(self.url, json={**data, "model": model}, headers=headers,
+                                     timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+        def send(model):
+            if self.scheduler:
+                return self.scheduler.submit("openrouter", lambda: post(model), priority="verification",
+                                             timeout=deadline.remaining() if deadline else None)
+            return post(model)
+
         try:
             logger.info("🔍 [Verifier] Starting verification step...")
             logger.debug(f"[Verifier] Payload:\n{json.dumps(data, indent=2)[:1000]}")
 
             start_time = time.time()
-            response = requests.post(self.url, json=data, headers=headers, timeout=45)
+            if self.router:
+                body, model = self.router.call("verification", send)
+            else:
+                model = self.model
+                body = send(model)
             elapsed = time.time() - start_time
-            logger.info(f"⏱️ [Verifier] Response received in {elapsed:.2f}s")
-
-            response.raise_for_status()
+            logger.info(f"⏱️ [Verifier] Response received in {elapsed:.2f}s from {model}")
 
-            content = response.json()["choices"][0]["message"]["content"].strip()
+            content = body["choices"][0]["message"]["content"].strip()
             logger.debug(f"🧾 [Verifier] Raw LLM Output:\n{content[:800]}")
 
             # Extract JSON
@@ -0,0 +1,82 @@
+"""
+Measuring observation compression on a held-out question set.
+
+Usage:
+    python benchmarks/compression_eval.py [questions.txt] [--n-results 3]
+
+For every question the raw and compressed vectorstore observations are built from
+the same retrieved chunks. Reports token reduction and support retention: the share
+of the most query-relevant raw sentences that survive compression.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.config import DEFAULT_CONFIG
+from utils.compression import ObservationCompressor
+from utils.embeddings import embed_texts, cosine_scores, top_k_indices
+from utils.text import estimate_tokens, split_sentences
+from utils.tools import VectorStoreRetriever
+
+BASE_DIR = Path(__file__).parent.parent.resolve()
+
+
+def support_retention(embed_fn, query, raw_docs, compressed_text, k=5):
+    """Share of the top-k raw sentences (by query similarity) kept in the compressed text"""
+    sentences = [s for d in raw_docs for s in split_sentences(d["content"])]
+    if not sentences:
+        return 1.0
+    vectors = embed_texts(embed_fn, [query] + sentences)
+    best = top_k_indices(cosine_scores(vectors[0], vectors[1:]), k)
+    kept = sum(1 for i in best if sentences[i] in compressed_text)
+    return kept / len(best)
+
+
+def main():
+    args = sys.argv[1:]
+    n_results = 3
+    if "--n-results" in args:
+        idx = args.index("--n-results")
+        n_results = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    questions_path = Path(args[0]) if args else BASE_DIR / "benchmarks" / "heldout_questions.txt"
+    questions = [q.strip() for q in questions_path.read_text(encoding="utf-8").splitlines() if q.strip()]
+
+    retriever = VectorStoreRetriever(
+        chroma_db_path=str(BASE_DIR / "chroma_db"),
+        embedding_model=DEFAULT_CONFIG["embedding_model"]
+    )
+    compressor = ObservationCompressor.from_config(retriever.embed_fn, DEFAULT_CONFIG)
+
+    total_raw = total_compressed = 0
+    retention = []
+    print(f"{'raw':>6} {'comp':>6} {'kept%':>6}  question")
+    for question in questions:
+        documents = retriever.retrieve(question, n_results)
+        raw_text = "\n\n".join(d["content"] for d in documents)
+        compressed = compressor.compress(question, documents)
+        compressed_text = "\n\n".join(d["content"] for d in compressed)
+
+        raw_tokens = estimate_tokens(raw_text)
+        compressed_tokens = estimate_tokens(compressed_text)
+        kept = support_retention(retriever.embed_fn, question, documents, compressed_text)
+
+        total_raw += raw_tokens
+        total_compressed += compressed_tokens
+        retention.append(kept)
+        print(f"{raw_tokens:>6} {compressed_tokens:>6} {kept * 100:>5.0f}%  {question[:70]}")
+
+    if not questions:
+        print("No questions found")
+        return
+
+    print("-" * 60)
+    print(f"Observation tokens: {total_raw} → {total_compressed} "
+          f"({(1 - total_compressed / max(total_raw, 1)) * 100:.1f}% reduction)")
+    print(f"Mean support retention: {sum(retention) / len(retention) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
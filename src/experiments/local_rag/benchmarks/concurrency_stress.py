@@ -0,0 +1,128 @@
+"""
+Stress-testing one shared AdvancedReactAgent with concurrent queries (no real services).
+
+Usage:
+    python benchmarks/concurrency_stress.py [--queries 64] [--threads 16] [--latency 0.02]
+
+The stub LLM echoes each question into its tool query and final answer, and the stub
+tool echoes its input, so any state leaking between runs shows up as a foreign question
+in a run's answer, steps, memory session log or run report. Exits non-zero on cross-talk.
+"""
+import sys
+import time
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.react_agent import AdvancedReactAgent
+from agents.verifier_agent import VerifierAgent
+from benchmarks.stub_server import start_stub_server
+from utils.config import DEFAULT_CONFIG
+from utils.memory import MemoryLayer
+from utils.prompt_manager import PromptManager, PromptType
+from utils.session_log import SessionLogReader
+from utils.tools import Tool
+
+
+class EchoSearchTool(Tool):
+    """Pretends to search and echoes the query back after a random delay."""
+
+    def __init__(self):
+        super().__init__("vectorstore_search", "Echoes the query (stress-test stub)")
+
+    def _execute(self, query: str, **kwargs) -> str:
+        time.sleep(random.uniform(0, 0.02))
+        return f"Documents found for: {query}"
+
+
+def check_run(i, question, mode, result):
+    """Listing every way the result of run i mentions anything but its own question"""
+    problems = []
+    tag = f"#{i}#"
+    texts = [result["answer"]] + [str(step.get("observation", "")) for step in result["steps"]]
+    texts += [str(step.get("action_input", "")) for step in result["steps"]]
+    for text in texts:
+        foreign = [t for t in text.split() if t.startswith("#") and t.endswith("#") and t != tag]
+        if foreign:
+            problems.append(f"foreign tag {foreign[0]} in {text[:60]!r}")
+    if tag not in result["answer"]:
+        problems.append(f"answer lacks own tag: {result['answer'][:60]!r}")
+    if result["run"]["prompt_mode"] != mode.value:
+        problems.append(f"prompt mode {result['run']['prompt_mode']} != {mode.value}")
+    return problems
+
+
+def main():
+    args = sys.argv[1:]
+    n_queries = int(args[args.index("--queries") + 1]) if "--queries" in args else 64
+    n_threads = int(args[args.index("--threads") + 1]) if "--threads" in args else 16
+    latency = float(args[args.index("--latency") + 1]) if "--latency" in args else 0.02
+
+    server, state, base_url = start_stub_server(latency=latency)
+    config = {
+        **DEFAULT_CONFIG,
+        "openrouter_url": f"{base_url}/api/v1/chat/completions",
+        "model_routing_enabled": False,
+        "prefetch_enabled": False,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MemoryLayer(memory_dir=tmp)
+        verifier = VerifierAgent("stub-key", config=config)
+        # Loads both the base and advanced ReAct templates
+        prompts = PromptManager(debug=False, mode=PromptType.ADVANCED_REACT)
+        # One warm agent; runs alternate prompt modes through prompt_mode
+        agent = AdvancedReactAgent("stub-key", [EchoSearchTool()], config,
+                                   verifier=verifier, memory=memory, prompt_manager=prompts)
+
+        modes = [PromptType.BASE, PromptType.ADVANCED_REACT]
+        jobs = [(i, f"What does paper #{i}# say about topic {i}?", modes[i % 2]) for i in range(n_queries)]
+
+        def run(job):
+            i, question, mode = job
+            return agent.run(question, use_verifier=True, use_memory=True, use_cache=False, prompt_mode=mode)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            results = list(pool.map(run, jobs))
+        elapsed = time.perf_counter() - start
+
+        failures = {}
+        for (i, question, mode), result in zip(jobs, results):
+            problems = check_run(i, question, mode, result)
+            if problems:
+                failures[i] = problems
+
+        # Every run must own exactly one session log holding only its own question
+        sessions = [result["run"]["session"] for result in results]
+        if len(set(sessions)) != len(sessions):
+            failures["sessions"] = [f"{len(sessions) - len(set(sessions))} duplicate session ids"]
+        logs = sorted(Path(tmp).glob("session_*.jsonl"))
+        if len(logs) != n_queries:
+            failures["logs"] = [f"{len(logs)} session logs for {n_queries} queries"]
+        for (i, question, _), session in zip(jobs, sessions):
+            events = list(SessionLogReader(Path(tmp) / f"session_{session}.jsonl").iter_events())
+            queries = {e.get("query") for e in events if e.get("type") == "start"}
+            tags = {t for e in events if e.get("type") == "step"
+                    for t in f"{e.get('observation', '')} {e.get('answer', '')}".split()
+                    if t.startswith("#") and t.endswith("#")}
+            if queries != {question} or tags - {f"#{i}#"}:
+                failures.setdefault(i, []).append(f"session log mixes runs (tags {sorted(tags)[:3]})")
+
+    server.shutdown()
+
+    print(f"🔬 {n_queries} queries on {n_threads} threads in {elapsed:.2f}s "
+          f"({n_queries / elapsed:.1f} q/s, {state.requests} stub requests)")
+    if failures:
+        for key, problems in list(failures.items())[:10]:
+            print(f"   ❌ {key}: {'; '.join(problems)}")
+        print(f"❌ Cross-talk detected in {len(failures)} runs")
+        sys.exit(1)
+    print("✅ No cross-talk: answers, steps, prompt modes and session logs all belong to their own run")
+
+
+if __name__ == "__main__":
+    main()
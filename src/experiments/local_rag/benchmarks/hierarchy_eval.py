@@ -0,0 +1,106 @@
+"""
+Comparing flat chunks with parent/child hierarchical chunks on a held-out question set.
+
+Usage:
+    python benchmarks/hierarchy_eval.py [questions.txt] [--n-results 3] [--min-score 0.35]
+
+Both indexes are built from papers/ into temporary Chroma folders (chunk vectors come
+from the shared embedding cache). For each question the documents each variant would
+inject into the ReAct prompt (before compression) are compared: how many, how many
+tokens, and precision, the share of their sentences with query similarity >= min-score.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rag import SimpleRAG
+from utils.config import DEFAULT_CONFIG
+from utils.embeddings import embed_texts, cosine_scores
+from utils.text import estimate_tokens, split_sentences
+
+BASE_DIR = Path(__file__).parent.parent.resolve()
+
+
+def precision(embed_fn, query, documents, min_score):
+    """Share of injected sentences relevant to the query"""
+    sentences = [s for d in documents for s in split_sentences(d["content"])]
+    if not sentences:
+        return 0.0
+    vectors = embed_texts(embed_fn, [query] + sentences)
+    scores = cosine_scores(vectors[0], vectors[1:])
+    return float((scores >= min_score).mean())
+
+
+def build(tmp, name, hierarchical):
+    """Ingesting papers/ into a throwaway collection"""
+    folder = Path(tmp) / name
+    config = {
+        **DEFAULT_CONFIG,
+        "hierarchical_chunks_enabled": hierarchical,
+        "parent_store_path": str(folder / "parents.db"),
+        "collection_version_path": str(folder / "collection_version.json"),
+        "answer_cache_enabled": False,
+        "compression_enabled": False,
+    }
+    rag = SimpleRAG(
+        api_key=os.getenv("OPENROUTER_API_KEY", "-"),
+        tavily_api_key=os.getenv("TAVILY_API_KEY", "-"),
+        papers_folder=str(BASE_DIR / "papers"),
+        chroma_db_path=folder / "chroma_db",
+        config=config
+    )
+    rag.ingest_papers()
+    return rag
+
+
+def main():
+    args = sys.argv[1:]
+    n_results, min_score = 3, 0.35
+    if "--n-results" in args:
+        idx = args.index("--n-results")
+        n_results = int(args[idx + 1])
+        del args[idx:idx + 2]
+    if "--min-score" in args:
+        idx = args.index("--min-score")
+        min_score = float(args[idx + 1])
+        del args[idx:idx + 2]
+
+    questions_path = Path(args[0]) if args else BASE_DIR / "benchmarks" / "heldout_questions.txt"
+    questions = [q.strip() for q in questions_path.read_text(encoding="utf-8").splitlines() if q.strip()]
+    if not questions:
+        print("No questions found")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = build(tmp, "flat", hierarchical=False)
+        hier = build(tmp, "hierarchical", hierarchical=True)
+        embed_fn = flat.retriever.embed_fn
+        print(f"📚 flat: {flat.collection.count()} vectors | hierarchical: {hier.collection.count()} "
+              f"children, {hier.parent_store.count()} parents")
+
+        totals = {"flat": [0, 0, 0.0], "hierarchical": [0, 0, 0.0]}
+        print(f"{'docs':>9} {'tokens':>13} {'precision':>13}  question")
+        for question in questions:
+            row = {}
+            for label, docs in (("flat", flat.retriever.retrieve(question, n_results)),
+                                ("hierarchical", hier.retriever.retrieve_parents(question, n_results))):
+                tokens = sum(estimate_tokens(d["content"]) for d in docs)
+                score = precision(embed_fn, question, docs, min_score)
+                totals[label][0] += len(docs)
+                totals[label][1] += tokens
+                totals[label][2] += score
+                row[label] = (len(docs), tokens, score)
+            (fd, ft, fp), (hd, ht, hp) = row["flat"], row["hierarchical"]
+            print(f"{fd:>4}→{hd:<4} {ft:>6}→{ht:<6} {fp * 100:>5.0f}%→{hp * 100:<5.0f}%  {question[:60]}")
+
+    n = len(questions)
+    print("-" * 60)
+    for label, (docs, tokens, score) in totals.items():
+        print(f"{label:<13} {docs / n:.2f} docs, {tokens / n:.0f} tokens, {score / n * 100:.1f}% precision per question")
+
+
+if __name__ == "__main__":
+    main()
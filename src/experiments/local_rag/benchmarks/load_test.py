@@ -0,0 +1,81 @@
+"""
+Load test for server.py.
+
+Usage:
+    python benchmarks/load_test.py [--url http://127.0.0.1:8000] [--endpoint retrieve|query]
+                                   [--requests 200] [--concurrency 8] [--questions FILE]
+
+Replays questions (benchmarks/heldout_questions.txt by default) against the server
+and reports throughput (QPS) and latency percentiles.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * (len(ordered) - 1) + 0.5))]
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default, cast=str):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    url = option("--url", "http://127.0.0.1:8000").rstrip("/")
+    endpoint = option("--endpoint", "retrieve")
+    n_requests = option("--requests", 200, int)
+    concurrency = option("--concurrency", 8, int)
+    questions_file = Path(option("--questions", Path(__file__).parent / "heldout_questions.txt"))
+
+    questions = [q.strip() for q in questions_file.read_text(encoding="utf-8").splitlines()
+                 if q.strip() and not q.startswith("#")]
+    session = requests.Session()
+
+    def one(i):
+        question = questions[i % len(questions)]
+        body = {"query": question} if endpoint == "retrieve" else {"question": question}
+        start_time = time.perf_counter()
+        try:
+            response = session.post(f"{url}/{endpoint}", json=body, timeout=300)
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        return time.perf_counter() - start_time, status
+
+    print(f"🚀 {n_requests} x POST /{endpoint} at concurrency {concurrency}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, status in results if status == 200)
+    errors = {}
+    for _, status in results:
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+
+    print(f"⏱️ {elapsed:.2f}s total, {len(latencies) / elapsed:.2f} QPS ({len(latencies)} ok)")
+    if latencies:
+        print(f"📊 Latency p50 {percentile(latencies, 50) * 1000:.0f}ms, "
+              f"p95 {percentile(latencies, 95) * 1000:.0f}ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.0f}ms, "
+              f"max {latencies[-1] * 1000:.0f}ms")
+    if errors:
+        print(f"❌ Errors by status: {errors}")
+
+    try:
+        stats = session.get(f"{url}/stats", timeout=10).json()
+        print(f"🖥️ Server view: {stats.get('endpoints', {}).get('/' + endpoint)}")
+    except requests.RequestException:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmarking PDDL-to-NL conversion against a local stub backend (no Gemini calls).
+
+Usage:
+    python benchmarks/pddl_convert_bench.py [--latency 0.5] [--copies 4]
+
+Converts the repo's PDDL files plus N copies of them into a temp folder and compares
+serial vs concurrent cold runs and a warm (fully cached) run.
+"""
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.pddl_converter import PDDLConverter, discover_jobs, PDDL_DIR
+
+
+class StubBackend:
+    """Sleeps like a remote LLM and echoes a short summary of the prompt."""
+
+    model_name = "stub"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return f"Natural-language summary ({len(prompt)} prompt chars)\n"
+
+
+def main():
+    args = sys.argv[1:]
+    latency = float(args[args.index("--latency") + 1]) if "--latency" in args else 0.5
+    copies = int(args[args.index("--copies") + 1]) if "--copies" in args else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pddl_dir, nl_dir = tmp / "pddl", tmp / "nl"
+        pddl_dir.mkdir()
+        nl_dir.mkdir()
+        for source in PDDL_DIR.glob("*.pddl"):
+            for i in range(copies):
+                # A trailing comment keeps each copy's content hash distinct
+                shutil.copy(source, pddl_dir / f"{source.stem}_{i}.pddl")
+                with open(pddl_dir / f"{source.stem}_{i}.pddl", "a", encoding="utf-8") as f:
+                    f.write(f"\n;; copy {i}\n")
+        jobs = discover_jobs(pddl_dir, nl_dir)
+
+        runs = [
+            ("cold, serial", 1, tmp / "cache_serial"),
+            ("cold, concurrent", 8, tmp / "cache_concurrent"),
+            ("warm, concurrent", 8, tmp / "cache_concurrent"),
+        ]
+        print(f"🔬 {len(jobs)} files, stub latency {latency}s")
+        for label, workers, cache_dir in runs:
+            backend = StubBackend(latency)
+            converter = PDDLConverter(backend=backend, cache_dir=cache_dir, max_workers=workers)
+            start = time.perf_counter()
+            converter.convert_files(jobs)
+            elapsed = time.perf_counter() - start
+            print(f"   {label:<18} {elapsed:6.2f}s  backend calls: {backend.calls:<3} {converter.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
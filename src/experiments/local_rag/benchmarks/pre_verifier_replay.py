@@ -0,0 +1,102 @@
+"""
+Replaying recorded LLM verifier verdicts through the local pre-verifier.
+
+Usage:
+    python benchmarks/pre_verifier_replay.py [log ...] [--support 0.55] [--pass-share 0.75] [--fail-share 0.2]
+
+Reads query event logs (output/*.jsonl*) and memory session logs (memory/session_*.jsonl*)
+by default. Every final-answer step the LLM verifier judged pass/fail is re-checked locally
+with the observations the run had gathered up to that step. Reports the escalation rate
+(share of checks still needing the LLM) and how often local pass/fail verdicts agree
+with the LLM's, so thresholds can be tuned. Local passes still don't count as verified
+for the answer and web caches unless pre_verifier_trusted is set.
+"""
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chromadb.utils import embedding_functions
+
+from agents.pre_verifier import LocalPreVerifier
+from utils.config import DEFAULT_CONFIG
+from utils.session_log import SessionLogReader
+
+BASE_DIR = Path(__file__).parent.parent.resolve()
+
+
+def default_logs():
+    return sorted(BASE_DIR.glob("output/*.jsonl*")) + sorted(BASE_DIR.glob("memory/session_*.jsonl*"))
+
+
+def replay_cases(paths):
+    """Yielding (query, answer, observation, evidence, llm_verdict) from recorded runs"""
+    seen = set()
+    for path in paths:
+        query, evidence = "", []
+        for event in SessionLogReader(path).iter_events():
+            if event.get("type") == "start":
+                query, evidence = event.get("query", ""), []
+                continue
+            if event.get("type") != "step":
+                continue
+            observation = event.get("observation") or ""
+            evidence.append(observation)
+            answer = event.get("final_answer") or event.get("answer") or ""
+            verification = event.get("verification") or {}
+            if not answer or verification.get("source") == "local":
+                continue
+            if verification.get("verdict") not in ("pass", "fail"):
+                continue
+            # The same run is logged both in output/ and in memory/
+            key = (query, answer, observation)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield query, answer, observation, list(evidence), verification["verdict"]
+
+
+def main():
+    args = sys.argv[1:]
+    config = dict(DEFAULT_CONFIG)
+    for flag, key in (("--support", "pre_verifier_support_threshold"),
+                      ("--pass-share", "pre_verifier_pass_share"),
+                      ("--fail-share", "pre_verifier_fail_share")):
+        if flag in args:
+            idx = args.index(flag)
+            config[key] = float(args[idx + 1])
+            del args[idx:idx + 2]
+
+    paths = [Path(a) for a in args] or default_logs()
+    cases = list(replay_cases(paths))
+    if not cases:
+        print(f"No LLM-verified final answers found in {len(paths)} logs")
+        return
+
+    embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=config["embedding_model"])
+    pre_verifier = LocalPreVerifier.from_config(config, embed_fn)
+
+    confusion = Counter()
+    for query, answer, observation, evidence, llm_verdict in cases:
+        local = pre_verifier.check(query, answer, observation, evidence=evidence)
+        confusion[(local["verdict"], llm_verdict)] += 1
+
+    stats = pre_verifier.get_stats()
+    decided = stats["pass"] + stats["fail"]
+    agreed = confusion[("pass", "pass")] + confusion[("fail", "fail")]
+    print(f"🧪 {len(cases)} LLM-verified answers from {len(paths)} logs "
+          f"({stats['seconds'] / len(cases) * 1000:.0f} ms per local check)")
+    print(f"{'local/llm':<12} {'pass':>6} {'fail':>6}")
+    for verdict in ("pass", "fail", "escalate"):
+        print(f"{verdict:<12} {confusion[(verdict, 'pass')]:>6} {confusion[(verdict, 'fail')]:>6}")
+    print("-" * 40)
+    print(f"Escalation rate: {stats['escalation_rate'] * 100:.1f}% "
+          f"(LLM verifier calls avoided: {decided}/{len(cases)})")
+    if decided:
+        print(f"Agreement on local decisions: {agreed / decided * 100:.1f}% ({agreed}/{decided})")
+        print(f"False passes (LLM failed, local passed): {confusion[('pass', 'fail')]}")
+
+
+if __name__ == "__main__":
+    main()
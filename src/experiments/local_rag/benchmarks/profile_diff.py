@@ -0,0 +1,67 @@
+"""
+Comparing two command profiles written by `main.py ... --profile`.
+
+Usage:
+    python benchmarks/profile_diff.py <before> <after> [--top 25]
+
+Each argument is a profile's .json summary or its .pstats file (the summary next to it is
+picked up when present). Prints the run metadata (command, flags, git revision, wall time,
+peak memory) side by side, then the functions whose cumulative time changed the most.
+"""
+import sys
+import json
+import pstats
+from pathlib import Path
+
+
+def load_profile(path):
+    """(summary dict, {function label: (calls, cumulative seconds)}) for a profile"""
+    path = Path(path)
+    summary_path = path if path.suffix == ".json" else path.with_suffix(".json")
+    summary = json.loads(summary_path.read_text(encoding="utf-8")) if summary_path.exists() else {}
+    pstats_path = path if path.suffix == ".pstats" else Path(summary.get("files", {}).get("pstats", ""))
+    if not pstats_path.is_file():
+        raise SystemExit(f"❌ No .pstats for {path} (profile recorded with --profile memory?)")
+
+    functions = {}
+    for (filename, lineno, name), (_, calls, _, cumulative, _) in pstats.Stats(str(pstats_path)).stats.items():
+        label = name if filename == "~" else f"{Path(filename).name}:{lineno}({name})"
+        functions[label] = (calls, cumulative)
+    return summary, functions
+
+
+def main():
+    args = sys.argv[1:]
+    top = 25
+    if "--top" in args:
+        idx = args.index("--top")
+        top = int(args[idx + 1])
+        del args[idx:idx + 2]
+    if len(args) != 2:
+        print(__doc__)
+        sys.exit(1)
+
+    (before, before_funcs), (after, after_funcs) = load_profile(args[0]), load_profile(args[1])
+    for key in ("command", "argv", "revision", "timestamp", "wall_seconds", "max_rss_kb"):
+        print(f"{key:<14} {str(before.get(key, '-')):<40} {after.get(key, '-')}")
+    for section, key in (("cpu", "total_seconds"), ("memory", "peak_kb")):
+        print(f"{section + '.' + key:<14} {str(before.get(section, {}).get(key, '-')):<40} "
+              f"{after.get(section, {}).get(key, '-')}")
+    if before.get("command") != after.get("command"):
+        print("⚠️ Profiles are of different commands")
+
+    changes = []
+    for label in set(before_funcs) | set(after_funcs):
+        before_calls, before_cum = before_funcs.get(label, (0, 0.0))
+        after_calls, after_cum = after_funcs.get(label, (0, 0.0))
+        changes.append((after_cum - before_cum, label, before_cum, after_cum, before_calls, after_calls))
+    changes.sort(key=lambda c: abs(c[0]), reverse=True)
+
+    print("-" * 100)
+    print(f"{'delta s':>9} {'before s':>9} {'after s':>9} {'calls':>17}  function")
+    for delta, label, before_cum, after_cum, before_calls, after_calls in changes[:top]:
+        print(f"{delta:>+9.3f} {before_cum:>9.3f} {after_cum:>9.3f} {before_calls:>8}>{after_calls:<8}  {label}")
+
+
+if __name__ == "__main__":
+    main()
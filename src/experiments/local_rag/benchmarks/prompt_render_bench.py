@@ -0,0 +1,74 @@
+"""
+Micro-benchmark for prompt loading and rendering.
+
+Usage:
+    python benchmarks/prompt_render_bench.py [--iterations 2000]
+
+Compares the old per-variable str.replace rendering with CompiledTemplate,
+and times PromptManager construction (cold vs cached) and compose_prompt per mode.
+"""
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import prompt_manager as pm_module
+from utils.prompt_manager import PromptManager, PromptType, CompiledTemplate
+
+
+def legacy_render(template, **kwargs):
+    """The str.replace loop get_prompt used before templates were compiled"""
+    for key, value in kwargs.items():
+        template = template.replace("{" + key + "}", str(value))
+    return template
+
+
+def report(label, seconds, iterations):
+    print(f"{label:<40} {seconds / iterations * 1e6:>10.2f} µs/call")
+
+
+def main():
+    iterations = 2000
+    if "--iterations" in sys.argv:
+        iterations = int(sys.argv[sys.argv.index("--iterations") + 1])
+
+    tools = {
+        "vectorstore_search": SimpleNamespace(name="vectorstore_search", description="Search papers"),
+        "web_search": SimpleNamespace(name="web_search", description="Search the web"),
+    }
+    variables = {"query": "How do agents plan retrieval?", "tools": "- vectorstore_search\n- web_search"}
+
+    # Cold vs cached loading
+    pm_module._FILE_CACHE.clear()
+    cold = timeit.timeit(lambda: PromptManager(debug=False, mode=PromptType.PDDL), number=1)
+    report("PromptManager() cold (pddl)", cold, 1)
+    cached = timeit.timeit(lambda: PromptManager(debug=False, mode=PromptType.PDDL), number=iterations)
+    report("PromptManager() cached (pddl)", cached, iterations)
+
+    manager = PromptManager(debug=False, mode=PromptType.ADVANCED_REACT)
+    template = manager.prompts["advanced_react"]
+    compiled = CompiledTemplate(template)
+
+    report("legacy str.replace render", timeit.timeit(
+        lambda: legacy_render(template, **variables), number=iterations), iterations)
+    report("CompiledTemplate.render", timeit.timeit(
+        lambda: compiled.render(**variables), number=iterations), iterations)
+    assert legacy_render(template, **variables) == compiled.render(**variables)
+
+    for mode in PromptType:
+        manager = PromptManager(debug=False, mode=mode)
+        seconds = timeit.timeit(
+            lambda: manager.compose_prompt(query=variables["query"], tools=tools, prompt_type=mode),
+            number=iterations
+        )
+        report(f"compose_prompt ({mode.value})", seconds, iterations)
+
+    hot = PromptManager(debug=False, mode=PromptType.BASE, hot_reload=True)
+    report("get_prompt with hot_reload", timeit.timeit(
+        lambda: hot.get_prompt("base", **variables), number=iterations), iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Exercising RequestScheduler against the local stub server with injected 429s.
+
+Usage:
+    python benchmarks/scheduler_stub_test.py [--requests 30] [--rate-limit-every 4]
+
+Fires concurrent agent-step and verifier calls through one shared scheduler and
+prints per-endpoint queue-wait metrics, throttling counts and router statistics.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.base_agent import BaseReActAgent
+from agents.model_router import ModelRouter
+from agents.verifier_agent import VerifierAgent
+from benchmarks.stub_server import start_stub_server
+from utils.config import DEFAULT_CONFIG
+from utils.scheduler import RequestScheduler
+
+
+def main():
+    args = sys.argv[1:]
+    n_requests = int(args[args.index("--requests") + 1]) if "--requests" in args else 30
+    every = int(args[args.index("--rate-limit-every") + 1]) if "--rate-limit-every" in args else 4
+
+    server, state, base_url = start_stub_server(rate_limit_every=every, latency=0.05, retry_after=1)
+    config = {
+        **DEFAULT_CONFIG,
+        "openrouter_url": f"{base_url}/api/v1/chat/completions",
+        "rate_limits": {"openrouter": {"rate": 10.0, "burst": 3, "concurrency": 3, "retries": 2}},
+    }
+
+    scheduler = RequestScheduler.from_config(config)
+    router = ModelRouter.from_config(config)
+    agent = BaseReActAgent("stub-key", [], config, router=router, scheduler=scheduler)
+    verifier = VerifierAgent("stub-key", router=router, config=config, scheduler=scheduler)
+
+    def agent_call(i):
+        step_type = "synthesis" if i % 2 else "tool_selection"
+        return agent._call_llm(prompt=f"Question {i}", step_type=step_type)
+
+    def verifier_call(i):
+        return verifier.verify(query=f"Question {i}", agent_answer="answer", observation="")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(agent_call if i % 3 else verifier_call, i) for i in range(n_requests)]
+        results = [f.result() for f in futures]
+    elapsed = time.time() - start
+
+    failures = sum(1 for r in results if r.get("verdict") == "uncertain" or str(r.get("observation", "")).startswith("Error"))
+    print(f"{n_requests} calls in {elapsed:.2f}s, {failures} surfaced as errors")
+    print(f"Stub saw {state.requests} requests, injected {state.rate_limited} 429s")
+    for endpoint, metrics in scheduler.get_metrics().items():
+        print(f"[{endpoint}] {metrics}")
+    for model, stats in router.get_stats().items():
+        print(f"[{model}] {stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
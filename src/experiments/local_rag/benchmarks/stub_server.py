@@ -0,0 +1,131 @@
+"""
+Local stub for the OpenRouter chat completions API (and a Tavily-like /search endpoint).
+
+Usage:
+    python benchmarks/stub_server.py [--port 8765] [--rate-limit-every 3] [--latency 0.2]
+
+Every Nth request returns 429 with a Retry-After header, so rate-limit handling can be
+exercised without touching the real services. Point config["openrouter_url"] at
+http://127.0.0.1:<port>/api/v1/chat/completions.
+"""
+import json
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubState:
+    def __init__(self, rate_limit_every=0, latency=0.0, retry_after=1):
+        self.rate_limit_every = rate_limit_every
+        self.latency = latency
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+    def should_throttle(self):
+        with self.lock:
+            self.requests += 1
+            if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return True
+            return False
+
+
+_QUESTION = re.compile(r"Question:\s*(.+)")
+
+
+def completion_content(body):
+    """Answering like the agent (or the verifier) expects, echoing the question back"""
+    messages = body.get("messages", [])
+    prompt = json.dumps(messages)
+    if "answer quality verifier" in prompt:
+        return json.dumps({"verdict": "pass", "reason": "stub", "suggestion": "", "confidence": 0.9})
+    # The first user turn carries the question, so concurrent runs can be told apart
+    first_user = next((m.get("content") for m in messages if m.get("role") == "user"), "")
+    match = _QUESTION.search(first_user if isinstance(first_user, str) else "")
+    question = match.group(1).strip() if match else "stub query"
+    if "Observation:" in prompt:
+        return json.dumps({"thought": "I have enough information.", "action": "none",
+                           "action_input": "", "final_answer": f"Stub answer based on the observation for: {question}"})
+    return json.dumps({"thought": "Searching the papers first.", "action": "vectorstore_search",
+                       "action_input": question, "final_answer": ""})
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload=None, headers=None):
+            data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if state.latency:
+                time.sleep(state.latency)
+            if state.should_throttle():
+                self._send(429, {"error": {"message": "Rate limit exceeded", "code": 429}},
+                           {"Retry-After": str(state.retry_after)})
+                return
+
+            if self.path.endswith("/chat/completions"):
+                self._send(200, {
+                    "model": body.get("model"),
+                    "choices": [{"message": {"role": "assistant", "content": completion_content(body)}}],
+                    "usage": {"prompt_tokens": 500, "completion_tokens": 40, "total_tokens": 540,
+                              "prompt_tokens_details": {"cached_tokens": 400}},
+                })
+            elif self.path.endswith("/search"):
+                self._send(200, {"results": [
+                    {"url": "https://example.org/stub", "content": f"Stub web result for {body.get('query')}"}
+                ]})
+            else:
+                self._send(404, {"error": "unknown path"})
+
+        def do_GET(self):
+            self._send(200, {"requests": state.requests, "rate_limited": state.rate_limited})
+
+    return Handler
+
+
+def start_stub_server(port=0, rate_limit_every=0, latency=0.0, retry_after=1):
+    """Starting the stub in a background thread; returns (server, state, base_url)"""
+    state = StubState(rate_limit_every, latency, retry_after)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default, cast):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    server, state, base_url = start_stub_server(
+        port=option("--port", 8765, int),
+        rate_limit_every=option("--rate-limit-every", 3, int),
+        latency=option("--latency", 0.0, float),
+    )
+    print(f"Stub OpenRouter listening on {base_url}/api/v1/chat/completions (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 import sys
 import os
 import json
+import logging
 from datetime import datetime
 from dotenv import load_dotenv
 from rag import SimpleRAG
 from agents.react_agent import AdvancedReactAgent 
 from agents.verifier_agent import VerifierAgent 
+from agents.model_router import ModelRouter
 from utils.memory import MemoryLayer
+from utils.memory_store import LongTermMemoryStore
 from utils.prompt_manager import PromptManager, PromptType
+from utils.pddl_context import PDDLContextIndex
+from utils.session_log import SessionLog, SessionLogReader, log_path
+from utils.ingest_worker import IngestWorker, limit_cpu
+from utils.profiling import CommandProfiler
 from pathlib import Path
 
 load_dotenv()
 
-def save_output_to_json(query, mode, use_verifier, use_memory, result):
-    """Saving query results to JSON file in output folder."""
+def open_query_log(query, mode, use_verifier, use_memory, config):
+    """Opening an append-only event log for a query run in the output folder."""
     # Creating output folder if it doesn't exist
     output_dir = Path(__file__).parent / "output"
     output_dir.mkdir(exist_ok=True)
@@ -29,72 +36,30 @@ def save_output_to_json(query, mode, use_verifier, use_memory, result):
     # Creating filename with sanitized query
     query_snippet = "".join(c if c.isalnum() else "_" for c in query[:10])
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"test_{query_snippet}_{flag_str}_{timestamp}.json"
-    filepath = output_dir / filename
-    
-    # Extracting structured data from steps
-    steps = result.get("steps", [])
-    reasoning_steps = []
-    thoughts = []
-    actions = []
-    observations = []
-    conclusions = []
-    
-    for i, step in enumerate(steps, 1):
-        step_data = {
-            "step_number": i,
-            "thought": step.get("thought", ""),
-            "action": step.get("action", "none"),
-            "action_input": step.get("action_input", ""),
-            "observation": step.get("observation", ""),
-            "final_answer": step.get("final_answer", "")
-        }
-        reasoning_steps.append(step_data)
-        
-        # Collecting individual components
-        if step.get("thought"):
-            thoughts.append({"step": i, "content": step["thought"]})
-        if step.get("action") and step.get("action") != "none":
-            actions.append({
-                "step": i, 
-                "action": step["action"],
-                "input": step.get("action_input", "")
-            })
-        if step.get("observation"):
-            observations.append({"step": i, "content": step["observation"]})
-        if step.get("final_answer"):
-            conclusions.append({"step": i, "content": step["final_answer"]})
-    
-    # Preparing output data
-    output_data = {
-        "metadata": {
-            "query": query,
-            "mode": mode.value if hasattr(mode, 'value') else str(mode),
-            "flags": {
-                "verifier": use_verifier,
-                "memory": use_memory
-            },
-            "timestamp": datetime.now().isoformat(),
-            "iterations": result.get("iterations", 0),
-            "success": result.get("success", False)
-        },
-        "execution": {
-            "reasoning_steps": reasoning_steps,
-            "thoughts": thoughts,
-            "actions": actions,
-            "observations": observations,
-            "conclusions": conclusions
-        },
-        "verification": result.get("verification", None),
-        "answer": result.get("answer", ""),
-        "raw_result": result
-    }
+    compression = config.get("session_log_compression")
+    filepath = log_path(output_dir, f"test_{query_snippet}_{flag_str}_{timestamp}", compression)
+    
+    event_log = SessionLog(filepath, fsync=config.get("session_log_fsync", "step"), compression=compression)
+    event_log.append(
+        "start",
+        query=query,
+        mode=mode.value if hasattr(mode, 'value') else str(mode),
+        flags={"verifier": use_verifier, "memory": use_memory}
+    )
+    return event_log
+
+
+def save_output_to_json(log_file):
+    """Materializing the legacy JSON report from a query event log."""
+    log_file = Path(log_file)
+    report = SessionLogReader(log_file).report()
+    filepath = log_file.parent / f"{log_file.name.split('.')[0]}.json"
     
     # Writing to file
     with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+        json.dump(report, f, indent=2, ensure_ascii=False)
     
-    print(f"\n💾 Output saved to: {filepath}")
+    print(f"\n💾 Report saved to: {filepath}")
     return filepath
     
 def main():
@@ -118,13 +83,24 @@ def main():
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python main.py ingest              - Ingesting PDF papers")
+        print("  python main.py watch [--once]      - Ingesting new/changed papers in the background")
+        print("  python main.py reindex             - Rebuilding the collection (reusing cached embeddings)")
+        print("  python main.py compact-web-cache   - Expiring stale entries of the web result cache")
         print("  python main.py delete              - Deleting database")
         print("  python main.py check               - Checking database")
         print("  python main.py query 'question'    - Querying the system")
+        print("  python main.py report <log>        - Writing the JSON report for a query log")
         print("\nQuery flags:")
         print("  --verify                           - Enabling verification")
         print("  --memory                           - Enabling memory")
         print("  --mode [base|advanced_react|pddl]  - Setting prompt mode (default: base)")
+        print("  --no-cache                         - Bypassing the semantic answer cache")
+        print("  --deadline SECONDS                 - Answering within SECONDS (skipping optional work near it)")
+        print("  --json-report                      - Also writing the pretty-printed JSON report")
+        print("  --hot-reload                       - Re-reading edited prompt files on every render")
+        print("\nProfiling flags (any command):")
+        print("  --profile [cpu|memory|all]         - Writing cProfile/tracemalloc profiles to output/ (default: all)")
+        print("  --profile-interval SECONDS         - Also sampling stacks and memory every SECONDS (long ingests)")
         sys.exit(1)
     
     command = sys.argv[1].lower()
@@ -134,6 +110,35 @@ def main():
         print("📚 Ingesting papers...")
         rag.ingest_papers()
         print("✅ Ingestion complete!")
+        if rag.embedding_cache:
+            print(f"🧠 Embedding cache: {rag.embedding_cache_summary()}")
+    
+    # Rebuilding the collection, e.g. after changing chunk_size
+    elif command == "reindex":
+        print("🔁 Reindexing papers...")
+        rag.reindex()
+        print(f"✅ Reindex complete! {rag.collection.count()} chunks")
+        if rag.embedding_cache:
+            print(f"🧠 Embedding cache: {rag.embedding_cache_summary()}")
+    
+    # Watching papers/ and ingesting through the persistent job queue
+    elif command == "watch":
+        limit_cpu(nice=rag.config.get("ingest_nice", 10), threads=rag.config.get("ingest_cpu_threads"))
+        worker = IngestWorker.from_config(rag, Path(__file__).parent)
+        print(f"👀 Ingest worker started (collection version {rag.collection_version.version}), Ctrl+C to stop")
+        try:
+            worker.run(once="--once" in sys.argv)
+        except KeyboardInterrupt:
+            worker.stop()
+        print(f"📊 Ingest stats: {worker.get_stats()}")
+    
+    # Expiring stale write-back web results
+    elif command == "compact-web-cache":
+        if not rag.web_cache:
+            print("ℹ️ Web cache is disabled (web_cache_enabled)")
+        else:
+            expired = rag.web_cache.compact()
+            print(f"🧹 Expired {expired} web cache entries, {rag.web_cache.count()} left")
     
     # Deleting database
     elif command == "delete":
@@ -146,6 +151,7 @@ def main():
         try:
             count = rag.collection.count()
             print(f"📊 Documents in collection: {count}")
+            print(f"🏷️ Collection version: {rag.collection_version.version}")
         except Exception as e:
             print(f"❌ Error: {e}")
     
@@ -160,6 +166,18 @@ def main():
         # Parsing flags
         use_verifier = "--verify" in sys.argv
         use_memory = "--memory" in sys.argv
+        use_cache = "--no-cache" not in sys.argv
+        deadline = None
+        if "--deadline" in sys.argv:
+            deadline_idx = sys.argv.index("--deadline")
+            try:
+                deadline = float(sys.argv[deadline_idx + 1])
+            except (IndexError, ValueError):
+                deadline = 0.0
+            # 0 or less would read as "no deadline"
+            if not deadline > 0:
+                print("❌ --deadline needs a number of seconds")
+                sys.exit(1)
         
         # Getting and validating mode
         mode_str = "base"
@@ -178,13 +196,29 @@ def main():
         
         print(f"🎯 Using '{mode.value}' mode")
         
-        # Initializing PromptManager with selected mode
-        prompts = PromptManager(debug=True)
-        prompts._setup_prompts(mode=mode)
+        # Initializing PromptManager with selected mode (prompt files are read once)
+        # In PDDL mode only the context sections relevant to the question are injected
+        context_index = None
+        if mode == PromptType.PDDL and rag.config.get("pddl_context_top_k"):
+            context_index = PDDLContextIndex.from_config(rag.retriever.embed_fn, rag.config)
+        prompts = PromptManager(debug=True, mode=mode, hot_reload="--hot-reload" in sys.argv,
+                                context_index=context_index)
         
-        # Setting up plugins
-        verifier = VerifierAgent(api_key) if use_verifier else None
-        memory = MemoryLayer() if use_memory else None
+        # Setting up plugins (agent and verifier share one router and its model statistics)
+        router = ModelRouter.from_config(rag.config) if rag.config.get("model_routing_enabled") else None
+        verifier = VerifierAgent(api_key, router=router, config=rag.config,
+                                 scheduler=rag.scheduler) if use_verifier else None
+        memory = None
+        if use_memory:
+            store = LongTermMemoryStore(
+                Path(__file__).parent / rag.config["memory_db_path"],
+                embed_fn=rag.retriever.embed_fn
+            )
+            memory = MemoryLayer(
+                store=store,
+                fsync=rag.config.get("session_log_fsync", "step"),
+                compression=rag.config.get("session_log_compression")
+            )
         
         # Creating agent
         agent = AdvancedReactAgent(
@@ -192,43 +226,107 @@ def main():
             tools=rag.tools,
             verifier=verifier,
             memory=memory,
-            prompt_manager=prompts
+            prompt_manager=prompts,
+            answer_cache=rag.answer_cache,
+            embed_fn=rag.retriever.embed_fn,
+            config=rag.config,
+            router=router,
+            scheduler=rag.scheduler,
+            web_cache=rag.web_cache
         )
         
         # Running query
         print(f"❓ Question: {question}")
         print(f"🔍 Verifier: {'ON' if use_verifier else 'OFF'}")
-        print(f"💾 Memory: {'ON' if use_memory else 'OFF'}\n")
+        print(f"💾 Memory: {'ON' if use_memory else 'OFF'}")
+        budget = deadline if deadline is not None else rag.config.get("query_time_budget")
+        print(f"⏳ Deadline: {f'{budget}s' if budget else 'none'}\n")
         
-        result = agent.run(
-            question,
-            use_verifier=use_verifier,
-            use_memory=use_memory
-        )
+        # Streaming steps to the output log as they happen
+        event_log = open_query_log(question, mode, use_verifier, use_memory, rag.config)
+        try:
+            result = agent.run(
+                question,
+                use_verifier=use_verifier,
+                use_memory=use_memory,
+                use_cache=use_cache,
+                event_log=event_log,
+                deadline=deadline
+            )
+        finally:
+            event_log.close()
+            if agent.prefetcher:
+                agent.prefetcher.close()
+        print(f"\n💾 Output log: {event_log.path}")
         
-        # Saving output to JSON
-        save_output_to_json(
-            query=question,
-            mode=mode,
-            use_verifier=use_verifier,
-            use_memory=use_memory,
-            result=result
-        )
+        if "--json-report" in sys.argv:
+            save_output_to_json(event_log.path)
         
         print("\n" + "="*60)
         print("📝 ANSWER:")
+        if result.get("run", {}).get("skipped"):
+            skipped = ", ".join(sorted({s["stage"] for s in result["run"]["skipped"]}))
+            print(f"⏳ Skipped near the deadline: {skipped}")
         print("="*60)
         print(result["answer"])
         print("\n" + "="*60)
-        print(f"✅ Completed in {result['iterations']} iterations")
+        if result.get("cached"):
+            cache_info = result["cache"]
+            print(f"⚡ Served from answer cache (similarity {cache_info['similarity']}) "
+                  f"— originally asked: {cache_info['question']}")
+            if cache_info["sources"]:
+                print(f"📚 Sources: {', '.join(cache_info['sources'])}")
+        else:
+            print(f"✅ Completed in {result['iterations']} iterations")
         if result.get("verification"):
             print(f"🔍 Verdict: {result['verification'].get('verdict')}")
+        if result.get("usage", {}).get("calls"):
+            usage = result["usage"]
+            print(f"🧮 Prompt tokens: {usage['prompt_tokens']} ({usage['cached_tokens']} cached, "
+                  f"{usage['cache_hit_rate'] * 100:.0f}%) over {usage['calls']} LLM calls")
+        if router:
+            for model, stats in router.get_stats().items():
+                print(f"🔀 {model}: {stats['successes']}/{stats['calls']} ok, "
+                      f"avg latency {stats['latency_ewma']}s, errors {stats['errors'] or '-'}")
+        if agent.prefetcher:
+            stats = agent.prefetcher.get_stats()
+            print(f"🎯 Prefetch: {result.get('prefetch') or '-'} "
+                  f"(hit rate {stats['hit_rate'] * 100:.0f}%, saved {stats['saved_seconds']}s)")
+        if agent.pre_verifier and use_verifier:
+            stats = agent.pre_verifier.get_stats()
+            print(f"🧪 Pre-verifier: {stats['pass']} pass, {stats['fail']} fail locally, "
+                  f"{stats['escalate']} escalated to the LLM verifier")
+        if result.get("control"):
+            print(f"🛑 Stop reason: {result['control']['stop_reason']} "
+                  f"({result['control']['elapsed']}s, ~{result['control']['tokens_used']} tokens)")
         print("="*60)
     
+    # Rebuilding the JSON report from an event log
+    elif command == "report":
+        if len(sys.argv) < 3:
+            print("❌ Please provide a log file")
+            sys.exit(1)
+        save_output_to_json(sys.argv[2])
+    
     else:
         print(f"❌ Unknown command: {command}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Configuring logging once at the entry point (library modules only create loggers)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    # Profiling the whole command when asked (files are tagged with command, flags and git revision)
+    try:
+        profiler = CommandProfiler.from_argv(sys.argv, Path(__file__).parent / "output")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if profiler:
+        with profiler:
+            main()
+    else:
+        main()
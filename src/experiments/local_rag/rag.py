@@ -3,15 +3,26 @@ from chromadb.utils import embedding_functions
 import PyPDF2
 from pathlib import Path
 from tavily import TavilyClient
+import time
 import logging
 
 from utils.tools import RAGTool, VectorStoreRetriever, WebSearchTool
+from utils.compression import ObservationCompressor
+from utils.answer_cache import SemanticAnswerCache
+from utils.scheduler import RequestScheduler
+from utils.ingest_queue import CollectionVersion, VersionWatcher
+from utils.dedup import NearDuplicateIndex, strip_references, strip_repeated_lines
+from utils.embedding_cache import EmbeddingCache
+from utils.hierarchy import ParentStore, split_children
+from utils.web_cache import WebResultCache
+from utils.ingest_metadata import PAGE_BREAK, guess_title, guess_year, mark_sections, annotate_chunks
 from agents.base_agent import BaseReActAgent
 from utils.config import DEFAULT_CONFIG
 
 logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).parent.resolve()
+COLLECTION_NAME = "research_papers_v2"  # Match your existing collection name
 
 class SimpleRAG:
     """
@@ -29,35 +40,85 @@ class SimpleRAG:
         self.chroma_db_path = Path(chroma_db_path or Path(__file__).parent / "chroma_db")
         self.config = config or DEFAULT_CONFIG.copy()
         
+        # One scheduler for every outbound LLM/search call made through this stack
+        self.scheduler = RequestScheduler.from_config(self.config)
+        
         # Setting up ChromaDB
-        embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
+        self.embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
             model_name=self.config["embedding_model"]
         )
         self.client = chromadb.PersistentClient(path=str(self.chroma_db_path))
-        self.collection = self.client.get_or_create_collection(
-            name="research_papers_v2",  # Match your existing collection name
-            metadata={"hnsw:space": "cosine"},
-            embedding_function=embed_fn
+        self.collection = self._open_collection()
+        
+        # Chunk embeddings persisted across re-chunking, resets and collection renames
+        self.embedding_cache = EmbeddingCache.from_config(self.config, BASE_DIR)
+        
+        # Collection version published by ingestion (also by a background worker process)
+        self.collection_version = CollectionVersion(
+            BASE_DIR / self.config.get("collection_version_path", "./cache/collection_version.json")
         )
         
-        # Setting up retriever using YOUR VectorStoreRetriever
+        # Parent sections of hierarchical chunks; only their small children are embedded
+        self.parent_store = None
+        if self.config.get("hierarchical_chunks_enabled", True):
+            self.parent_store = ParentStore(BASE_DIR / self.config.get("parent_store_path", "./cache/parents.db"))
+        
+        # Setting up retriever using YOUR VectorStoreRetriever (sharing the model and client above)
         self.retriever = VectorStoreRetriever(
-            collection_name="research_papers_v2",
+            collection_name=COLLECTION_NAME,
             chroma_db_path=str(self.chroma_db_path),
-            embedding_model=self.config["embedding_model"]
+            embedding_model=self.config["embedding_model"],
+            embed_fn=self.embed_fn,
+            client=self.client,
+            version_watcher=VersionWatcher(
+                self.collection_version,
+                interval=self.config.get("collection_version_poll", 2.0)
+            ),
+            parent_store=self.parent_store,
+            child_candidates=self.config.get("child_candidates_multiplier", 4),
+            parent_return=self.config.get("parent_return", "window"),
+            parent_window_chars=self.config.get("parent_window_chars", 150),
+            parent_window_children=self.config.get("parent_window_children", 2)
         )
         
+        # Setting up observation compression with the retriever's embedding model
+        self.compressor = None
+        if self.config.get("compression_enabled", True):
+            self.compressor = ObservationCompressor.from_config(self.retriever.embed_fn, self.config)
+            self.retriever.compressor = self.compressor
+        
+        # Setting up semantic answer cache shared by query() and AdvancedReactAgent
+        self.answer_cache = None
+        if self.config.get("answer_cache_enabled", True):
+            self.answer_cache = SemanticAnswerCache(
+                self.retriever.embed_fn,
+                cache_path=BASE_DIR / self.config.get("answer_cache_path", "./cache/answer_cache.json"),
+                max_entries=self.config.get("answer_cache_max_entries", 256),
+                similarity_threshold=self.config.get("answer_cache_threshold", 0.9),
+                require_verified=self.config.get("answer_cache_require_verified", True),
+                trust_local=self.config.get("pre_verifier_trusted", False)
+            )
+            self.retriever.on_version_change.append(self._invalidate_answer_cache)
+        
+        # Web chunks behind verified answers, looked up before Tavily (None when disabled)
+        self.web_cache = WebResultCache.from_config(self.config, self.client, self.embed_fn, self.embedding_cache)
+        
+        # Near-duplicate index used at ingest (built lazily) and per-paper ingest stats
+        self.dedup = None
+        self.ingest_stats = []
+        
         # Setting up tools using YOUR RAGTool
         rag_tool = RAGTool(
             collection=self.collection,
-            retriever=self.retriever
+            retriever=self.retriever,
+            compressor=self.compressor
         )
-        websearch_tool = WebSearchTool(self.tavily_client)
+        websearch_tool = WebSearchTool(self.tavily_client, scheduler=self.scheduler, web_cache=self.web_cache)
 
         self.tools = [rag_tool, websearch_tool]
         
         # Setting up agent
-        self.agent = BaseReActAgent(api_key, self.tools, self.config)
+        self.agent = BaseReActAgent(api_key, self.tools, self.config, scheduler=self.scheduler)
     
     def ingest_papers(self):
         """Load PDFs into vector store"""
@@ -72,60 +133,242 @@ class SimpleRAG:
             return
         
         logger.info(f"Found {len(pdf_files)} papers")
+        ingested = []
+        self.ingest_stats = []
+        started = time.monotonic()
         
         for pdf_file in pdf_files:
-            text = self._extract_pdf_text(pdf_file)
-            if not text.strip():
-                logger.warning(f"No text in {pdf_file.name}")
-                continue
-            
-            chunks = self._chunk_text(text)
-            
-            # Preparing data
-            ids = []
-            metadatas = []
-            for i, chunk in enumerate(chunks):
-                ids.append(f"{pdf_file.stem}_chunk_{i}")
-                metadatas.append({
-                    "source": pdf_file.name,
-                    "chunk_index": i
-                })
+            try:
+                if self.ingest_file(pdf_file):
+                    ingested.append(pdf_file.name)
+            except Exception as e:
+                logger.error(f"❌ Error ingesting {pdf_file.name}: {e}")
+        
+        if self.ingest_stats:
+            total = sum(s["chunks"] for s in self.ingest_stats)
+            kept = sum(s["kept"] for s in self.ingest_stats)
+            logger.info(f"📊 Embedded {kept}/{total} chunks ({total - kept} duplicates skipped) "
+                        f"in {time.monotonic() - started:.1f}s")
+            if self.embedding_cache:
+                summary = self.embedding_cache_summary()
+                logger.info(f"🧠 Embedding cache: {summary['hits']}/{summary['lookups']} hits "
+                            f"({summary['hit_rate']:.0%}), {summary['misses']} chunks embedded")
+        self.publish_changes(ingested)
+    
+    def embedding_cache_summary(self):
+        """Embedding cache hits and misses over the last ingest_papers run"""
+        hits = sum(s.get("embed_cache_hits", 0) for s in self.ingest_stats)
+        misses = sum(s.get("embed_cache_misses", 0) for s in self.ingest_stats)
+        lookups = hits + misses
+        return {"hits": hits, "misses": misses, "lookups": lookups,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
+    
+    def reindex(self):
+        """Rebuilding the collection from papers/ with the current chunking settings"""
+        self.reset_database()
+        self.collection = self._open_collection()
+        for tool in self.tools:
+            if isinstance(tool, RAGTool):
+                tool.collection = self.collection
+        # The dedup index described the old chunks
+        self.dedup = None
+        self.ingest_papers()
+    
+    def _open_collection(self):
+        return self.client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embed_fn
+        )
+    
+    def ingest_file(self, pdf_file, replace=False, throttle=None):
+        """
+        Ingesting a single PDF
+        
+        Args:
+            pdf_file: Path to the PDF
+            replace: Re-ingest even if present (old chunks of the paper are removed first)
+            throttle: Optional callable(seconds_spent) invoked between batches to bound CPU use
             
+        Returns:
+            Number of chunks added (0 if skipped)
+        """
+        pdf_file = Path(pdf_file)
+        
+        if replace:
+            self.remove_source(pdf_file.name)
+        else:
             # Checking if already exists
             try:
-                existing = self.collection.get(ids=ids[:1])
+                existing = self.collection.get(ids=[f"{pdf_file.stem}_chunk_0"])
                 if existing["ids"]:
                     logger.info(f"Skipping {pdf_file.name} (already ingested)")
-                    continue
-            except:
+                    return 0
+            except Exception:
                 pass
-            
-            # Adding  to collection
-            try:
-                self.collection.add(
-                    documents=chunks,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                logger.info(f"✅ Ingested {pdf_file.name} ({len(chunks)} chunks)")
-            except Exception as e:
-                logger.error(f"❌ Error ingesting {pdf_file.name}: {e}")
+        
+        document = self._read_pdf(pdf_file)
+        text = document["text"]
+        if not text.strip():
+            logger.warning(f"No text in {pdf_file.name}")
+            return 0
+        
+        # Stripping boilerplate before chunking so it never reaches the embedding model
+        stats = {"source": pdf_file.name, "reference_chars": 0, "boilerplate_lines": 0, "exact": 0, "near": 0,
+                 "embed_cache_hits": 0, "embed_cache_misses": 0}
+        if self.config.get("dedup_strip_boilerplate", True):
+            text, stats["boilerplate_lines"] = strip_repeated_lines(text)
+        if self.config.get("dedup_strip_references", True):
+            text, stats["reference_chars"] = strip_references(text)
+        
+        # Chunking with page/section markers, then mapping each chunk back to its page and section
+        # (with hierarchical chunks these are the parents, split into children below)
+        text, headings = mark_sections(text)
+        chunk_size = self.config.get("parent_chunk_size", 2000) if self.parent_store else None
+        annotated = annotate_chunks(self._chunk_text(text, chunk_size), headings)
+        annotated = [(chunk, meta) for chunk, meta in annotated if chunk]
+        stats["chunks"] = len(annotated)
+        
+        # Dropping chunks that (nearly) repeat ones already in the index
+        dedup = self._dedup_index()
+        if dedup is not None:
+            kept, dropped = dedup.filter_chunks([chunk for chunk, _ in annotated], pdf_file.name)
+            annotated = [annotated[i] for i in kept]
+            stats.update(dropped)
+        stats["kept"] = len(annotated)
+        
+        # Preparing data (Chroma metadata can't hold None, so unknown fields are left out)
+        paper_meta = {k: document[k] for k in ("title", "year") if document.get(k)}
+        ids = []
+        chunks = []
+        metadatas = []
+        if self.parent_store:
+            # Small children are embedded for search and point at their parent section
+            child_size = self.config.get("child_chunk_size", 400)
+            parents = []
+            for j, (parent, chunk_meta) in enumerate(annotated):
+                parent_id = f"{pdf_file.stem}_parent_{j}"
+                parents.append((parent_id, pdf_file.name, parent,
+                                {"source": pdf_file.name, **paper_meta, **chunk_meta}))
+                for start, end in split_children(parent, child_size):
+                    ids.append(f"{pdf_file.stem}_chunk_{len(chunks)}")
+                    metadatas.append({
+                        "source": pdf_file.name,
+                        "chunk_index": len(chunks),
+                        **paper_meta,
+                        **chunk_meta,
+                        "parent_id": parent_id,
+                        "start": start,
+                        "end": end
+                    })
+                    chunks.append(parent[start:end].strip())
+            # Parents go in first so a searchable child never lacks its parent
+            self.parent_store.put_many(parents)
+            stats["children"] = len(chunks)
+        else:
+            for i, (chunk, chunk_meta) in enumerate(annotated):
+                ids.append(f"{pdf_file.stem}_chunk_{i}")
+                chunks.append(chunk)
+                metadatas.append({
+                    "source": pdf_file.name,
+                    "chunk_index": i,
+                    **paper_meta,
+                    **chunk_meta
+                })
+        
+        # Adding to collection in batches so queries keep being served in between
+        batch_size = self.config.get("ingest_batch_size", 64)
+        for start in range(0, len(chunks), batch_size):
+            started = time.monotonic()
+            batch = chunks[start:start + batch_size]
+            # Reusing cached vectors; only unseen chunk texts reach the embedding model
+            embeddings = self.embedding_cache.embed(batch, self.embed_fn, stats) if self.embedding_cache else None
+            self.collection.add(
+                documents=batch,
+                embeddings=embeddings,
+                metadatas=metadatas[start:start + batch_size],
+                ids=ids[start:start + batch_size]
+            )
+            if throttle:
+                throttle(time.monotonic() - started)
+        
+        self.ingest_stats.append(stats)
+        logger.info(f"✅ Ingested {pdf_file.name} ({stats['kept']}/{stats['chunks']} chunks kept, "
+                    f"{stats['exact']} exact + {stats['near']} near duplicates, "
+                    f"{stats['embed_cache_hits']} cached embeddings, "
+                    f"{len(chunks)} vectors indexed, "
+                    f"{stats['boilerplate_lines']} boilerplate lines, {stats['reference_chars']} reference chars stripped)")
+        return len(chunks)
     
-    def _extract_pdf_text(self, pdf_path):
-        """Extracting text from PDF"""
-        text = ""
+    def _dedup_index(self):
+        """Building the near-duplicate index on first use, seeded with the chunks already stored"""
+        if not self.config.get("dedup_enabled", True):
+            return None
+        if self.dedup is None:
+            self.dedup = NearDuplicateIndex.from_config(self.config)
+            # Hierarchical papers are deduplicated at the parent level
+            if self.parent_store:
+                for parent_id, source, content in self.parent_store.iter_all():
+                    self.dedup.add(parent_id, content, source=source)
+            page_size = 1000
+            offset = 0
+            while True:
+                page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    if (metadata or {}).get("parent_id"):
+                        continue
+                    self.dedup.add(chunk_id, document, source=(metadata or {}).get("source"))
+                if len(page["ids"]) < page_size:
+                    break
+                offset += page_size
+            logger.info(f"♻️ Dedup index seeded with {len(self.dedup)} stored chunks")
+        return self.dedup
+    
+    def remove_source(self, source):
+        """Deleting all chunks of a paper from the collection"""
+        if self.dedup is not None:
+            self.dedup.remove_source(source)
+        try:
+            self.collection.delete(where={"source": source})
+        except Exception as e:
+            logger.warning(f"⚠️ Could not remove old chunks of {source}: {e}")
+        if self.parent_store:
+            self.parent_store.remove_source(source)
+    
+    def publish_changes(self, sources, action="ingest"):
+        """Bumping the collection version and dropping cache entries citing changed papers"""
+        if not sources:
+            return
+        # Cached answers citing re-ingested papers may now be stale
+        if self.answer_cache:
+            self.answer_cache.invalidate_sources(sources)
+        self.collection_version.bump(sources, action=action)
+    
+    def _read_pdf(self, pdf_path):
+        """Extracting text (pages separated by PAGE_BREAK) plus title and year from a PDF"""
+        pages = []
+        info = None
         try:
             with open(pdf_path, 'rb') as f:
                 pdf = PyPDF2.PdfReader(f)
+                info = pdf.metadata
                 for page in pdf.pages:
-                    text += page.extract_text() or ""
+                    pages.append(page.extract_text() or "")
         except Exception as e:
             logger.error(f"Error reading PDF {pdf_path.name}: {e}")
-        return text
+        
+        first_page = pages[0] if pages else ""
+        return {
+            # Page breaks on their own line so running headers/footers stay separate lines
+            "text": f"\n{PAGE_BREAK}\n".join(pages),
+            "title": guess_title(first_page, info),
+            "year": guess_year(first_page, info),
+            "pages": len(pages),
+        }
     
-    def _chunk_text(self, text):
+    def _chunk_text(self, text, chunk_size=None):
         """Splitting text into chunks with overlap"""
-        chunk_size = self.config["chunk_size"]
+        chunk_size = chunk_size or self.config["chunk_size"]
         overlap = self.config["chunk_overlap"]
         
         # Simple sentence-aware chunking
@@ -146,14 +389,41 @@ class SimpleRAG:
         
         return chunks
     
-    def query(self, question):
+    def _invalidate_answer_cache(self, changed_sources):
+        """Dropping answers citing papers another process re-ingested (all of them if unknown)"""
+        if changed_sources is None:
+            self.answer_cache.clear()
+        else:
+            self.answer_cache.invalidate_sources(changed_sources)
+    
+    def query(self, question, use_cache=True):
         """Querying the RAG system"""
-        return self.agent.run(question)
+        # The base agent has no verifier: its answers are cached only with the
+        # answer_cache_store_unverified opt-in, tagged as unverified
+        unverified = self.config.get("answer_cache_store_unverified", False)
+        use_cache = use_cache and self.answer_cache is not None and (
+            unverified or not self.answer_cache.require_verified
+        )
+        if use_cache:
+            cached = self.answer_cache.lookup(question, mode="base", verified_only=False)
+            if cached:
+                return cached
+        
+        result = self.agent.run(question)
+        
+        if use_cache:
+            self.answer_cache.store(question, result, mode="base", allow_unverified=unverified)
+        return result
     
     def reset_database(self):
         """Deleting and recreate collection"""
         try:
-            self.client.delete_collection("research_papers_v2")
+            self.client.delete_collection(COLLECTION_NAME)
+            if self.parent_store:
+                self.parent_store.clear()
+            if self.answer_cache:
+                self.answer_cache.clear()
+            self.collection_version.bump([], action="reset")
             logger.info("✅ Database reset successful")
         except Exception as e:
             logger.error(f"❌ Error resetting database: {e}")
\ No newline at end of file
@@ -0,0 +1,410 @@
+"""
+Long-lived HTTP server keeping the RAG stack warm between queries.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 8000] [--workers 4] [--watch]
+
+Endpoints:
+    POST /query     {"question", "verify", "memory", "cache", "mode", "max_iterations", "deadline", "stream"}
+    POST /retrieve  {"query", "n_results"}
+    POST /ingest    {"path"}   (queues one PDF, or rescans papers/ when no path is given)
+    GET  /stats
+    GET  /health
+
+With "stream": true, /query answers with newline-delimited JSON events
+(one per agent step, then an "end" event with the result).
+"""
+import os
+import sys
+import json
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from rag import SimpleRAG
+from agents.react_agent import AdvancedReactAgent
+from agents.verifier_agent import VerifierAgent
+from agents.model_router import ModelRouter
+from agents.prefetch import SpeculativePrefetcher
+from agents.pre_verifier import LocalPreVerifier
+from utils.memory import MemoryLayer
+from utils.memory_store import LongTermMemoryStore
+from utils.prompt_manager import PromptManager, PromptType
+from utils.pddl_context import PDDLContextIndex
+from utils.ingest_queue import file_fingerprint
+from utils.ingest_worker import IngestWorker
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent.resolve()
+
+
+class ServerBusy(Exception):
+    """Raised when the worker pool queue is full"""
+
+
+class StreamingEventSink:
+    """Event-log stand-in writing each event to the client as a chunked NDJSON line."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def append(self, event_type, **payload):
+        line = json.dumps({"type": event_type, "ts": time.time(), **payload}, ensure_ascii=False, default=str)
+        self.write_chunk((line + "\n").encode("utf-8"))
+
+    def write_chunk(self, data: bytes):
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away; the query still finishes so caches/memory stay consistent
+                self.closed = True
+
+    def close(self):
+        with self._lock:
+            if not self.closed:
+                try:
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.closed = True
+
+
+class RAGService:
+    """
+    Warm RAG stack shared by all requests: embedding model, Chroma clients, prompts,
+    router, scheduler, caches and one agent per prompt mode are built once; queries run
+    on a bounded worker pool with request-scoped run state.
+    """
+
+    def __init__(self, api_key, tavily_api_key, workers: int = 4, max_queue: int = 32,
+                 watch: bool = False):
+        self.api_key = api_key
+        self.rag = SimpleRAG(
+            api_key=api_key,
+            tavily_api_key=tavily_api_key,
+            papers_folder=str(BASE_DIR / "papers"),
+            chroma_db_path=BASE_DIR / "chroma_db"
+        )
+        config = self.rag.config
+
+        self.router = ModelRouter.from_config(config) if config.get("model_routing_enabled") else None
+        self.verifier = VerifierAgent(api_key, router=self.router, config=config, scheduler=self.rag.scheduler)
+        self.memory_store = LongTermMemoryStore(
+            BASE_DIR / config["memory_db_path"],
+            embed_fn=self.rag.retriever.embed_fn
+        )
+        # Shared memory layer; every query opens its own MemorySession
+        self.memory = MemoryLayer(
+            store=self.memory_store,
+            fsync=config.get("session_log_fsync", "step"),
+            compression=config.get("session_log_compression")
+        )
+        self.prefetcher = None
+        if config.get("prefetch_enabled"):
+            tools = {tool.name: tool for tool in self.rag.tools}
+            self.prefetcher = SpeculativePrefetcher.from_config(tools, config)
+        self.pre_verifier = None
+        if config.get("pre_verifier_enabled"):
+            self.pre_verifier = LocalPreVerifier.from_config(config, self.rag.retriever.embed_fn)
+
+        self._prompts = {}
+        self._agents = {}
+        self._prompts_lock = threading.Lock()
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-worker")
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        self.ingest_worker = IngestWorker.from_config(self.rag, BASE_DIR)
+        self._drain_lock = threading.Lock()
+        if watch:
+            self.ingest_worker.start()
+
+        self.started_at = time.time()
+        self._metrics_lock = threading.Lock()
+        self._latencies = {}
+        self._counts = {}
+
+        # Warming up the embedding model so the first request doesn't pay for it
+        self.rag.retriever.embed_fn(["warm up"])
+        logger.info(f"🔥 RAG service ready ({workers} workers)")
+
+    def _prompt_manager(self, mode: PromptType) -> PromptManager:
+        with self._prompts_lock:
+            if mode not in self._prompts:
+                context_index = None
+                if mode == PromptType.PDDL and self.rag.config.get("pddl_context_top_k"):
+                    context_index = PDDLContextIndex.from_config(self.rag.retriever.embed_fn, self.rag.config)
+                self._prompts[mode] = PromptManager(mode=mode, context_index=context_index)
+            return self._prompts[mode]
+
+    def _agent(self, mode: PromptType) -> AdvancedReactAgent:
+        """One warm agent per prompt mode, shared by all concurrent queries"""
+        prompt_manager = self._prompt_manager(mode)
+        with self._prompts_lock:
+            if mode not in self._agents:
+                self._agents[mode] = AdvancedReactAgent(
+                    api_key=self.api_key,
+                    tools=self.rag.tools,
+                    config=self.rag.config,
+                    verifier=self.verifier,
+                    memory=self.memory,
+                    prompt_manager=prompt_manager,
+                    answer_cache=self.rag.answer_cache,
+                    embed_fn=self.rag.retriever.embed_fn,
+                    router=self.router,
+                    scheduler=self.rag.scheduler,
+                    prefetcher=self.prefetcher,
+                    pre_verifier=self.pre_verifier,
+                    web_cache=self.rag.web_cache
+                )
+            return self._agents[mode]
+
+    def submit(self, fn, *args, **kwargs):
+        """Running fn on the worker pool, rejecting work when the queue is full"""
+        with self._pending_lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise ServerBusy(f"{self._pending} requests pending")
+            self._pending += 1
+        try:
+            return self.executor.submit(fn, *args, **kwargs).result()
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def record(self, endpoint, seconds, ok=True):
+        """Recording request latency for /stats"""
+        with self._metrics_lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=2000)).append(seconds)
+            counts = self._counts.setdefault(endpoint, {"ok": 0, "error": 0})
+            counts["ok" if ok else "error"] += 1
+
+    def query(self, payload, event_sink=None):
+        """Answering a question with the ReAct agent"""
+        question = (payload.get("question") or "").strip()
+        if not question:
+            raise ValueError("'question' is required")
+        mode = PromptType(payload.get("mode", "base"))
+        use_memory = bool(payload.get("memory", False))
+        use_verifier = bool(payload.get("verify", False))
+        deadline = payload.get("deadline")
+        if deadline is not None:
+            try:
+                deadline = float(deadline)
+            except (TypeError, ValueError):
+                raise ValueError("'deadline' must be a number of seconds")
+            if not deadline > 0:
+                raise ValueError("'deadline' must be a positive number of seconds")
+
+        # Shared warm agent; run state (memory session, steps, metrics) is per request
+        return self._agent(mode).run(
+            question,
+            max_iterations=payload.get("max_iterations"),
+            use_verifier=use_verifier,
+            use_memory=use_memory,
+            use_cache=payload.get("cache", True),
+            event_log=event_sink,
+            prompt_mode=mode,
+            deadline=deadline
+        )
+
+    def retrieve(self, payload):
+        """Returning raw retrieval results"""
+        query = (payload.get("query") or "").strip()
+        if not query:
+            raise ValueError("'query' is required")
+        n_results = int(payload.get("n_results", self.rag.config.get("top_k_results", 5)))
+        return {"documents": self.rag.retriever.retrieve(query, n_results=n_results)}
+
+    def ingest(self, payload):
+        """Queueing a PDF (or rescanning papers/) for the background ingest worker"""
+        path = payload.get("path")
+        if path:
+            path = Path(path)
+            if not path.is_absolute():
+                path = self.rag.papers_folder / path
+            if not path.exists() or path.suffix.lower() != ".pdf":
+                raise ValueError(f"Not a PDF: {path}")
+            self.ingest_worker.queue.enqueue(str(path.resolve()), file_fingerprint(path))
+            queued = 1
+        else:
+            queued = self.ingest_worker.scan()
+        if not self.ingest_worker._thread:
+            # No watcher thread running; draining the queue in the background once
+            threading.Thread(target=self._drain_ingest_queue, daemon=True).start()
+        return {"queued": queued, "jobs": self.ingest_worker.queue.counts()}
+
+    def _drain_ingest_queue(self):
+        # One drainer at a time so the worker's CPU bound holds
+        if not self._drain_lock.acquire(blocking=False):
+            return
+        try:
+            while self.ingest_worker.process_one():
+                pass
+        finally:
+            self._drain_lock.release()
+
+    def stats(self):
+        """Collecting server, scheduler, router and cache metrics"""
+        with self._metrics_lock:
+            endpoints = {}
+            for endpoint, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                endpoints[endpoint] = {
+                    **self._counts[endpoint],
+                    "p50": round(ordered[len(ordered) // 2], 4),
+                    "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 4),
+                    "max": round(ordered[-1], 4),
+                }
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "workers": self.workers,
+            "pending": self._pending,
+            "endpoints": endpoints,
+            "documents": self.rag.collection.count(),
+            "collection_version": self.rag.collection_version.version,
+            "scheduler": self.rag.scheduler.get_metrics(),
+            "router": self.router.get_stats() if self.router else {},
+            "prefetch": self.prefetcher.get_stats() if self.prefetcher else {},
+            "pre_verifier": self.pre_verifier.get_stats() if self.pre_verifier else {},
+            "answer_cache": dict(self.rag.answer_cache.stats) if self.rag.answer_cache else {},
+            "compression": self.rag.compressor.get_stats() if self.rag.compressor else {},
+            "embedding_cache": self.rag.embedding_cache.get_stats() if self.rag.embedding_cache else {},
+            "web_cache": self.rag.web_cache.get_stats() if self.rag.web_cache else {},
+            "ingest": self.ingest_worker.get_stats(),
+        }
+
+
+def make_handler(service: RAGService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug(f"🌐 {self.address_string()} {format % args}")
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            if not length:
+                return {}
+            return json.loads(self.rfile.read(length))
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send_json(200, service.stats())
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            routes = {"/query": service.query, "/retrieve": service.retrieve, "/ingest": service.ingest}
+            handler = routes.get(self.path)
+            if handler is None:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            start_time = time.monotonic()
+            ok = False
+            try:
+                payload = self._read_json()
+                if self.path == "/query" and payload.get("stream"):
+                    self._stream_query(payload)
+                else:
+                    self._send_json(200, service.submit(handler, payload))
+                ok = True
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {"error": str(e)})
+            except ServerBusy as e:
+                self._send_json(503, {"error": f"Server busy: {e}"})
+            except Exception as e:
+                logger.exception(f"❌ {self.path} failed")
+                self._send_json(500, {"error": str(e)})
+            finally:
+                service.record(self.path, time.monotonic() - start_time, ok)
+
+        def _stream_query(self, payload):
+            """Streaming agent steps as NDJSON while the query runs on the pool"""
+            if not (payload.get("question") or "").strip():
+                raise ValueError("'question' is required")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            sink = StreamingEventSink(self.wfile)
+            try:
+                # The agent appends each step and the final 'end' event to the sink
+                service.submit(service.query, payload, sink)
+            except Exception as e:
+                sink.append("error", error=str(e))
+                logger.exception("❌ Streaming query failed")
+            finally:
+                sink.close()
+
+    return Handler
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    tavily_api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key or not tavily_api_key:
+        print("❌ Error: OPENROUTER_API_KEY and TAVILY_API_KEY must be set in .env")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+
+    def option(name, default, cast=str):
+        return cast(args[args.index(name) + 1]) if name in args and args.index(name) + 1 < len(args) else default
+
+    host = option("--host", "127.0.0.1")
+    port = option("--port", 8000, int)
+    service = RAGService(
+        api_key,
+        tavily_api_key,
+        workers=option("--workers", 4, int),
+        watch="--watch" in args
+    )
+
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"🌐 Serving on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.ingest_worker.stop(timeout=5)
+        service.executor.shutdown(wait=False)
+        if service.prefetcher:
+            service.prefetcher.close()
+
+
+if __name__ == "__main__":
+    main()
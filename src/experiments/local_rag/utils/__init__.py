@@ -1,6 +1,20 @@
 from .config import DEFAULT_CONFIG
-from .memory import MemoryLayer
+from .memory import MemoryLayer, MemorySession
 from .prompt_manager import PromptManager
 from .tools import Tool, RAGTool, WebSearchTool, VectorStoreRetriever
+from .compression import ObservationCompressor
+from .answer_cache import SemanticAnswerCache
+from .memory_store import LongTermMemoryStore
+from .scheduler import RequestScheduler
+from .ingest_queue import IngestJobQueue, CollectionVersion
+from .ingest_worker import IngestWorker
+from .dedup import NearDuplicateIndex
+from .pddl_context import PDDLContextIndex
+from .embedding_cache import EmbeddingCache
+from .hierarchy import ParentStore
+from .deadline import Deadline, DeadlineExceeded
+from .web_index import WebSessionIndex
+from .web_cache import WebResultCache
+from .profiling import CommandProfiler
 
-__all__ = ['DEFAULT_CONFIG', 'MemoryLayer', 'PromptManager', 'Tool', 'RAGTool', 'WebSearchTool', 'VectorStoreRetriever']
+__all__ = ['DEFAULT_CONFIG', 'MemoryLayer', 'MemorySession', 'PromptManager', 'Tool', 'RAGTool', 'WebSearchTool', 'VectorStoreRetriever', 'ObservationCompressor', 'SemanticAnswerCache', 'LongTermMemoryStore', 'RequestScheduler', 'IngestJobQueue', 'CollectionVersion', 'IngestWorker', 'NearDuplicateIndex', 'PDDLContextIndex', 'EmbeddingCache', 'ParentStore', 'Deadline', 'DeadlineExceeded', 'WebSessionIndex', 'WebResultCache', 'CommandProfiler']
@@ -0,0 +1,238 @@
+import json
+import re
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+from utils.embeddings import embed_texts
+
+logger = logging.getLogger(__name__)
+
+# Matches "[Document 1 - Source: paper.pdf, p. 3, Section: Method]", "[Source: https://...]" and "[1] From paper.pdf:"
+_SOURCE_PATTERNS = [
+    re.compile(r"Source:\s*([^\]\n]+?)(?:,\s*(?:p\.|Section:)[^\]\n]*)?\]"),
+    re.compile(r"^\[\d+\] From (.+?):$", re.MULTILINE),
+]
+
+
+def _mode_name(mode) -> str:
+    """Prompt mode as stored in entries (PromptType or plain string, 'base' by default)"""
+    return getattr(mode, "value", mode) or "base"
+
+
+def is_verified(verification: Optional[Dict[str, Any]], trust_local: bool = False) -> bool:
+    """Whether a verdict counts as verified: a pass from the LLM verifier (local passes only if trusted)"""
+    verification = verification or {}
+    return verification.get("verdict") == "pass" and (trust_local or verification.get("source") != "local")
+
+
+def extract_sources(steps: Iterable[Dict[str, Any]]) -> List[str]:
+    """Collecting the sources cited in tool observations of a run"""
+    sources = []
+    for step in steps:
+        observation = step.get("observation") or ""
+        for pattern in _SOURCE_PATTERNS:
+            for match in pattern.findall(observation):
+                source = match.strip()
+                if source and source not in sources:
+                    sources.append(source)
+    return sources
+
+
+class SemanticAnswerCache:
+    """
+    Caches verified answers by question embedding so paraphrased questions
+    can be answered without running the agent loop again.
+
+    Entries are kept per prompt mode. Answers of runs without a verifier can be stored
+    explicitly as unverified; they are only served to lookups that accept them.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        cache_path=None,
+        max_entries: int = 256,
+        similarity_threshold: float = 0.9,
+        require_verified: bool = True,
+        trust_local: bool = False
+    ):
+        self.embed_fn = embed_fn
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.require_verified = require_verified
+        # Whether passes of the local pre-verifier count as verified
+        self.trust_local = trust_local
+
+        self._entries = OrderedDict()  # (mode, question) -> entry, oldest first
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+        self._load()
+
+    def lookup(self, question: str, mode=None, verified_only: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """
+        Looking up a cached answer for a question
+
+        Args:
+            question: Question to answer
+            mode: Prompt mode of the run; only answers cached from the same mode are served
+            verified_only: Skipping unverified entries (defaults to require_verified)
+
+        Returns:
+            Result dict in agent.run format with 'cached' and 'cache' provenance, or None
+        """
+        mode = _mode_name(mode)
+        if verified_only is None:
+            verified_only = self.require_verified
+        query_vec = embed_texts(self.embed_fn, [question])[0]
+
+        with self._lock:
+            best_key, best_score = None, -1.0
+            for key, entry in self._entries.items():
+                if entry["mode"] != mode or (verified_only and not entry["verified"]):
+                    continue
+                score = float(np.dot(query_vec, entry["embedding"]))
+                if score > best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None or best_score < self.similarity_threshold:
+                self.stats["misses"] += 1
+                return None
+
+            # Marking as most recently used
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            self.stats["hits"] += 1
+
+        logger.info(f"⚡ Answer cache hit (similarity: {best_score:.3f}) for: {entry['question'][:80]}")
+        return {
+            "answer": entry["answer"],
+            "steps": [],
+            "iterations": 0,
+            "success": True,
+            "verification": entry.get("verification"),
+            "cached": True,
+            "cache": {
+                "similarity": round(best_score, 4),
+                "question": entry["question"],
+                "mode": entry["mode"],
+                "verified": entry["verified"],
+                "sources": entry["sources"],
+                "created_at": entry["created_at"],
+            },
+        }
+
+    def store(self, question: str, result: Dict[str, Any], mode=None, allow_unverified: bool = False) -> bool:
+        """
+        Storing a successful (and, if required, verified) result
+
+        Args:
+            question: Question the result answers
+            result: agent.run result
+            mode: Prompt mode of the run
+            allow_unverified: Storing the answer tagged as unverified even when
+                require_verified is set (for callers without a verifier)
+        """
+        if not result.get("success") or result.get("cached"):
+            return False
+
+        verification = result.get("verification") or {}
+        verified = is_verified(verification, self.trust_local)
+        if not verified and self.require_verified and not allow_unverified:
+            logger.debug("Not caching unverified answer")
+            return False
+
+        # Unverified answers are only worth keeping while re-ingestion can invalidate them
+        sources = extract_sources(result.get("steps", []))
+        if not verified and not sources:
+            logger.debug("Not caching unverified answer without cited sources")
+            return False
+
+        embedding = embed_texts(self.embed_fn, [question])[0]
+        entry = {
+            "question": question,
+            "mode": _mode_name(mode),
+            "answer": result.get("answer", ""),
+            "verification": verification or None,
+            "verified": verified,
+            "sources": sources,
+            "created_at": datetime.utcnow().isoformat(),
+            "embedding": embedding,
+        }
+
+        key = (entry["mode"], question)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._save()
+
+        logger.info(f"💾 Cached {'verified' if verified else 'unverified'} {entry['mode']} answer "
+                    f"({len(sources)} sources)")
+        return True
+
+    def invalidate_sources(self, sources: Iterable[str]) -> int:
+        """Dropping every entry that cited one of the given sources"""
+        sources = set(sources)
+        if not sources:
+            return 0
+
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if sources.intersection(e["sources"])]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidations"] += len(stale)
+            if stale:
+                self._save()
+
+        if stale:
+            logger.info(f"🧹 Invalidated {len(stale)} cached answers citing re-ingested sources")
+        return len(stale)
+
+    def clear(self):
+        """Removing all cached answers"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            for record in records[-self.max_entries:]:
+                record["embedding"] = np.asarray(record["embedding"], dtype=np.float32)
+                # Entries from before modes/unverified answers were tracked
+                record.setdefault("mode", "base")
+                record.setdefault("verified", is_verified(record.get("verification"), self.trust_local))
+                self._entries[(record["mode"], record["question"])] = record
+            logger.info(f"📂 Loaded {len(self._entries)} cached answers")
+        except Exception as e:
+            logger.error(f"⚠️ Could not load answer cache: {e}")
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        records = [
+            {**entry, "embedding": entry["embedding"].tolist()}
+            for entry in self._entries.values()
+        ]
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        tmp_path.replace(self.cache_path)
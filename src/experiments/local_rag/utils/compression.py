@@ -0,0 +1,159 @@
+import logging
+import threading
+from typing import List, Dict, Any
+
+import numpy as np
+
+from utils.embeddings import embed_texts, cosine_scores
+from utils.text import CHARS_PER_TOKEN, estimate_tokens, split_sentences
+
+logger = logging.getLogger(__name__)
+
+
+class ObservationCompressor:
+    """
+    Extractive compression of retrieved chunks before they are injected into the prompt.
+    Drops near-duplicate chunks, keeps only the sentences closest to the query
+    and enforces a token budget per observation.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        token_budget: int = 600,
+        max_sentences_per_chunk: int = 4,
+        dedup_threshold: float = 0.92,
+        min_sentence_score: float = 0.15
+    ):
+        self.embed_fn = embed_fn
+        self.token_budget = token_budget
+        self.max_sentences_per_chunk = max_sentences_per_chunk
+        self.dedup_threshold = dedup_threshold
+        self.min_sentence_score = min_sentence_score
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "chunks_in": 0,
+            "chunks_deduplicated": 0,
+        }
+
+    @classmethod
+    def from_config(cls, embed_fn, config):
+        """Building a compressor from DEFAULT_CONFIG-style settings"""
+        return cls(
+            embed_fn,
+            token_budget=config.get("compression_token_budget", 600),
+            max_sentences_per_chunk=config.get("compression_max_sentences", 4),
+            dedup_threshold=config.get("compression_dedup_threshold", 0.92),
+            min_sentence_score=config.get("compression_min_score", 0.15),
+        )
+
+    def compress(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Compressing retrieved documents for a query
+
+        Args:
+            query: Search query the documents were retrieved for
+            documents: Dicts with 'content' and 'metadata' (as returned by VectorStoreRetriever.retrieve)
+
+        Returns:
+            New document dicts in the original order with trimmed 'content'
+        """
+        if not documents:
+            return documents
+
+        tokens_in = sum(estimate_tokens(d["content"]) for d in documents)
+        kept = self._drop_near_duplicates(documents)
+
+        # Splitting kept chunks into sentences, remembering where each one came from
+        sentences = []
+        owners = []
+        for doc_idx, doc in enumerate(kept):
+            for sentence in split_sentences(doc["content"]):
+                sentences.append(sentence)
+                owners.append(doc_idx)
+
+        if not sentences:
+            return kept
+
+        # Embedding query and sentences in one batch
+        vectors = embed_texts(self.embed_fn, [query] + sentences)
+        scores = cosine_scores(vectors[0], vectors[1:])
+
+        # Greedily spending the token budget on the best sentences overall
+        selected = {i: [] for i in range(len(kept))}
+        budget = self.token_budget
+        for sent_idx in np.argsort(-scores):
+            sent_idx = int(sent_idx)
+            doc_idx = owners[sent_idx]
+            cost = estimate_tokens(sentences[sent_idx])
+
+            if scores[sent_idx] < self.min_sentence_score and any(selected.values()):
+                break
+            if len(selected[doc_idx]) >= self.max_sentences_per_chunk:
+                continue
+            if cost > budget:
+                continue
+
+            selected[doc_idx].append(sent_idx)
+            budget -= cost
+
+        compressed = []
+        for doc_idx, doc in enumerate(kept):
+            if not selected[doc_idx]:
+                continue
+            # Restoring reading order inside each chunk
+            picked = sorted(selected[doc_idx])
+            compressed.append({
+                **doc,
+                "content": " ... ".join(sentences[i] for i in picked),
+                "compressed": True,
+                "relevance": float(max(scores[i] for i in picked)),
+            })
+
+        # Nothing fit the budget (e.g. one huge "sentence" from a PDF without breaks):
+        # falling back to the kept chunks truncated to an even share of the budget
+        if not compressed:
+            share = max(1, self.token_budget // len(kept)) * CHARS_PER_TOKEN
+            compressed = [{**doc, "content": f"{doc['content'][:share]}...", "truncated": True}
+                          if len(doc["content"]) > share else dict(doc) for doc in kept]
+
+        tokens_out = sum(estimate_tokens(d["content"]) for d in compressed)
+        self._record(len(documents), len(documents) - len(kept), tokens_in, tokens_out)
+        logger.info(f"🗜️ Compressed observation: {tokens_in} → {tokens_out} tokens "
+                    f"({len(documents) - len(kept)} near-duplicate chunks dropped)")
+
+        return compressed
+
+    def _drop_near_duplicates(self, documents):
+        """Removing chunks whose embedding is almost identical to an earlier, higher-ranked chunk"""
+        if len(documents) < 2:
+            return list(documents)
+
+        vectors = embed_texts(self.embed_fn, [d["content"] for d in documents])
+        kept_idx = []
+        for i in range(len(documents)):
+            if any(float(vectors[i] @ vectors[j]) >= self.dedup_threshold for j in kept_idx):
+                continue
+            kept_idx.append(i)
+
+        return [documents[i] for i in kept_idx]
+
+    def _record(self, chunks_in, chunks_dropped, tokens_in, tokens_out):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["chunks_in"] += chunks_in
+            self.stats["chunks_deduplicated"] += chunks_dropped
+            self.stats["tokens_in"] += tokens_in
+            self.stats["tokens_out"] += tokens_out
+
+    def get_stats(self):
+        """Getting cumulative compression statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["reduction"] = (
+            1 - stats["tokens_out"] / stats["tokens_in"] if stats["tokens_in"] else 0.0
+        )
+        return stats
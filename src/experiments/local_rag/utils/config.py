@@ -3,17 +3,147 @@ DEFAULT_CONFIG = {
     "model": "alibaba/tongyi-deepresearch-30b-a3b:free",
     "temperature": 0.3,
     "timeout": 45,
+    "openrouter_url": "https://openrouter.ai/api/v1/chat/completions",
+    "prompt_cache_control": False,      # explicit cache breakpoint on the system message
+    "conversation_mode": "messages",    # messages | string (legacy single growing prompt)
+    "verifier_timeout": 45,
+    
+    # Model routing per step type (first healthy model wins, later ones are fallbacks)
+    "model_routing_enabled": True,
+    "model_routes": {
+        "tool_selection": ["z-ai/glm-4.5-air:free", "alibaba/tongyi-deepresearch-30b-a3b:free"],
+        "synthesis": ["alibaba/tongyi-deepresearch-30b-a3b:free", "z-ai/glm-4.5-air:free"],
+        "verification": ["z-ai/glm-4.5-air:free", "alibaba/tongyi-deepresearch-30b-a3b:free"],
+    },
+    "model_cooldown": 30,               # seconds a rate-limited/timed-out model is demoted
+    
+    # Outbound request scheduling (rate = requests/second, burst = bucket size)
+    "rate_limits": {
+        "openrouter": {"rate": 20 / 60, "burst": 5, "concurrency": 4, "retries": 0},
+        "tavily": {"rate": 1.0, "burst": 5, "concurrency": 2, "retries": 2},
+    },
     
     # Agent settings
     "max_iterations": 3,
     "max_context_tokens": 8000,
     
+    # Adaptive iteration control
+    "stop_confidence_threshold": 0.7,
+    "stop_convergence_threshold": 0.92,
+    "stop_accept_uncertain": True,
+    "verify_tool_steps": False,
+    "query_time_budget": None,          # seconds per query, None = unlimited (default --deadline)
+    "deadline_optional_margin": 10.0,   # seconds left below which verification/compression/web search are skipped
+    "deadline_min_timeout": 1.0,        # shortest timeout handed to a request near the deadline
+    "query_token_budget": None,         # prompt + completion tokens per query
+    
+    # Local pre-verification (clear-cut answers are judged without the LLM verifier)
+    "pre_verifier_enabled": True,
+    "pre_verifier_support_threshold": 0.55,   # sentence similarity counted as supported by the evidence
+    "pre_verifier_pass_share": 0.75,    # supported answer sentences needed to pass locally
+    "pre_verifier_fail_share": 0.2,     # at or below this share the answer fails locally
+    "pre_verifier_min_relevance": 0.3,  # answer-question similarity needed to pass locally
+    "pre_verifier_fail_relevance": 0.15,
+    "pre_verifier_require_citation": False,
+    "pre_verifier_max_evidence": 300,   # most recent evidence sentences compared
+    "pre_verifier_trusted": False,      # local passes count as verified for the answer/web caches
+    
+    # Per-run web result index (fetched web chunks are reused by later searches of the run)
+    "web_index_enabled": True,
+    "web_index_chunk_chars": 600,       # chars per embedded web chunk, cut at sentence ends
+    "web_index_top_k": 4,               # web chunks returned per web_search
+    "web_index_min_score": 0.35,        # chunks below this query similarity are never returned
+    "web_index_reuse_score": 0.6,       # best-chunk similarity that answers a web_search without a request
+    "web_index_max_chunks": 500,
+    
+    # Web result write-back (web chunks behind verified answers kept in a local collection)
+    "web_cache_enabled": False,
+    "web_cache_collection": "web_cache",
+    "web_cache_ttl_days": 14,           # entries older than this are dropped by compaction
+    "web_cache_reuse_score": 0.6,       # best-chunk similarity that answers a web_search locally
+    "web_cache_min_score": 0.35,
+    "web_cache_contribution_score": 0.5,  # answer-sentence similarity for a chunk to count as used
+    "web_cache_compact_interval": 3600,   # seconds between expiry sweeps in the ingest worker
+    
+    # Speculative prefetch (tools run on the raw question during the first LLM call)
+    "prefetch_enabled": True,
+    "prefetch_actions": ["vectorstore_search"],   # add "web_search" to also prefetch Tavily
+    "prefetch_match_threshold": 0.8,    # word overlap between action_input and question
+    "prefetch_workers": 2,
+    
     # RAG settings
     "chunk_size": 1000,
     "chunk_overlap": 200,
     "top_k_results": 5,
     "embedding_model": "all-MiniLM-L6-v2",
     
+    # Hierarchical chunk settings (children are embedded, parents returned to the agent)
+    "hierarchical_chunks_enabled": True,
+    "parent_chunk_size": 2000,          # chars per parent section (replaces chunk_size)
+    "child_chunk_size": 400,            # chars per embedded child, cut at sentence ends
+    "parent_store_path": "./cache/parents.db",
+    "parent_return": "window",          # window | parent
+    "parent_window_chars": 150,         # context kept around matched children
+    "parent_window_children": 2,        # best-matching children per parent shown in a window
+    "child_candidates_multiplier": 4,   # children searched per requested parent
+    
+    # Ingest-time deduplication
+    "dedup_enabled": True,
+    "dedup_method": "minhash",          # minhash | simhash
+    "dedup_threshold": 0.85,            # estimated Jaccard similarity for minhash
+    "dedup_num_perm": 64,
+    "dedup_bands": 16,
+    "dedup_shingle_size": 5,            # words per shingle
+    "dedup_simhash_max_distance": 3,    # Hamming bits for simhash
+    "dedup_strip_references": True,
+    "dedup_strip_boilerplate": True,    # repeated short lines (headers, footers, page numbers)
+    
+    # Background ingestion settings
+    "ingest_batch_size": 64,            # chunks embedded per collection.add call
+    "ingest_queue_path": "./cache/ingest_jobs.db",
+    "ingest_poll_interval": 5.0,        # seconds between papers/ scans
+    "ingest_max_cpu_fraction": 0.5,     # duty cycle of the ingest worker
+    "ingest_max_attempts": 3,
+    "ingest_nice": 10,                  # process niceness for `main.py watch`
+    "ingest_cpu_threads": 2,            # torch threads for `main.py watch`
+    "collection_version_path": "./cache/collection_version.json",
+    "collection_version_poll": 2.0,     # seconds between version checks in retrievers
+    
+    # Embedding cache settings
+    "embedding_cache_enabled": True,    # reuse chunk vectors across re-chunking / reindexing
+    "embedding_cache_path": "./cache/embeddings.db",
+    
+    # PDDL context selection settings
+    "pddl_context_top_k": 6,            # sections injected per query; 0 injects the whole domain
+    "pddl_context_pinned": 1,           # leading sections of each NL file always kept
+    "pddl_context_cache_size": 128,     # cached (query, step) selections
+    
+    # Observation compression settings
+    "compression_enabled": True,
+    "compression_token_budget": 600,
+    "compression_max_sentences": 4,
+    "compression_dedup_threshold": 0.92,
+    "compression_min_score": 0.15,
+    
+    # Semantic answer cache settings
+    "answer_cache_enabled": True,
+    "answer_cache_path": "./cache/answer_cache.json",
+    "answer_cache_max_entries": 256,
+    "answer_cache_threshold": 0.9,
+    "answer_cache_require_verified": True,
+    # Opt-in: SimpleRAG.query (no verifier) also caches its answers, tagged unverified and
+    # served only to SimpleRAG.query itself (AdvancedReactAgent's verified lookups skip them)
+    "answer_cache_store_unverified": False,
+    
+    # Long-term memory settings
+    "memory_db_path": "./memory/long_term.db",
+    "memory_recall_k": 3,
+    "memory_recall_min_score": 0.5,
+    
+    # Session event log settings
+    "session_log_fsync": "step",        # always | step | close | never
+    "session_log_compression": None,    # None | "gzip" | "zstd"
+    
     # Paths
     "chroma_db_path": "./chroma_db",
     "papers_folder": "./papers",
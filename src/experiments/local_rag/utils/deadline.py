@@ -0,0 +1,78 @@
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage would start after the query's deadline has passed"""
+
+
+class Deadline:
+    """
+    Absolute per-query deadline carried through the whole query path.
+
+    Stages ask for their timeout with timeout(default) and get the smaller of their own
+    default and the remaining budget; optional work (verification, compression, web search)
+    checks allows_optional() and is skipped once less than optional_margin seconds remain.
+    A Deadline without seconds never expires.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, optional_margin: float = 10.0,
+                 min_timeout: float = 1.0):
+        if seconds is not None and seconds <= 0:
+            raise ValueError(f"Deadline must be a positive number of seconds, got {seconds}")
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.optional_margin = optional_margin
+        # Floor for per-request timeouts so a nearly spent budget still allows one short call
+        self.min_timeout = min_timeout
+
+    @classmethod
+    def from_config(cls, config, seconds: Optional[float] = None):
+        """Building a deadline from DEFAULT_CONFIG-style settings (seconds overrides the config)"""
+        return cls(
+            seconds if seconds is not None else config.get("query_time_budget"),
+            optional_margin=config.get("deadline_optional_margin", 10.0),
+            min_timeout=config.get("deadline_min_timeout", 1.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (None without a deadline)"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        """Raising DeadlineExceeded if the budget is spent before stage starts"""
+        if self.expired():
+            raise DeadlineExceeded(f"Query deadline ({self.seconds}s) passed before {stage}")
+
+    def timeout(self, default: Optional[float], stage: str = "request") -> Optional[float]:
+        """Timeout for one stage: its default capped by the remaining budget"""
+        if self.expires_at is None:
+            return default
+        self.check(stage)
+        remaining = max(self.remaining(), self.min_timeout)
+        return remaining if default is None else min(default, remaining)
+
+    def allows_optional(self) -> bool:
+        """Whether there is still time for work the answer doesn't strictly need"""
+        return self.expires_at is None or self.remaining() > self.optional_margin
+
+    def report(self):
+        """Summarizing the deadline for the run result"""
+        remaining = self.remaining()
+        return {
+            "budget": self.seconds,
+            "remaining": round(remaining, 3) if remaining is not None else None,
+            "expired": self.expired(),
+        }
@@ -0,0 +1,237 @@
+import re
+import zlib
+import hashlib
+import threading
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.ingest_metadata import PAGE_BREAK
+from utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+# "References", "REFERENCES", "Bibliography" on a line of their own (optionally numbered)
+_REFERENCES_HEADING = re.compile(r"^\s*(?:\d+\.?\s*)?(references|bibliography)\s*$", re.IGNORECASE | re.MULTILINE)
+_APPENDIX_HEADING = re.compile(r"^\s*(?:[A-Z]\.?\s+)?(appendix|supplementary material)\b.*$", re.IGNORECASE | re.MULTILINE)
+
+# Mersenne prime for universal hashing; coefficients stay below 2**31 so a*h+b fits in uint64
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def strip_references(text: str, min_position: float = 0.5) -> Tuple[str, int]:
+    """
+    Removing the reference list (up to an appendix, if one follows)
+
+    Only a heading in the second half of the paper counts, so a "References" line in
+    the table of contents or related work isn't mistaken for the bibliography.
+
+    Returns:
+        (text, number of characters removed)
+    """
+    matches = [m for m in _REFERENCES_HEADING.finditer(text) if m.start() >= len(text) * min_position]
+    if not matches:
+        return text, 0
+    start = matches[-1].start()
+    appendix = _APPENDIX_HEADING.search(text, matches[-1].end())
+    end = appendix.start() if appendix else len(text)
+    return text[:start] + text[end:], end - start
+
+
+def strip_repeated_lines(text: str, min_pages: int = 3, max_chars: int = 100, edge_lines: int = 2) -> Tuple[str, int]:
+    """
+    Dropping running headers and footers (titles, license notices, page numbers)
+
+    Only the first/last edge_lines non-empty lines of each page (pages split on PAGE_BREAK)
+    are candidates: a short line there is dropped when it sits at a page edge on at least
+    min_pages distinct pages, a bare number only when it is at a page edge. Repeated lines
+    in the body ("Algorithm 1", "Input:", table cells) are left alone.
+
+    Returns:
+        (text, number of lines removed)
+    """
+    pages = [page.split("\n") for page in text.split(PAGE_BREAK)]
+
+    def edges(lines):
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        return set(filled[:edge_lines] + filled[-edge_lines:])
+
+    page_edges = [edges(lines) for lines in pages]
+    pages_with = defaultdict(set)
+    for page_no, (lines, positions) in enumerate(zip(pages, page_edges)):
+        for i in positions:
+            line = normalize_text(lines[i])
+            if len(line) <= max_chars and any(ch.isalnum() for ch in line):
+                pages_with[line].add(page_no)
+    boilerplate = {line for line, found_on in pages_with.items() if len(found_on) >= min_pages}
+
+    removed = 0
+    for lines, positions in zip(pages, page_edges):
+        drop = {i for i in positions
+                if normalize_text(lines[i]) in boilerplate or lines[i].strip().isdigit()}
+        removed += len(drop)
+        lines[:] = [line for i, line in enumerate(lines) if i not in drop]
+    return PAGE_BREAK.join("\n".join(lines) for lines in pages), removed
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class NearDuplicateIndex:
+    """
+    Near-duplicate detector for chunks.
+
+    'minhash' estimates Jaccard similarity of word shingles and finds candidates with
+    LSH banding; 'simhash' uses 64-bit SimHash fingerprints with a Hamming-distance
+    threshold (candidates share one of four 16-bit blocks). Exact duplicates are
+    caught first by a hash of the normalised text.
+    """
+
+    def __init__(self, method: str = "minhash", threshold: float = 0.85, num_perm: int = 64,
+                 bands: int = 16, shingle_size: int = 5, simhash_max_distance: int = 3, seed: int = 13):
+        if method not in ("minhash", "simhash"):
+            raise ValueError(f"Unknown dedup method '{method}'. Valid: minhash, simhash")
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.method = method
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.simhash_max_distance = simhash_max_distance
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._exact: Dict[str, str] = {}                       # text hash -> key
+        self._signatures: Dict[str, object] = {}               # key -> signature
+        self._sources: Dict[str, str] = {}                     # key -> source
+        self._buckets = defaultdict(set)                       # (band, band hash) -> keys
+
+    @classmethod
+    def from_config(cls, config):
+        """Building a dedup index from DEFAULT_CONFIG-style settings"""
+        return cls(
+            method=config.get("dedup_method", "minhash"),
+            threshold=config.get("dedup_threshold", 0.85),
+            num_perm=config.get("dedup_num_perm", 64),
+            bands=config.get("dedup_bands", 16),
+            shingle_size=config.get("dedup_shingle_size", 5),
+            simhash_max_distance=config.get("dedup_simhash_max_distance", 3),
+        )
+
+    def __len__(self):
+        return len(self._signatures)
+
+    # Signatures
+
+    def _minhash(self, text):
+        shingles = _shingles(text, self.shingle_size)
+        if not shingles:
+            return None
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    @staticmethod
+    def _simhash(text):
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        votes = np.zeros(64, dtype=np.int64)
+        for word, weight in Counter(words).items():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bits = np.unpackbits(np.frombuffer(digest, dtype=np.uint8))
+            votes += np.where(bits == 1, weight, -weight)
+        return int("".join("1" if v > 0 else "0" for v in votes), 2)
+
+    def _band_keys(self, signature):
+        if self.method == "simhash":
+            return [(i, (signature >> (16 * i)) & 0xFFFF) for i in range(4)]
+        return [(i, hash(signature[i * self.rows:(i + 1) * self.rows].tobytes())) for i in range(self.bands)]
+
+    def _similar(self, a, b) -> bool:
+        if self.method == "simhash":
+            return bin(a ^ b).count("1") <= self.simhash_max_distance
+        return float(np.mean(a == b)) >= self.threshold
+
+    # Lookup and indexing
+
+    def check(self, text: str) -> Tuple[Optional[str], Optional[str], object]:
+        """
+        Looking for a duplicate of text
+
+        Returns:
+            (kind "exact"/"near" or None, key of the matching chunk, signature)
+        """
+        digest = hashlib.sha1(normalize_text(text).lower().encode("utf-8")).hexdigest()
+        signature = self._simhash(text) if self.method == "simhash" else self._minhash(text)
+        with self._lock:
+            match = self._exact.get(digest)
+            if match:
+                return "exact", match, signature
+            if signature is None:
+                return None, None, signature
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates |= self._buckets.get(band_key, set())
+            for key in candidates:
+                if self._similar(signature, self._signatures[key]):
+                    return "near", key, signature
+        return None, None, signature
+
+    def add(self, key: str, text: str, source: str = None, signature=None):
+        """Indexing a kept chunk"""
+        digest = hashlib.sha1(normalize_text(text).lower().encode("utf-8")).hexdigest()
+        if signature is None:
+            signature = self._simhash(text) if self.method == "simhash" else self._minhash(text)
+        with self._lock:
+            self._exact.setdefault(digest, key)
+            self._sources[key] = source
+            if signature is None:
+                return
+            self._signatures[key] = signature
+            for band_key in self._band_keys(signature):
+                self._buckets[band_key].add(key)
+
+    def remove_source(self, source: str):
+        """Forgetting all chunks of a source (before it is re-ingested)"""
+        with self._lock:
+            keys = [k for k, s in self._sources.items() if s == source]
+            for key in keys:
+                signature = self._signatures.pop(key, None)
+                if signature is not None:
+                    for band_key in self._band_keys(signature):
+                        self._buckets[band_key].discard(key)
+                del self._sources[key]
+            if keys:
+                dropped = set(keys)
+                self._exact = {d: k for d, k in self._exact.items() if k not in dropped}
+
+    def filter_chunks(self, chunks: List[str], source: str):
+        """
+        Splitting a paper's chunks into kept ones and duplicates; kept chunks are indexed
+
+        Returns:
+            (indices of kept chunks, {"exact": n, "near": n})
+        """
+        kept = []
+        dropped = {"exact": 0, "near": 0}
+        for i, chunk in enumerate(chunks):
+            kind, match, signature = self.check(chunk)
+            if kind:
+                dropped[kind] += 1
+                logger.debug(f"♻️ {source} chunk {i} is a {kind} duplicate of {match}")
+                continue
+            self.add(f"{source}#{len(kept)}", chunk, source=source, signature=signature)
+            kept.append(i)
+        return kept, dropped
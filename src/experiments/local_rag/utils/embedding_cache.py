@@ -0,0 +1,134 @@
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Hashes looked up per SELECT (SQLite's default variable limit is 999)
+LOOKUP_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Persistent chunk embedding cache in SQLite.
+
+    Vectors are keyed by (model name, sha256 of the whitespace-normalised chunk text), so
+    re-chunking, re-creating the collection or switching collection names only embeds
+    chunk texts the model has never seen. Vectors are stored exactly as the embedding
+    function returned them (float32).
+    """
+
+    def __init__(self, db_path, model_name: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, hash)
+            )
+        """)
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "embed_seconds": 0.0}
+
+    @classmethod
+    def from_config(cls, config, base_dir):
+        """Building the cache from DEFAULT_CONFIG-style settings (None when disabled)"""
+        if not config.get("embedding_cache_enabled", True):
+            return None
+        return cls(
+            Path(base_dir) / config.get("embedding_cache_path", "./cache/embeddings.db"),
+            model_name=config["embedding_model"]
+        )
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes: List[str]):
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), LOOKUP_BATCH):
+                batch = hashes[start:start + LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    (self.model_name, *batch)
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def embed(self, texts: Sequence[str], embed_fn, stats: Optional[Dict] = None) -> List[List[float]]:
+        """
+        Embedding texts, calling embed_fn only for texts not in the cache
+
+        Args:
+            stats: Optional dict whose "embed_cache_hits"/"embed_cache_misses" are incremented
+                (per-paper accounting on top of the cache-wide stats)
+
+        Returns:
+            One vector (list of floats, as Chroma expects) per text, in input order
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found = self._lookup(sorted(set(hashes)))
+
+        # Embedding each missing text once, even if it repeats within the batch
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in found and text_hash not in missing:
+                missing[text_hash] = text
+        if missing:
+            started = time.monotonic()
+            vectors = np.asarray(embed_fn(list(missing.values())), dtype=np.float32)
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, hash, dim, vector) VALUES (?, ?, ?, ?)",
+                    [(self.model_name, text_hash, vector.shape[0], vector.tobytes())
+                     for text_hash, vector in zip(missing, vectors)]
+                )
+                self._conn.commit()
+                self.stats["embed_seconds"] += elapsed
+            found.update(zip(missing, vectors))
+
+        with self._lock:
+            self.stats["misses"] += len(missing)
+            self.stats["hits"] += len(hashes) - len(missing)
+        if stats is not None:
+            stats["embed_cache_hits"] = stats.get("embed_cache_hits", 0) + len(hashes) - len(missing)
+            stats["embed_cache_misses"] = stats.get("embed_cache_misses", 0) + len(missing)
+        return [found[h].tolist() for h in hashes]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)
+            ).fetchone()[0]
+
+    def get_stats(self):
+        """Getting hit/miss statistics since the cache was opened"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["embed_seconds"] = round(stats["embed_seconds"], 3)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
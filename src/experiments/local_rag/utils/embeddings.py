@@ -0,0 +1,29 @@
+from typing import List, Sequence
+import numpy as np
+
+
+def embed_texts(embed_fn, texts: Sequence[str]) -> np.ndarray:
+    """Embedding texts with a Chroma-style embedding function and L2-normalizing the rows"""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    vectors = np.asarray(embed_fn(list(texts)), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def cosine_scores(query_vec: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity of one normalized vector against normalized rows"""
+    if matrix.size == 0:
+        return np.zeros(0, dtype=np.float32)
+    return matrix @ query_vec
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> List[int]:
+    """Indices of the k highest scores, best first"""
+    if scores.size == 0 or k <= 0:
+        return []
+    k = min(k, scores.size)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return sorted(candidates.tolist(), key=lambda i: -scores[i])
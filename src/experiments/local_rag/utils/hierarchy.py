@@ -0,0 +1,177 @@
+import re
+import json
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends where a child chunk may be cut
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_children(text: str, size: int = 400) -> List[Tuple[int, int]]:
+    """
+    Splitting a parent chunk into sentence-aligned child spans of at least `size` characters
+    (the last one may be shorter; a single long sentence is never cut)
+
+    Returns:
+        [(start, end)] character offsets into text, covering it in order
+    """
+    cuts = [m.end() for m in _SENTENCE_END.finditer(text)]
+    spans = []
+    start = 0
+    for cut in cuts + [len(text)]:
+        if cut - start >= size or cut == len(text):
+            if text[start:cut].strip():
+                spans.append((start, cut))
+            start = cut
+    return spans
+
+
+def build_windows(content: str, spans: List[Tuple[int, int]], window_chars: int = 150) -> str:
+    """
+    Cutting the parts of a parent around the matched child spans
+
+    Spans are widened by window_chars on both sides (snapped to whitespace), overlapping
+    windows are merged, and gaps are marked with ' ... '.
+    """
+    widened = []
+    for start, end in sorted(spans):
+        start = max(0, start - window_chars)
+        end = min(len(content), end + window_chars)
+        # Snapping outwards to word boundaries
+        while start > 0 and not content[start - 1].isspace():
+            start -= 1
+        while end < len(content) and not content[end].isspace():
+            end += 1
+        if widened and start <= widened[-1][1]:
+            widened[-1] = (widened[-1][0], max(end, widened[-1][1]))
+        else:
+            widened.append((start, end))
+    parts = [content[start:end].strip() for start, end in widened]
+    prefix = "... " if widened and widened[0][0] > 0 else ""
+    suffix = " ..." if widened and widened[-1][1] < len(content) else ""
+    return prefix + " ... ".join(parts) + suffix
+
+
+class ParentStore:
+    """
+    Parent sections of hierarchical chunks, kept in SQLite outside the vector index.
+    Only the small child chunks are embedded; their metadata points here via parent_id.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS parents (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_parents_source ON parents(source)")
+        self._conn.commit()
+
+    def put_many(self, parents: List[Tuple[str, str, str, Dict]]):
+        """Storing (id, source, content, metadata) rows"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parents (id, source, content, metadata) VALUES (?, ?, ?, ?)",
+                [(pid, source, content, json.dumps(metadata or {}, ensure_ascii=False))
+                 for pid, source, content, metadata in parents]
+            )
+            self._conn.commit()
+
+    def get_many(self, ids: List[str]) -> Dict[str, Dict]:
+        """Fetching parents by id (missing ids are left out)"""
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, content, metadata FROM parents WHERE id IN ({','.join('?' * len(ids))})",
+                list(ids)
+            ).fetchall()
+        return {pid: {"content": content, "metadata": json.loads(metadata or "{}")}
+                for pid, content, metadata in rows}
+
+    def iter_all(self) -> Iterator[Tuple[str, str, str]]:
+        """Yielding (id, source, content) for every stored parent"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, source, content FROM parents").fetchall()
+        yield from rows
+
+    def remove_source(self, source: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM parents WHERE source = ?", (source,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM parents")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def group_by_parent(children: List[Dict], parent_store: Optional[ParentStore], n_results: int,
+                    mode: str = "window", window_chars: int = 150, max_children: int = 2) -> List[Dict]:
+    """
+    Turning ranked child hits into at most n_results deduplicated parent documents
+
+    Parents keep the rank of their best child. In "window" mode only the text around the
+    parent's best max_children matches is returned; "parent" returns the whole section. Children without a
+    parent (collections ingested before hierarchical chunking) stand for themselves.
+    """
+    groups = {}
+    for child in children:
+        metadata = child.get("metadata") or {}
+        key = metadata.get("parent_id") or child["id"]
+        group = groups.get(key)
+        if group is None:
+            if len(groups) >= n_results:
+                continue
+            group = groups[key] = {"best": child, "children": []}
+        group["children"].append(child)
+
+    parents = parent_store.get_many([k for k, g in groups.items()
+                                     if (g["best"].get("metadata") or {}).get("parent_id")]) if parent_store else {}
+    documents = []
+    for key, group in groups.items():
+        best = group["best"]
+        parent = parents.get(key)
+        if parent is None:
+            documents.append(best)
+            continue
+        if mode == "parent":
+            content = parent["content"]
+        else:
+            spans = [((c["metadata"] or {}).get("start", 0), (c["metadata"] or {}).get("end", 0))
+                     for c in group["children"][:max_children]]
+            content = build_windows(parent["content"], spans, window_chars)
+        metadata = {**(best.get("metadata") or {}), **parent["metadata"]}
+        for field in ("start", "end", "chunk_index"):
+            metadata.pop(field, None)
+        documents.append({
+            "id": key,
+            "content": content,
+            "metadata": metadata,
+            "distance": best.get("distance"),
+            "children": len(group["children"]),
+        })
+    return documents
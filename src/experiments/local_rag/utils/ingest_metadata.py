@@ -0,0 +1,106 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Inserted between pages and before headings while text is chunked, removed afterwards
+# (private-use characters, so str.strip() and the chunker leave them alone)
+PAGE_BREAK = "\ue001"
+_HEADING_MARK = re.compile("\ue000(\\d+)\ue000")
+
+_COMMON_SECTIONS = (
+    "abstract", "introduction", "background", "related work", "preliminaries", "method", "methods",
+    "methodology", "approach", "experiments", "experimental setup", "evaluation", "results",
+    "discussion", "limitations", "conclusion", "conclusions", "future work", "acknowledgements",
+    "acknowledgments", "appendix",
+)
+# "3 Method", "4.2 Ablations", "II. RELATED WORK"
+_NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+){0,2}|[IVX]+\.)\s+([A-Z][A-Za-z0-9 ,:\-–&()/]{2,80})$")
+_ARXIV_ID = re.compile(r"arXiv:(\d{2})(\d{2})\.\d{4,5}")
+_YEAR = re.compile(r"\b(19[89]\d|20[0-4]\d)\b")
+_PDF_DATE = re.compile(r"D:(\d{4})")
+
+
+def guess_title(first_page: str, pdf_metadata=None) -> Optional[str]:
+    """Title from the PDF info dictionary, else the first substantial line of page one"""
+    title = getattr(pdf_metadata, "title", None) if pdf_metadata else None
+    if title and len(title.strip()) > 3 and not title.lower().startswith(("microsoft word", "untitled")):
+        return title.strip()
+    for line in (first_page or "").splitlines():
+        line = line.strip()
+        if 10 <= len(line) <= 200 and not _ARXIV_ID.search(line) and not line.lower().startswith("arxiv"):
+            return line
+    return None
+
+
+def guess_year(first_page: str, pdf_metadata=None) -> Optional[int]:
+    """Publication year from an arXiv id, a year on page one, or the PDF creation date"""
+    arxiv = _ARXIV_ID.search(first_page or "")
+    if arxiv:
+        return 2000 + int(arxiv.group(1))
+    year = _YEAR.search(first_page or "")
+    if year:
+        return int(year.group(1))
+    created = pdf_metadata.get("/CreationDate") if pdf_metadata else None
+    match = _PDF_DATE.search(str(created or ""))
+    return int(match.group(1)) if match else None
+
+
+def _heading_name(line: str) -> Optional[str]:
+    stripped = line.strip().rstrip(".:")
+    if not stripped or len(stripped) > 90:
+        return None
+    numbered = _NUMBERED_HEADING.match(stripped)
+    if numbered:
+        return numbered.group(1).strip().title() if numbered.group(1).isupper() else numbered.group(1).strip()
+    if stripped.lower() in _COMMON_SECTIONS:
+        return stripped.title()
+    return None
+
+
+def mark_sections(text: str) -> Tuple[str, List[str]]:
+    """
+    Tagging heading lines with an index marker so chunks can be mapped to sections
+
+    Returns:
+        (marked text, heading names by marker index)
+    """
+    headings = []
+    lines = []
+    for line in text.splitlines():
+        name = _heading_name(line)
+        if name:
+            lines.append(f"\ue000{len(headings)}\ue000 {line}")
+            headings.append(name)
+        else:
+            lines.append(line)
+    return "\n".join(lines), headings
+
+
+def annotate_chunks(chunks: List[str], headings: List[str]) -> List[Tuple[str, Dict]]:
+    """
+    Mapping chunks of marked text to (clean text, {"page", "section"})
+
+    Chunks must be in document order; pages are counted from PAGE_BREAK markers.
+    """
+    annotated = []
+    page = 1
+    section = None
+    for chunk in chunks:
+        # Page breaks before the first word already belong to this chunk's page
+        body = chunk.lstrip(" \n" + PAGE_BREAK)
+        start_page = page + chunk[:len(chunk) - len(body)].count(PAGE_BREAK)
+        page += chunk.count(PAGE_BREAK)
+
+        marks = [int(i) for i in _HEADING_MARK.findall(chunk)]
+        # A chunk opening with a heading belongs to that section
+        starts_with_heading = _HEADING_MARK.match(body) is not None
+        chunk_section = headings[marks[0]] if marks and (starts_with_heading or section is None) else section
+        if marks:
+            section = headings[marks[-1]]
+
+        clean = _HEADING_MARK.sub("", chunk).replace(PAGE_BREAK, " ")
+        clean = re.sub(r"\s{2,}", " ", clean).strip()
+        meta = {"page": start_page}
+        if chunk_section:
+            meta["section"] = chunk_section
+        annotated.append((clean, meta))
+    return annotated
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Versions remembered in the version file so readers can catch up on what changed
+VERSION_HISTORY = 50
+
+
+def file_fingerprint(path) -> str:
+    """Cheap change detector for a file (size + mtime)"""
+    stat = Path(path).stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class IngestJobQueue:
+    """
+    Persistent ingest job queue in SQLite.
+    Jobs survive restarts; jobs left 'running' by a crashed worker are requeued on startup.
+    """
+
+    def __init__(self, db_path, max_attempts: int = 3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                chunks INTEGER,
+                enqueued_at TEXT,
+                updated_at TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON ingest_jobs(status)")
+        # Last successfully ingested fingerprint per file
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                path TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                ingested_at TEXT
+            )
+        """)
+        self._conn.commit()
+        self._requeue_stale()
+
+    def _requeue_stale(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE ingest_jobs SET status = 'pending', updated_at = ? WHERE status = 'running'",
+                (datetime.now().isoformat(),)
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.info(f"♻️ Requeued {cursor.rowcount} interrupted ingest jobs")
+
+    def needs_ingest(self, path, fingerprint) -> bool:
+        """Checking a file against the last ingested and already queued fingerprints"""
+        path = str(path)
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT fingerprint FROM ingested_files WHERE path = ?", (path,)
+            ).fetchone()
+            queued = self._conn.execute(
+                "SELECT 1 FROM ingest_jobs WHERE path = ? AND fingerprint = ? AND status IN ('pending', 'running')",
+                (path, fingerprint)
+            ).fetchone()
+        return not queued and (done is None or done[0] != fingerprint)
+
+    def enqueue(self, path, fingerprint) -> Optional[int]:
+        """Queueing a file; an older pending job for the same path is superseded"""
+        path = str(path)
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ingest_jobs WHERE path = ? AND status = 'pending'", (path,)
+            )
+            cursor = self._conn.execute(
+                "INSERT INTO ingest_jobs (path, fingerprint, enqueued_at, updated_at) VALUES (?, ?, ?, ?)",
+                (path, fingerprint, now, now)
+            )
+            self._conn.commit()
+        logger.info(f"📥 Queued {Path(path).name}")
+        return cursor.lastrowid
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Taking the oldest pending job and marking it running"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, path, fingerprint, attempts FROM ingest_jobs "
+                "WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE ingest_jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (datetime.now().isoformat(), row[0])
+            )
+            self._conn.commit()
+        return {"id": row[0], "path": row[1], "fingerprint": row[2], "attempts": row[3] + 1}
+
+    def complete(self, job, chunks: int = 0):
+        """Marking a job done and remembering the ingested fingerprint"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingest_jobs SET status = 'done', chunks = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (chunks, now, job["id"])
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested_files (path, fingerprint, ingested_at) VALUES (?, ?, ?)",
+                (job["path"], job["fingerprint"], now)
+            )
+            self._conn.commit()
+
+    def fail(self, job, error: str):
+        """Recording a failure; the job is retried until max_attempts"""
+        status = "failed" if job["attempts"] >= self.max_attempts else "pending"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingest_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, str(error)[:1000], datetime.now().isoformat(), job["id"])
+            )
+            self._conn.commit()
+
+    def ingested_paths(self) -> List[str]:
+        """Paths of all files ingested so far"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM ingested_files").fetchall()]
+
+    def forget(self, path):
+        """Dropping a removed file from the ingested set and its pending jobs"""
+        with self._lock:
+            self._conn.execute("DELETE FROM ingested_files WHERE path = ?", (str(path),))
+            self._conn.execute("DELETE FROM ingest_jobs WHERE path = ? AND status = 'pending'", (str(path),))
+            self._conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        """Getting job counts by status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM ingest_jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CollectionVersion:
+    """
+    Monotonic version of the vector collection, published in a small JSON file.
+    Writers bump it after every ingest; readers poll it (mtime first) to refresh caches.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._state = {"version": 0, "updated_at": None, "history": []}
+
+    def read(self) -> Dict[str, Any]:
+        """Reading the published version (re-parsed only when the file changed)"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return dict(self._state)
+        if mtime != self._mtime:
+            try:
+                self._state = json.loads(self.path.read_text(encoding="utf-8"))
+                self._mtime = mtime
+            except (OSError, json.JSONDecodeError):
+                # Half-written by another process; the next poll picks it up
+                pass
+        return dict(self._state)
+
+    @property
+    def version(self) -> int:
+        return self.read().get("version", 0)
+
+    def bump(self, sources: List[str], action: str = "ingest") -> int:
+        """Publishing a new version listing the sources that changed"""
+        with self._lock:
+            state = self.read()
+            version = state.get("version", 0) + 1
+            history = state.get("history", [])
+            history.append({"version": version, "action": action, "sources": list(sources),
+                            "ts": datetime.now().isoformat()})
+            state = {"version": version, "updated_at": datetime.now().isoformat(),
+                     "history": history[-VERSION_HISTORY:]}
+
+            # Atomic replace so readers never see a partial file
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._state = state
+        logger.info(f"🏷️ Collection version {version} ({action}: {', '.join(sources) or '-'})")
+        return version
+
+    def changes_since(self, version: int) -> Optional[List[str]]:
+        """Sources changed after `version`, or None if unknown (history too short or collection reset)"""
+        state = self.read()
+        history = [h for h in state.get("history", []) if h["version"] > version]
+        if state.get("version", 0) > version and (not history or history[0]["version"] > version + 1):
+            return None
+        if any(entry.get("action") == "reset" for entry in history):
+            return None
+        sources = []
+        for entry in history:
+            for source in entry["sources"]:
+                if source not in sources:
+                    sources.append(source)
+        return sources
+
+
+class VersionWatcher:
+    """Polls a CollectionVersion at most every `interval` seconds and reports what changed."""
+
+    def __init__(self, collection_version: CollectionVersion, interval: float = 2.0):
+        self.collection_version = collection_version
+        self.interval = interval
+        self.seen = collection_version.version
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """
+        Returning (new_version, changed sources or None if unknown) when the collection moved on,
+        otherwise None
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked < self.interval:
+                return None
+            self._checked = now
+            current = self.collection_version.version
+            if current <= self.seen:
+                return None
+            changed = self.collection_version.changes_since(self.seen)
+            self.seen = current
+        return current, changed
@@ -0,0 +1,184 @@
+import os
+import time
+import threading
+import logging
+from pathlib import Path
+
+from utils.ingest_queue import IngestJobQueue, file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def limit_cpu(nice: int = 0, threads: int = None):
+    """Lowering this process's priority and capping torch threads for a dedicated ingest process"""
+    if nice and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not renice ingest worker: {e}")
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+class IngestWorker:
+    """
+    Background ingestion: polls the papers folder, queues new or changed PDFs in a
+    persistent job queue and ingests them with a bounded CPU duty cycle.
+    Each finished job bumps the collection version so readers refresh their caches.
+    """
+
+    def __init__(self, rag, queue: IngestJobQueue, papers_folder=None,
+                 poll_interval: float = 5.0, max_cpu_fraction: float = 0.5,
+                 compact_interval: float = 3600):
+        self.rag = rag
+        self.queue = queue
+        self.papers_folder = Path(papers_folder or rag.papers_folder)
+        self.poll_interval = poll_interval
+        self.max_cpu_fraction = min(1.0, max(0.05, max_cpu_fraction))
+        # Seconds between expiry sweeps of the web cache (when the RAG stack has one)
+        self.compact_interval = compact_interval
+        self._last_compaction = None
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"scans": 0, "queued": 0, "ingested": 0, "removed": 0, "failed": 0, "chunks": 0,
+                      "web_cache_expired": 0}
+
+    @classmethod
+    def from_config(cls, rag, base_dir):
+        """Building a worker (and its queue) from DEFAULT_CONFIG-style settings"""
+        config = rag.config
+        queue = IngestJobQueue(
+            Path(base_dir) / config.get("ingest_queue_path", "./cache/ingest_jobs.db"),
+            max_attempts=config.get("ingest_max_attempts", 3)
+        )
+        return cls(
+            rag,
+            queue,
+            poll_interval=config.get("ingest_poll_interval", 5.0),
+            max_cpu_fraction=config.get("ingest_max_cpu_fraction", 0.5),
+            compact_interval=config.get("web_cache_compact_interval", 3600),
+        )
+
+    def scan(self) -> int:
+        """Queueing new/changed PDFs and removing papers whose file disappeared"""
+        self.stats["scans"] += 1
+        if not self.papers_folder.exists():
+            return 0
+
+        queued = 0
+        present = set()
+        for pdf_file in sorted(self.papers_folder.glob("*.pdf")):
+            path = str(pdf_file.resolve())
+            present.add(path)
+            try:
+                fingerprint = file_fingerprint(pdf_file)
+            except FileNotFoundError:
+                continue
+            if self.queue.needs_ingest(path, fingerprint):
+                self.queue.enqueue(path, fingerprint)
+                queued += 1
+
+        removed = [p for p in self.queue.ingested_paths() if p not in present]
+        for path in removed:
+            self.rag.remove_source(Path(path).name)
+            self.queue.forget(path)
+            logger.info(f"🗑️ Removed {Path(path).name} (file deleted)")
+        if removed:
+            self.stats["removed"] += len(removed)
+            self.rag.publish_changes([Path(p).name for p in removed], action="remove")
+
+        self.stats["queued"] += queued
+        return queued
+
+    def _throttle(self, busy_seconds):
+        """Sleeping so ingestion uses at most max_cpu_fraction of wall time"""
+        if self.max_cpu_fraction < 1.0:
+            self._stop.wait(busy_seconds * (1 - self.max_cpu_fraction) / self.max_cpu_fraction)
+
+    def process_one(self) -> bool:
+        """Running the next queued job; returns False when the queue is empty"""
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        path = Path(job["path"])
+        try:
+            if not path.exists():
+                self.queue.complete(job, chunks=0)
+                return True
+            # Skipping files still being copied in; the next scan re-queues them
+            if file_fingerprint(path) != job["fingerprint"]:
+                self.queue.fail(job, "file changed while queued")
+                return True
+            # Files never seen by the queue may already be in the collection from `main.py ingest`;
+            # those are only skipped, known files that changed are replaced
+            replace = job["path"] in self.queue.ingested_paths()
+            chunks = self.rag.ingest_file(path, replace=replace, throttle=self._throttle)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"❌ Ingest job for {path.name} failed (attempt {job['attempts']}): {e}")
+            self.queue.fail(job, str(e))
+            return True
+
+        self.queue.complete(job, chunks=chunks)
+        self.stats["ingested"] += 1
+        self.stats["chunks"] += chunks
+        if chunks:
+            self.rag.publish_changes([path.name])
+        return True
+
+    def compact_web_cache(self, force: bool = False) -> int:
+        """Expiring stale web cache entries at most once per compact_interval"""
+        web_cache = self.rag.web_cache
+        if not web_cache:
+            return 0
+        if not force and self._last_compaction is not None \
+                and time.monotonic() - self._last_compaction < self.compact_interval:
+            return 0
+        self._last_compaction = time.monotonic()
+        try:
+            expired = web_cache.compact()
+        except Exception as e:
+            logger.error(f"❌ Web cache compaction failed: {e}")
+            return 0
+        self.stats["web_cache_expired"] += expired
+        return expired
+
+    def run(self, once: bool = False):
+        """Polling and ingesting until stopped (or until the queue drains when once=True)"""
+        logger.info(f"👀 Watching {self.papers_folder} every {self.poll_interval}s "
+                    f"(max CPU {self.max_cpu_fraction * 100:.0f}%)")
+        while not self._stop.is_set():
+            self.scan()
+            while not self._stop.is_set() and self.process_one():
+                pass
+            self.compact_web_cache()
+            if once:
+                break
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Running the worker in a daemon thread next to query serving"""
+        self._thread = threading.Thread(target=self.run, name="ingest-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self):
+        """Getting worker counters, queue state and the published collection version"""
+        return {
+            **self.stats,
+            "jobs": self.queue.counts(),
+            "collection_version": self.rag.collection_version.version,
+            "embedding_cache": self.rag.embedding_cache.get_stats() if self.rag.embedding_cache else {},
+            "web_cache": self.rag.web_cache.get_stats() if self.rag.web_cache else {},
+        }
@@ -1,38 +1,52 @@
 import json
+import uuid
 from pathlib import Path
 from datetime import datetime
 import logging
 
+from utils.session_log import SessionLog, log_path
+
 logger = logging.getLogger(__name__)
 
-class MemoryLayer:
+
+def new_session_id() -> str:
+    """Unique, time-ordered session id (second-resolution timestamps collide under concurrent queries)"""
+    return f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}"
+
+
+class MemorySession:
     """
-    Tracks conversation history and saves sessions.
+    History of one query run. Sessions are created by MemoryLayer.open_session and
+    are never shared between requests, so concurrent runs can't overwrite each other.
     """
 
-    def __init__(self, memory_dir="memory"):
-        self.output_dir = Path(__file__).parent.parent / memory_dir
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.current_session = None
-        self.history = []
-    
-    def start_session(self, query):
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    def __init__(self, layer, query):
+        self.layer = layer
+        self.store = layer.store
+        session_id = new_session_id()
         self.current_session = {
             "query": query,
-            "timestamp": timestamp,
+            "timestamp": session_id,
             "start_time": datetime.utcnow().isoformat(),
             "steps": []
         }
         self.history = []
-        logger.info(f"📝 Started session: {timestamp}")
+        if self.store:
+            self.store.mark_imported(session_id)
+        
+        self._log = None
+        if layer.log_format == "jsonl":
+            path = log_path(layer.output_dir, f"session_{session_id}", layer.compression)
+            self._log = SessionLog(path, fsync=layer.fsync, compression=layer.compression)
+            self._log.append("start", session=session_id, query=query)
+        logger.info(f"📝 Started session: {session_id}")
+    
+    @property
+    def session_id(self):
+        return self.current_session["timestamp"]
     
     def add_step(self, step_number, step_data):
         """Recording a reasoning step"""
-        if not self.current_session:
-            logger.warning("No active session. Call start_session() first.")
-            return
-        
         record = {
             "step": step_number,
             "timestamp": datetime.utcnow().isoformat(),
@@ -40,20 +54,38 @@ class MemoryLayer:
         }
         self.history.append(record)
         self.current_session["steps"] = self.history
+        
+        if self._log:
+            self._log.append("step", **{k: v for k, v in record.items() if k != "timestamp"})
+        
+        if self.store:
+            try:
+                self.store.add_step(self.session_id, self.current_session["query"], record)
+            except Exception as e:
+                logger.error(f"⚠️ Could not index step in long-term memory: {e}")
+    
+    def recall(self, query, k=3, min_score=0.5):
+        """Recalling relevant steps from previous sessions"""
+        if not self.store:
+            return []
+        return self.store.recall(query, k=k, min_score=min_score, exclude_session=self.session_id)
     
     def save_session(self):
         """Saving session to file"""
-        if not self.current_session:
-            logger.warning("No session to save")
-            return None
-        
-        timestamp = self.current_session["timestamp"]
-        filepath = self.output_dir / f"session_{timestamp}.json"
-        
         # Adding summary
         self.current_session["end_time"] = datetime.utcnow().isoformat()
         self.current_session["total_steps"] = len(self.history)
         
+        # Steps are already on disk; only closing the log
+        if self._log:
+            self._log.append("end", total_steps=len(self.history))
+            self._log.close()
+            filepath = self._log.path
+            self._log = None
+            logger.info(f"💾 Session log closed: {filepath}")
+            return str(filepath)
+        
+        filepath = self.layer.output_dir / f"session_{self.session_id}.json"
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(self.current_session, f, indent=2, ensure_ascii=False)
         
@@ -88,4 +120,79 @@ class MemoryLayer:
             action = step.get("action", "none")
             summary.append(f"Step {step_num}: {thought}... (action: {action})")
         
-        return "\n".join(summary)
\ No newline at end of file
+        return "\n".join(summary)
+
+
+class MemoryLayer:
+    """
+    Tracks conversation history and saves sessions.
+    Steps are streamed to an append-only session_*.jsonl log as they happen
+    (log_format="json" keeps the legacy single-file dump written at the end).
+    Optionally indexes every step into a LongTermMemoryStore for recall across sessions.
+
+    The layer itself only holds shared settings: open_session() returns an independent
+    MemorySession per query. start_session()/add_step()/... keep the single-session
+    API for scripts that run one query at a time.
+    """
+
+    def __init__(self, memory_dir="memory", store=None, log_format="jsonl",
+                 fsync="step", compression=None):
+        self.output_dir = Path(__file__).parent.parent / memory_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.store = store
+        self.log_format = log_format
+        self.fsync = fsync
+        self.compression = compression
+        self._session = None
+        
+        # Indexing sessions saved before the store existed
+        if self.store:
+            self.store.import_sessions(self.output_dir)
+    
+    def open_session(self, query) -> MemorySession:
+        """Starting an independent session for one query run"""
+        return MemorySession(self, query)
+    
+    # Single-session API
+    
+    @property
+    def current_session(self):
+        return self._session.current_session if self._session else None
+    
+    @property
+    def history(self):
+        return self._session.history if self._session else []
+    
+    def start_session(self, query):
+        if self._session and self._session._log:
+            self._session._log.close()
+        self._session = self.open_session(query)
+        return self._session
+    
+    def add_step(self, step_number, step_data):
+        """Recording a reasoning step"""
+        if not self._session:
+            logger.warning("No active session. Call start_session() first.")
+            return
+        self._session.add_step(step_number, step_data)
+    
+    def recall(self, query, k=3, min_score=0.5):
+        """Recalling relevant steps from previous sessions"""
+        if self._session:
+            return self._session.recall(query, k=k, min_score=min_score)
+        return self.store.recall(query, k=k, min_score=min_score) if self.store else []
+    
+    def save_session(self):
+        """Saving session to file"""
+        if not self._session:
+            logger.warning("No session to save")
+            return None
+        return self._session.save_session()
+    
+    def get_summary(self):
+        """Getting summary of current session"""
+        return self._session.get_summary() if self._session else "No steps recorded"
+    
+    def get_context_summary(self, max_steps=3):
+        """Getting a summary of recent steps for context"""
+        return self._session.get_context_summary(max_steps) if self._session else "No previous context"
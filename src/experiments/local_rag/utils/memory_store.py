@@ -0,0 +1,214 @@
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from utils.embeddings import embed_texts, cosine_scores, top_k_indices
+from utils.session_log import SessionLogReader
+
+logger = logging.getLogger(__name__)
+
+# Only the head of long observations is embedded; the full text stays in SQLite
+EMBED_CHARS = 1500
+
+
+class LongTermMemoryStore:
+    """
+    Persistent memory over all past sessions.
+    Steps live in SQLite; their embeddings are kept in an in-memory matrix for fast top-k recall.
+    """
+
+    def __init__(self, db_path, embed_fn):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.embed_fn = embed_fn
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_steps (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session TEXT NOT NULL,
+                query TEXT NOT NULL,
+                step INTEGER,
+                kind TEXT NOT NULL,
+                action TEXT,
+                action_input TEXT,
+                content TEXT NOT NULL,
+                verdict TEXT,
+                created_at TEXT,
+                embedding BLOB NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_session ON memory_steps(session)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imported_sessions (session TEXT PRIMARY KEY)")
+        self._conn.commit()
+
+        self._ids = []
+        self._matrix = None
+        self._load_index()
+
+    def _load_index(self):
+        """Loading all stored embeddings into memory"""
+        rows = self._conn.execute("SELECT id, embedding FROM memory_steps ORDER BY id").fetchall()
+        self._ids = [row[0] for row in rows]
+        if rows:
+            self._matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        else:
+            self._matrix = None
+        logger.info(f"🧠 Long-term memory loaded ({len(self._ids)} records)")
+
+    def add_step(self, session: str, query: str, step_data: Dict[str, Any]) -> int:
+        """
+        Storing the observation and answer of a reasoning step
+
+        Returns:
+            Number of records written
+        """
+        verification = step_data.get("verification") or {}
+        action_input = step_data.get("action_input", "")
+        if not isinstance(action_input, str):
+            action_input = json.dumps(action_input, ensure_ascii=False)
+
+        records = []
+        if step_data.get("observation"):
+            records.append(("observation", step_data["observation"]))
+        if step_data.get("answer"):
+            records.append(("answer", step_data["answer"]))
+        if not records:
+            return 0
+
+        vectors = embed_texts(self.embed_fn, [content[:EMBED_CHARS] for _, content in records])
+        created_at = step_data.get("timestamp") or datetime.utcnow().isoformat()
+
+        with self._lock:
+            new_ids = []
+            for (kind, content), vector in zip(records, vectors):
+                cursor = self._conn.execute(
+                    """INSERT INTO memory_steps
+                       (session, query, step, kind, action, action_input, content, verdict, created_at, embedding)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (session, query, step_data.get("step"), kind, step_data.get("action"),
+                     action_input, content, verification.get("verdict"), created_at,
+                     vector.astype(np.float32).tobytes())
+                )
+                new_ids.append(cursor.lastrowid)
+            self._conn.commit()
+
+            self._ids.extend(new_ids)
+            self._matrix = vectors if self._matrix is None else np.vstack([self._matrix, vectors])
+
+        return len(records)
+
+    def recall(
+        self,
+        query: str,
+        k: int = 3,
+        min_score: float = 0.5,
+        exclude_session: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Recalling the top-k stored steps most similar to a query"""
+        if self._matrix is None:
+            return []
+
+        query_vec = embed_texts(self.embed_fn, [query])[0]
+        with self._lock:
+            scores = cosine_scores(query_vec, self._matrix)
+            # Over-fetching so that filtered-out rows don't starve the result
+            candidates = [(self._ids[i], float(scores[i])) for i in top_k_indices(scores, k * 3)]
+
+        results = []
+        for row_id, score in candidates:
+            if score < min_score:
+                break
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT session, query, step, kind, action, action_input, content, verdict, created_at "
+                    "FROM memory_steps WHERE id = ?", (row_id,)
+                ).fetchone()
+            if not row or (exclude_session and row[0] == exclude_session):
+                continue
+            # Skipping answers the verifier rejected
+            if row[3] == "answer" and row[7] == "fail":
+                continue
+            results.append({
+                "session": row[0],
+                "query": row[1],
+                "step": row[2],
+                "kind": row[3],
+                "action": row[4],
+                "action_input": row[5],
+                "content": row[6],
+                "verdict": row[7],
+                "created_at": row[8],
+                "score": round(score, 4),
+            })
+            if len(results) >= k:
+                break
+
+        return results
+
+    def import_sessions(self, memory_dir) -> int:
+        """Importing saved session_*.json / session_*.jsonl[.gz|.zst] files that aren't indexed yet"""
+        imported = 0
+        for path in sorted(Path(memory_dir).glob("session_*.json*")):
+            try:
+                if path.suffix == ".json":
+                    with open(path, "r", encoding="utf-8") as f:
+                        session = json.load(f)
+                else:
+                    session = SessionLogReader(path).session()
+            except Exception as e:
+                logger.warning(f"Skipping unreadable session {path.name}: {e}")
+                continue
+
+            session_id = session.get("timestamp") or path.name.split(".")[0]
+            if self._is_imported(session_id):
+                continue
+
+            for step in session.get("steps", []):
+                self.add_step(session_id, session.get("query", ""), step)
+            self.mark_imported(session_id)
+            imported += 1
+
+        if imported:
+            logger.info(f"📥 Imported {imported} past sessions into long-term memory")
+        return imported
+
+    def _is_imported(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM imported_sessions WHERE session = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def mark_imported(self, session_id):
+        """Marking a session as indexed so import_sessions skips it"""
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO imported_sessions VALUES (?)", (session_id,))
+            self._conn.commit()
+
+    def count(self):
+        return len(self._ids)
+
+    def close(self):
+        self._conn.close()
+
+
+def format_recall(records: List[Dict[str, Any]], max_chars: int = 600) -> str:
+    """Formatting recalled records for injection into the prompt"""
+    lines = []
+    for i, record in enumerate(records, 1):
+        content = record["content"]
+        if len(content) > max_chars:
+            content = content[:max_chars] + "..."
+        origin = f"{record['kind']} from an earlier session on \"{record['query'][:80]}\""
+        if record.get("action") and record["action"] != "none":
+            origin += f" ({record['action']}: {record.get('action_input', '')[:60]})"
+        lines.append(f"[Memory {i} - {origin}]\n{content}")
+    return "\n\n".join(lines)
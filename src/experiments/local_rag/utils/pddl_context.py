@@ -0,0 +1,147 @@
+import re
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.embeddings import embed_texts, cosine_scores, top_k_indices
+from utils.text import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Words appended to the query so the selection also fits what the step is about
+STEP_HINTS = {
+    "tool_selection": "select tool query search vectorstore web retrieve",
+    "synthesis": "synthesize answer cite sources sufficient information complete",
+    "verification": "verify answer sources verifier success criteria",
+}
+
+_BULLET = re.compile(r"^\s*[-*•]\s+")
+
+
+def split_sections(name: str, text: str) -> List[Tuple[str, str]]:
+    """
+    Splitting NL PDDL context into small sections: each list item (one action or predicate)
+    and each prose paragraph, prefixed with the heading it belongs to
+
+    Returns:
+        [(section id, text)] in document order
+    """
+    sections = []
+    heading = ""
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            body = " ".join(paragraph).strip()
+            if body:
+                sections.append((f"{name}:{len(sections)}", f"{heading} {body}".strip() if heading else body))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped == "---":
+            flush()
+        elif _BULLET.match(stripped):
+            flush()
+            item = _BULLET.sub("", stripped)
+            sections.append((f"{name}:{len(sections)}", f"{heading} {item}".strip() if heading else item))
+        elif stripped.endswith(":") and len(stripped) < 80:
+            # "Core Actions:" style label introducing the items below it
+            flush()
+            heading = stripped
+        else:
+            if not paragraph and ":" in stripped[:60]:
+                # "Purpose: ..." paragraphs carry their own label
+                heading = ""
+            paragraph.append(stripped)
+    flush()
+    return sections
+
+
+class PDDLContextIndex:
+    """
+    Selects the PDDL context sections relevant to a query instead of injecting the whole
+    domain and problem description. Sections are embedded once with the retriever's
+    model; selections are cached per (query, step type).
+    """
+
+    def __init__(self, embed_fn, top_k: int = 6, pinned: int = 1, cache_size: int = 128):
+        self.embed_fn = embed_fn
+        self.top_k = top_k
+        # Leading sections of each document always kept (purpose / task brief)
+        self.pinned = pinned
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._sections: List[Tuple[str, str]] = []
+        self._pinned_ids: List[int] = []
+        self._matrix = None
+        self._full_tokens = 0
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.stats = {"selections": 0, "cache_hits": 0, "full_tokens": 0, "selected_tokens": 0}
+
+    @classmethod
+    def from_config(cls, embed_fn, config):
+        """Building a context index from DEFAULT_CONFIG-style settings"""
+        return cls(
+            embed_fn,
+            top_k=config.get("pddl_context_top_k", 6),
+            pinned=config.get("pddl_context_pinned", 1),
+            cache_size=config.get("pddl_context_cache_size", 128),
+        )
+
+    def _ensure_index(self, documents: Dict[str, str]):
+        """(Re)building section embeddings when the NL context files changed"""
+        fingerprint = hashlib.sha1("\0".join(f"{k}\0{v}" for k, v in sorted(documents.items())).encode("utf-8")).hexdigest()
+        if fingerprint == self._fingerprint:
+            return
+        sections, pinned = [], []
+        for name, text in documents.items():
+            doc_sections = split_sections(name, text or "")
+            pinned.extend(range(len(sections), len(sections) + min(self.pinned, len(doc_sections))))
+            sections.extend(doc_sections)
+        self._sections = sections
+        self._pinned_ids = pinned
+        self._matrix = embed_texts(self.embed_fn, [text for _, text in sections]) if sections else None
+        self._full_tokens = estimate_tokens("\n\n".join(documents.values()))
+        self._cache.clear()
+        self._fingerprint = fingerprint
+        logger.info(f"📐 Indexed {len(sections)} PDDL context sections")
+
+    def select(self, query: str, documents: Dict[str, str], step_type: Optional[str] = None) -> str:
+        """Returning the relevant sections (in document order) as one context block"""
+        key = (query, step_type or "")
+        with self._lock:
+            self._ensure_index(documents)
+            self.stats["selections"] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return self._cache[key]
+            if self._matrix is None:
+                return ""
+
+            query_text = f"{query} {STEP_HINTS.get(step_type, '')}".strip()
+            query_vec = embed_texts(self.embed_fn, [query_text])[0]
+            scores = cosine_scores(query_vec, self._matrix)
+            chosen = set(self._pinned_ids) | set(top_k_indices(scores, self.top_k))
+            context = "\n".join(f"- {self._sections[i][1]}" for i in sorted(chosen))
+
+            self.stats["full_tokens"] += self._full_tokens
+            self.stats["selected_tokens"] += estimate_tokens(context)
+            self._cache[key] = context
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        logger.info(f"📐 PDDL context: {len(chosen)}/{len(self._sections)} sections "
+                    f"(~{estimate_tokens(context)} of {self._full_tokens} tokens)")
+        return context
+
+    def get_stats(self):
+        """Getting selection and token-saving statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["reduction"] = round(1 - stats["selected_tokens"] / stats["full_tokens"], 3) if stats["full_tokens"] else 0.0
+        return stats
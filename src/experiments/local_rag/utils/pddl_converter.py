@@ -1,32 +1,61 @@
 import os
+import sys
+import time
+import hashlib
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import google.generativeai as genai
-from dotenv import load_dotenv
+from typing import Dict, List, Optional, Tuple
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-BASE_DIR = Path(__file__).parent.resolve()
+BASE_DIR = Path(__file__).parent.parent.resolve()
 
 
 # ---------- CONFIG ----------
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
+PDDL_DIR = BASE_DIR / "prompts" / "pddl"
+NL_DIR = BASE_DIR / "prompts" / "nl"
+CACHE_DIR = BASE_DIR / "cache" / "pddl"
 
-DOMAIN_PATH = BASE_DIR / "prompts" / "pddl" / "domain.pddl"
-PROBLEM_TEMPLATE_PATH = BASE_DIR / "prompts" / "pddl" / "problem.pddl"
+DOMAIN_PATH = PDDL_DIR / "domain.pddl"
+PROBLEM_TEMPLATE_PATH = PDDL_DIR / "problem.pddl"
 
-DOMAIN_NL_PATH = BASE_DIR / "prompts" / "nl" / "domain_nl.txt"
-PROBLEM_NL_PATH = BASE_DIR / "prompts" / "nl" / "problem_nl.txt"
+DOMAIN_NL_PATH = NL_DIR / "domain_nl.txt"
+PROBLEM_NL_PATH = NL_DIR / "problem_nl.txt"
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.0-flash")
+# Converter prompt file and the placeholder the PDDL source replaces, per kind
+CONVERTER_PROMPTS = {
+    "domain": (NL_DIR / "domain_converter.txt", "{domain}"),
+    "problem": (NL_DIR / "problem_converter.txt", "{problem}"),
+}
 
 
-def send_to_gemini(prompt: str) -> str:
-    try:
+class GeminiBackend:
+    """Gemini text generation, configured on first use so importing this module has no side effects."""
+
+    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
+        self.api_key = api_key
+        self.model_name = model_name or os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
+        self._model = None
+        self._genai = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key or os.environ.get("GEMINI_API_KEY"))
+                self._genai = genai
+                self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str) -> str:
+        model = self._client()
         response = model.generate_content(
             prompt,
-            generation_config = genai.types.GenerationConfig(
+            generation_config=self._genai.types.GenerationConfig(
                 max_output_tokens=1024,
                 temperature=0.2,
                 top_p=0.8,
@@ -34,37 +63,134 @@ def send_to_gemini(prompt: str) -> str:
                 stop_sequences=["--- END ---"]
             )
         )
-    except Exception as e:
-        return f"Error from Gemini API: {e}"
-    return response.text
+        return response.text
+
+
+class PDDLConverter:
+    """
+    Converts PDDL domain/problem files to natural language.
+
+    Outputs are cached on disk by a hash of (backend model, converter prompt, PDDL source),
+    so unchanged inputs never reach the LLM again; several files convert concurrently.
+    The backend is anything with generate(prompt) -> str.
+    """
+
+    def __init__(self, backend=None, cache_dir=CACHE_DIR, max_workers: int = 4):
+        self.backend = backend or GeminiBackend()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "errors": 0, "unchanged": 0, "llm_seconds": 0.0}
+
+    def _template(self, kind: str) -> Tuple[str, str]:
+        path, placeholder = CONVERTER_PROMPTS[kind]
+        return path.read_text(encoding="utf-8"), placeholder
+
+    def cache_key(self, kind: str, pddl_text: str) -> str:
+        """Hashing everything that determines the output"""
+        template, _ = self._template(kind)
+        model = getattr(self.backend, "model_name", type(self.backend).__name__)
+        digest = hashlib.sha256()
+        for part in (model, kind, template, pddl_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def convert(self, kind: str, pddl_text: str) -> str:
+        """Converting one PDDL source, from cache when possible"""
+        key = self.cache_key(kind, pddl_text)
+        cache_file = self.cache_dir / f"{key}.txt" if self.cache_dir else None
+        if cache_file and cache_file.exists():
+            self._bump("hits")
+            return cache_file.read_text(encoding="utf-8")
+
+        template, placeholder = self._template(kind)
+        # str.replace instead of format(): PDDL and the templates contain other braces
+        prompt = template.replace(placeholder, pddl_text)
+
+        self._bump("misses")
+        start_time = time.monotonic()
+        text = self.backend.generate(prompt)
+        self._bump("llm_seconds", time.monotonic() - start_time)
+
+        if cache_file:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, cache_file)
+        return text
+
+    def _convert_file(self, kind: str, source: Path, target: Path) -> Dict:
+        try:
+            text = self.convert(kind, source.read_text(encoding="utf-8"))
+        except Exception as e:
+            # Keeping the previous output rather than writing the error into the prompt file
+            self._bump("errors")
+            logger.error(f"❌ Converting {source.name} failed: {e}")
+            return {"source": str(source), "target": str(target), "status": "error", "error": str(e)}
+
+        if target.exists() and target.read_text(encoding="utf-8") == text:
+            self._bump("unchanged")
+            return {"source": str(source), "target": str(target), "status": "unchanged"}
+        target.write_text(text, encoding="utf-8")
+        return {"source": str(source), "target": str(target), "status": "written"}
+
+    def convert_files(self, jobs: List[Tuple[str, Path, Path]]) -> List[Dict]:
+        """Converting (kind, source, target) jobs concurrently"""
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(jobs)))) as pool:
+            return list(pool.map(lambda job: self._convert_file(*job), jobs))
+
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self):
+        """Getting cache and timing statistics"""
+        with self._lock:
+            return {**self.stats, "llm_seconds": round(self.stats["llm_seconds"], 3)}
+
+
+def discover_jobs(pddl_dir=PDDL_DIR, nl_dir=NL_DIR) -> List[Tuple[str, Path, Path]]:
+    """
+    Finding PDDL files to convert
+
+    domain.pddl / problem.pddl keep their historical output names; any other *.pddl
+    is classified by its (define (domain|problem ...)) header and written to <stem>_nl.txt.
+    """
+    jobs = []
+    for source in sorted(Path(pddl_dir).glob("*.pddl")):
+        if source == DOMAIN_PATH:
+            jobs.append(("domain", source, DOMAIN_NL_PATH))
+        elif source == PROBLEM_TEMPLATE_PATH:
+            jobs.append(("problem", source, PROBLEM_NL_PATH))
+        else:
+            header = source.read_text(encoding="utf-8").lower()
+            kind = "problem" if "(define (problem" in header else "domain"
+            jobs.append((kind, source, Path(nl_dir) / f"{source.stem}_nl.txt"))
+    return jobs
 
-# ---------- PROMPT TEMPLATES ----------
-with open(BASE_DIR / "prompts" / "nl" / "domain_converter.txt", 'r', encoding="utf-8") as f:
-    DOMAIN_PROMPT = f.read()
 
+# ---------- CONVERSION ----------
+def convert_and_store(converter: Optional[PDDLConverter] = None, jobs=None):
+    """Converting all PDDL files and writing the NL prompt files"""
+    converter = converter or PDDLConverter()
+    jobs = jobs if jobs is not None else discover_jobs()
 
-with open(BASE_DIR / "prompts" / "nl" / "problem_converter.txt", 'r', encoding="utf-8") as f:
-    PROBLEM_PROMPT = f.read()
-
+    print(f"🔹 Converting {len(jobs)} PDDL files...")
+    results = converter.convert_files(jobs)
 
-# ---------- CONVERSION ----------
-def convert_and_store():
-    print("🔹 Converting domain.pddl...")
-    domain_text = DOMAIN_PATH.read_text(encoding="utf-8")
-    domain_prompt = DOMAIN_PROMPT.format(domain=domain_text)
-    domain_nl = send_to_gemini(domain_prompt)
-    DOMAIN_NL_PATH.write_text(domain_nl, encoding="utf-8")
-
-    print("🔹 Converting problem_template.pddl...")
-    problem_text = PROBLEM_TEMPLATE_PATH.read_text(encoding="utf-8")
-    problem_prompt = PROBLEM_PROMPT.replace("{problem}", problem_text)
-    problem_nl = send_to_gemini(problem_prompt)
-    PROBLEM_NL_PATH.write_text(problem_nl, encoding="utf-8")
-
-    print("✅ Conversion complete. Files saved:")
-    print(f"   - {DOMAIN_NL_PATH}")
-    print(f"   - {PROBLEM_NL_PATH}")
+    print("✅ Conversion complete:")
+    for result in results:
+        print(f"   - {result['target']} ({result['status']})")
+    print(f"📊 {converter.get_stats()}")
+    return results
 
 # ---------- MAIN ----------
 if __name__ == "__main__":
-    convert_and_store()
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    # --no-cache forces fresh LLM conversions
+    convert_and_store(PDDLConverter(cache_dir=None if "--no-cache" in sys.argv else CACHE_DIR))
@@ -0,0 +1,306 @@
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import resource
+import threading
+import platform
+import subprocess
+import tracemalloc
+import logging
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cpu", "memory", "all")
+# Deepest call chain written to collapsed stacks (cProfile graphs can be cyclic)
+MAX_STACK_DEPTH = 64
+# Growth of traced memory over the last peak snapshot that triggers a new one while sampling
+PEAK_SNAPSHOT_GROWTH = 1.25
+
+
+def git_revision(cwd=None) -> str:
+    """Short commit hash of the working tree, suffixed with +dirty for uncommitted changes"""
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True,
+                             text=True, timeout=5).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                               capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return f"{rev}+dirty" if rev and dirty else rev or "unknown"
+
+
+def _frame_name(filename, lineno, name) -> str:
+    """Flamegraph frame label: module file, function and line"""
+    if filename == "~":
+        return name.strip("<>")
+    return f"{Path(filename).stem}:{name}:{lineno}"
+
+
+def collapsed_from_pstats(stats: pstats.Stats) -> List[str]:
+    """
+    Turning a cProfile call graph into collapsed stacks ("a;b;c <microseconds>")
+
+    cProfile keeps caller->callee edges, not full stacks, so each function's own time is
+    spread over the paths leading to it in proportion to the time spent along each edge
+    (the approximation flameprof and similar tools use).
+    """
+    raw = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, (_, _, _, edge_ct) in callers.items():
+            callees.setdefault(caller, []).append((func, edge_ct))
+    roots = [func for func, (_, _, _, _, callers) in raw.items() if not callers]
+
+    lines = Counter()
+
+    def walk(func, path, on_path, fraction):
+        _, _, tt, ct, _ = raw[func]
+        stack = path + [_frame_name(*func)]
+        own = int(tt * fraction * 1e6)
+        if own:
+            lines[";".join(stack)] += own
+        if len(stack) >= MAX_STACK_DEPTH or not ct:
+            return
+        for callee, edge_ct in callees.get(func, []):
+            callee_ct = raw[callee][3]
+            share = fraction * edge_ct / callee_ct if callee_ct else 0.0
+            # Skipping recursion and paths that round to zero microseconds
+            if callee in on_path or share * callee_ct < 1e-6:
+                continue
+            walk(callee, stack, on_path | {callee}, share)
+
+    for root in roots:
+        walk(root, [], {root}, 1.0)
+    return [f"{stack} {value}" for stack, value in lines.most_common()]
+
+
+class StackSampler:
+    """
+    Sampling the main thread's stack (and memory use) every interval seconds.
+
+    Gives true collapsed stacks for flamegraphs and a memory timeline over long
+    commands such as ingest, at a cost that doesn't depend on call counts. With
+    tracemalloc on, it also keeps a snapshot from near the memory peak, since most
+    of a command's allocations are gone by the time it exits.
+    """
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = Counter()
+        self.timeline = []
+        self.peak_snapshot = None
+        self.peak_snapshot_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_frame_name(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            sample = {"t": round(time.monotonic() - self._started, 3), "rss_max_kb": _max_rss_kb()}
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                sample.update(traced_kb=current // 1024, traced_peak_kb=peak // 1024)
+                if current // 1024 > self.peak_snapshot_kb * PEAK_SNAPSHOT_GROWTH:
+                    self.peak_snapshot = tracemalloc.take_snapshot()
+                    self.peak_snapshot_kb = current // 1024
+                    sample["snapshot"] = True
+            self.timeline.append(sample)
+
+
+def _max_rss_kb() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+class CommandProfiler:
+    """
+    Profiling one CLI command end to end (cProfile and/or tracemalloc, optional sampling).
+
+    Writes into output_dir, all named profile_<command>_<timestamp>_<revision>.*:
+    .pstats (cProfile), .collapsed (stacks for flamegraph.pl / speedscope), .alloc.txt
+    (top allocation sites), .samples.collapsed and .timeline.jsonl (with sampling), and
+    .json with the command, flags, git revision and totals so runs can be compared
+    across versions. tracemalloc slows allocation-heavy commands a lot, so wall times
+    are only comparable between runs with the same mode.
+    """
+
+    def __init__(self, output_dir, command: str, argv: List[str], mode: str = "all",
+                 sample_interval: Optional[float] = None, top_n: int = 30, trace_frames: int = 1):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+        self.output_dir = Path(output_dir)
+        self.command = command
+        self.argv = list(argv)
+        self.cpu = mode in ("cpu", "all")
+        self.memory = mode in ("memory", "all")
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.trace_frames = trace_frames
+
+        self.revision = git_revision(Path(__file__).parent)
+        self.stem = (f"profile_{command}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_"
+                     f"{self.revision.replace('+', '_')}")
+        self._profile = None
+        self._sampler = None
+        self._started = None
+        self.files: Dict[str, str] = {}
+
+    @classmethod
+    def from_argv(cls, argv: List[str], output_dir) -> Optional["CommandProfiler"]:
+        """
+        Building a profiler from CLI flags (None without --profile)
+
+        --profile [cpu|memory|all]   what to record (default all)
+        --profile-interval SECONDS   also sample stacks and memory every SECONDS
+        """
+        if "--profile" not in argv:
+            return None
+        idx = argv.index("--profile")
+        mode = argv[idx + 1] if idx + 1 < len(argv) and argv[idx + 1] in PROFILE_MODES else "all"
+        interval = None
+        if "--profile-interval" in argv:
+            try:
+                interval = float(argv[argv.index("--profile-interval") + 1])
+            except (IndexError, ValueError):
+                raise ValueError("--profile-interval needs a number of seconds")
+        command = argv[1].lower() if len(argv) > 1 and not argv[1].startswith("--") else "none"
+        return cls(output_dir, command, argv[1:], mode=mode, sample_interval=interval)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.memory:
+            tracemalloc.start(self.trace_frames)
+        if self.sample_interval:
+            self._sampler = StackSampler(self.sample_interval).start()
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        logger.info(f"⏱️ Profiling '{self.command}' ({'cpu ' if self.cpu else ''}{'memory ' if self.memory else ''}"
+                    f"{f'sampling every {self.sample_interval}s ' if self.sample_interval else ''}"
+                    f"at {self.revision})")
+
+    def stop(self):
+        """Stopping all profilers and writing the profile files"""
+        if self._profile:
+            self._profile.disable()
+        elapsed = time.perf_counter() - self._started
+        if self._sampler:
+            self._sampler.stop()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        summary = {
+            "command": self.command,
+            "argv": self.argv,
+            "revision": self.revision,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "wall_seconds": round(elapsed, 3),
+            "max_rss_kb": _max_rss_kb(),
+        }
+        if self._profile:
+            summary["cpu"] = self._write_cpu()
+        if self.memory:
+            summary["memory"] = self._write_memory()
+            tracemalloc.stop()
+        if self._sampler:
+            summary["samples"] = self._write_samples()
+
+        summary["files"] = self.files
+        path = self.output_dir / f"{self.stem}.json"
+        path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        self.files["summary"] = str(path)
+        print(f"\n⏱️ Profile ({self.revision}, {elapsed:.1f}s) written to {self.output_dir}/{self.stem}.*")
+        return summary
+
+    def _write_cpu(self):
+        stats = pstats.Stats(self._profile)
+        pstats_path = self.output_dir / f"{self.stem}.pstats"
+        stats.dump_stats(str(pstats_path))
+        self.files["pstats"] = str(pstats_path)
+
+        collapsed_path = self.output_dir / f"{self.stem}.collapsed"
+        collapsed_path.write_text("\n".join(collapsed_from_pstats(stats)) + "\n", encoding="utf-8")
+        self.files["collapsed"] = str(collapsed_path)
+
+        # Top functions by cumulative time, as pstats prints them
+        report = io.StringIO()
+        pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(self.top_n)
+        text_path = self.output_dir / f"{self.stem}.cpu.txt"
+        text_path.write_text(report.getvalue(), encoding="utf-8")
+        self.files["cpu_report"] = str(text_path)
+        return {"total_calls": stats.total_calls, "total_seconds": round(stats.total_tt, 3)}
+
+    def _top_allocations(self, snapshot):
+        # Leaving out the profilers' own bookkeeping (after grouping: filter_traces is slow on big heaps)
+        ignored = {tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__,
+                   "<frozen importlib._bootstrap>", "<unknown>"}
+        top = [stat for stat in snapshot.statistics("lineno") if stat.traceback[0].filename not in ignored]
+        lines = []
+        for i, stat in enumerate(top[:self.top_n], 1):
+            frame = stat.traceback[0]
+            lines.append(f"{i:>3}. {frame.filename}:{frame.lineno}  {stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        return lines
+
+    def _write_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB"]
+        if self._sampler and self._sampler.peak_snapshot:
+            lines.append(f"\nTop allocation sites near the peak ({self._sampler.peak_snapshot_kb / 1024:.1f} MiB traced):")
+            lines.extend(self._top_allocations(self._sampler.peak_snapshot))
+        lines.append("\nTop allocation sites still live at exit:")
+        lines.extend(self._top_allocations(tracemalloc.take_snapshot()))
+        path = self.output_dir / f"{self.stem}.alloc.txt"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self.files["allocations"] = str(path)
+        return {"current_kb": current // 1024, "peak_kb": peak // 1024}
+
+    def _write_samples(self):
+        samples_path = self.output_dir / f"{self.stem}.samples.collapsed"
+        samples_path.write_text(
+            "\n".join(f"{stack} {count}" for stack, count in self._sampler.stacks.most_common()) + "\n",
+            encoding="utf-8"
+        )
+        timeline_path = self.output_dir / f"{self.stem}.timeline.jsonl"
+        timeline_path.write_text(
+            "".join(json.dumps(sample) + "\n" for sample in self._sampler.timeline), encoding="utf-8"
+        )
+        self.files["samples"] = str(samples_path)
+        self.files["timeline"] = str(timeline_path)
+        return {"interval": self.sample_interval, "count": sum(self._sampler.stacks.values())}
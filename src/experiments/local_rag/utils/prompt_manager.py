@@ -1,11 +1,56 @@
 from pathlib import Path
 import re
 import logging
+import threading
 from enum import Enum
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 
 logger = logging.getLogger("prompt_manager")
-logging.basicConfig(level=logging.INFO)
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts" / "nl"
+
+# Prompt key -> (file name, whether markdown is cleaned)
+PROMPT_FILES = {
+    "domain_prompt": ("domain_nl.txt", True),
+    "problem_prompt": ("problem_nl.txt", True),
+    "base": ("base.txt", False),
+    "advanced_react": ("advanced_react.txt", False),
+}
+
+# Prompt keys each mode needs
+MODE_PROMPTS = {
+    "base": ["base"],
+    "advanced_react": ["base", "advanced_react"],
+    "pddl": ["base", "domain_prompt", "problem_prompt"],
+}
+
+# PDDL context block appended to the base instructions
+PDDL_CONTEXT_TEMPLATE = """{base}
+
+---
+The following content describes the system's internal logic and task background.
+You must use it **only to inform your reasoning** — do not copy or restate it.
+
+{context}
+
+---
+Now begin reasoning and respond **strictly in valid JSON** according to the earlier format.
+If you need to reason, put all internal thoughts in the "thought" field.
+"""
+
+# Query-specific PDDL context, sent after the question so the system prefix stays cacheable
+PDDL_QUERY_CONTEXT_TEMPLATE = """{question}
+
+---
+Task background relevant to this question (use it **only to inform your reasoning** — do not copy or restate it):
+
+{context}
+---
+"""
+
+# Process-wide cache of loaded files: path -> (mtime_ns, cleaned text)
+_FILE_CACHE: Dict[Path, Tuple[int, str]] = {}
+_FILE_CACHE_LOCK = threading.Lock()
 
 
 class PromptType(str, Enum):
@@ -14,33 +59,110 @@ class PromptType(str, Enum):
     PDDL = "pddl"
 
 
+class CompiledTemplate:
+    """Prompt template pre-split into static text and {variable} slots."""
+
+    _PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+    def __init__(self, text: str):
+        self.text = text
+        # Even indices are static text, odd indices are variable names
+        self.segments: List[str] = self._PLACEHOLDER.split(text)
+        self.variables = set(self.segments[1::2])
+        self._line_splits: Dict[str, Tuple["CompiledTemplate", "CompiledTemplate"]] = {}
+
+    def split_lines(self, variable: str) -> Tuple["CompiledTemplate", "CompiledTemplate"]:
+        """Splitting into (lines without {variable}, lines with {variable})."""
+        if variable not in self._line_splits:
+            marker = "{" + variable + "}"
+            lines = self.text.split("\n")
+            static = [line for line in lines if marker not in line]
+            dynamic = [line for line in lines if marker in line]
+            self._line_splits[variable] = (
+                CompiledTemplate("\n".join(static)),
+                CompiledTemplate("\n".join(dynamic)),
+            )
+        return self._line_splits[variable]
+
+    def render(self, **kwargs) -> str:
+        """Filling known variables; unknown placeholders are kept verbatim."""
+        parts = []
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                parts.append(segment)
+            elif segment in kwargs:
+                parts.append(str(kwargs[segment]))
+            else:
+                parts.append("{" + segment + "}")
+        return "".join(parts)
+
+
+def _read_prompt_file(path: Path, clean: bool) -> str:
+    """Reading a prompt file through the mtime-keyed cache."""
+    mtime = path.stat().st_mtime_ns
+    with _FILE_CACHE_LOCK:
+        cached = _FILE_CACHE.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, 'r', encoding="utf-8") as f:
+        content = f.read().strip()
+    if clean:
+        content = PromptManager._clean_markdown(content)
+
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE[path] = (mtime, content)
+    return content
+
+
 class PromptManager:
     """Centralized prompt management for dynamic multi-layer prompting."""
 
-    def __init__(self, prompts_dict: Optional[Dict] = None, debug: bool = True):
+    def __init__(
+        self,
+        prompts_dict: Optional[Dict] = None,
+        debug: bool = True,
+        hot_reload: bool = False,
+        mode: Optional[PromptType] = None,
+        context_index=None
+    ):
         self.prompts = prompts_dict or {}
         self.debug = debug
-        self._setup_prompts()
+        # Optional PDDLContextIndex: only query-relevant PDDL sections are injected
+        self.context_index = context_index
+        # Re-checking prompt file mtimes on every render while editing prompts
+        self.hot_reload = hot_reload
+        self._compiled: Dict[str, CompiledTemplate] = {}
+        # Guarding hot reloads and recompiles when one manager serves concurrent runs
+        self._lock = threading.RLock()
+        self._setup_prompts(mode)
+
+    @property
+    def active_mode(self) -> Optional[PromptType]:
+        """Default prompt mode; read-only, runs pick their own mode via the agent's prompt_mode"""
+        return self._mode
 
     def _setup_prompts(self, mode: Optional[PromptType] = None):
-        """Setting up prompts based on mode."""
-        self.active_mode = mode
+        """Setting up prompts based on mode (only the files the mode needs are loaded)."""
+        self._mode = mode
         base_dir = Path(__file__).parent.resolve()
-        prompts_dir = base_dir.parent / "prompts" / "nl"
+        prompts_dir = PROMPTS_DIR
 
         if self.debug:
             print(f"[DEBUG] Base path: {base_dir}")
             print(f"[DEBUG] Expected prompts directory: {prompts_dir.resolve()}")
 
         try:
-            nl_prompts = self.get_nl_prompts()
+            mode_key = mode.value if isinstance(mode, PromptType) else (mode or "base")
+            nl_prompts = self.get_nl_prompts(MODE_PROMPTS.get(mode_key, ["base"]))
             
-            if mode == PromptType.BASE:
+            if mode in (None, PromptType.BASE):
                 self.prompts["base"] = nl_prompts.get("base", "")
                 if self.debug and nl_prompts.get("base"):
                     print("✅ Loaded base NL prompt successfully.\n")
                     
             elif mode == PromptType.ADVANCED_REACT:
+                self.prompts["base"] = nl_prompts.get("base", "")
                 self.prompts["advanced_react"] = nl_prompts.get("advanced_react", "")
                 if self.debug and nl_prompts.get("advanced_react"):
                     print("✅ Loaded advanced ReAct NL prompt successfully.\n")
@@ -62,37 +184,50 @@ class PromptManager:
         except Exception as e:
             logger.error(f"⚠️ Error loading prompts: {e}")
 
-    def get_nl_prompts(self) -> Dict[str, str]:
-        """Loading natural language prompts from files."""
-        prompts_dir = Path(__file__).parent.parent / "prompts" / "nl"
+        self._compile_all()
+
+    def _compile_all(self):
+        """Compiling every loaded prompt that changed since the last compile."""
+        for name, text in self.prompts.items():
+            compiled = self._compiled.get(name)
+            if compiled is None or compiled.text is not text:
+                self._compiled[name] = CompiledTemplate(text)
+
+    def _reload_changed(self):
+        """Hot reload: picking up prompt files edited on disk."""
+        changed = False
+        for key in list(self.prompts):
+            if key not in PROMPT_FILES:
+                continue
+            filename, clean = PROMPT_FILES[key]
+            path = PROMPTS_DIR / filename
+            if path.exists():
+                content = _read_prompt_file(path, clean)
+                if content != self.prompts[key]:
+                    self.prompts[key] = content
+                    changed = True
+                    logger.info(f"♻️ Reloaded prompt '{key}' from {filename}")
+        if changed and "domain_prompt" in self.prompts and "problem_prompt" in self.prompts:
+            self.prompts["pddl"] = self.prompts["domain_prompt"] + "\n\n" + self.prompts["problem_prompt"]
+        self._compile_all()
+
+    def get_nl_prompts(self, keys: Optional[List[str]] = None) -> Dict[str, str]:
+        """Loading natural language prompts from files (cached by file mtime)."""
+        prompts_dir = PROMPTS_DIR
 
         if self.debug:
             print(f"[DEBUG] Loading NL prompts from: {prompts_dir.resolve()}")
 
-        # Defining prompt files
-        prompt_files = {
-            "domain_prompt": "domain_nl.txt",
-            "problem_prompt": "problem_nl.txt",
-            "base": "base.txt",
-            "advanced_react": "advanced_react.txt"
-        }
-
         result = {}
 
-        for key, filename in prompt_files.items():
+        for key in keys or PROMPT_FILES:
+            filename, clean = PROMPT_FILES[key]
             file_path = prompts_dir / filename
             
             if file_path.exists():
                 try:
-                    with open(file_path, 'r', encoding="utf-8") as f:
-                        content = f.read().strip()
-                        
                     # Applying markdown cleaning only to PDDL prompts
-                    if key in ["domain_prompt", "problem_prompt"]:
-                        content = self._clean_markdown(content)
-                        
-                    result[key] = content
-                    
+                    result[key] = _read_prompt_file(file_path, clean)
                 except Exception as e:
                     logger.error(f"Error reading {filename}: {e}")
                     result[key] = ""
@@ -102,7 +237,8 @@ class PromptManager:
 
         return result
 
-    def _clean_markdown(self, text: str) -> str:
+    @staticmethod
+    def _clean_markdown(text: str) -> str:
         """Removing Markdown formatting."""
         text = re.sub(r"#+", "", text)  # Remove headings
         text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)  # Remove bold
@@ -111,17 +247,27 @@ class PromptManager:
 
     def get_prompt(self, name: str, **kwargs) -> str:
         """Getting prompt with variable substitution."""
-        template = self.prompts.get(name, "")
-        
-        for key, value in kwargs.items():
-            placeholder = "{" + key + "}"
-            template = template.replace(placeholder, str(value))
+        return self._get_compiled(name).render(**kwargs)
+
+    def _get_compiled(self, name: str) -> CompiledTemplate:
+        with self._lock:
+            if self.hot_reload:
+                self._reload_changed()
+            
+            template = self.prompts.get(name, "")
+            compiled = self._compiled.get(name)
             
-        return template
+            # Recompiling if self.prompts was edited directly
+            if compiled is None or compiled.text is not template:
+                compiled = CompiledTemplate(template)
+                self._compiled[name] = compiled
+            return compiled
 
     def add_prompt(self, name: str, template: str):
         """Adding or updating a prompt template."""
-        self.prompts[name] = template
+        with self._lock:
+            self.prompts[name] = template
+            self._compiled[name] = CompiledTemplate(template)
 
     def compose_prompt(
         self, 
@@ -140,52 +286,103 @@ class PromptManager:
             "tools": tools_description
         }
 
-        # Getting prompts with variable substitution
-        base = self.get_prompt("base", **variables)
-        advanced_react = self.get_prompt("advanced_react", **variables)
-        pddl = self.prompts.get("pddl")
-
-        # Handling different prompt types
+        # Rendering only the template the selected mode uses
         if prompt_type in (PromptType.BASE, "base"):
             logger.info("Using base prompt")
+            base = self.get_prompt("base", **variables)
             return base.strip() if base else ""
         
         if prompt_type in (PromptType.ADVANCED_REACT, "advanced_react"):
             logger.info("Using advanced ReAct prompt")
-            return advanced_react.strip() if advanced_react else base.strip()
+            advanced_react = self.get_prompt("advanced_react", **variables)
+            if advanced_react:
+                return advanced_react.strip()
+            return self.get_prompt("base", **variables).strip()
+        
+        base = self.get_prompt("base", **variables)
         
         if prompt_type in (PromptType.PDDL, "pddl"):
             logger.info("Using PDDL prompt with context isolation")
+            pddl = self.prompts.get("pddl")
             # Checking if we have all required components
             if not all([base, pddl]):
                 logger.warning("Incomplete PDDL prompt components, falling back to base")
                 return base.strip() if base else ""
             
             # Context isolation with proper formatting
-            context = f"{pddl}".strip()
-            composed = f"""{base}
-
----
-The following content describes the system's internal logic and task background.
-You must use it **only to inform your reasoning** — do not copy or restate it.
-
-{context}
-
----
-Now begin reasoning and respond **strictly in valid JSON** according to the earlier format.
-If you need to reason, put all internal thoughts in the "thought" field.
-"""
+            context = self._pddl_context(query) or f"{pddl}".strip()
+            composed = PDDL_CONTEXT_TEMPLATE.format(base=base, context=context)
             return composed.strip()
         
         # Default fallback
         logger.warning(f"Unknown prompt_type: {prompt_type}, using base")
         return base.strip() if base else ""
 
+    def _pddl_context(self, query: str, step_type: Optional[str] = None) -> str:
+        """Selecting the PDDL sections relevant to the query (empty without a context index)"""
+        if not self.context_index:
+            return ""
+        try:
+            return self.context_index.select(
+                query,
+                {"domain": self.prompts.get("domain_prompt", ""), "problem": self.prompts.get("problem_prompt", "")},
+                step_type=step_type
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ PDDL context selection failed, injecting full context: {e}")
+            return ""
+
+    def compose_messages(
+        self,
+        query: str,
+        tools: dict,
+        prompt_type: Optional[PromptType] = None,
+        cache_control: bool = False,
+        step_type: Optional[str] = "tool_selection"
+    ) -> List[Dict]:
+        """
+        Composing a cache-friendly message list.
+
+        The system message holds everything that is identical across queries
+        (instructions, tools, PDDL context) so providers can cache it as a prefix;
+        the question goes into a separate user message after it.
+        """
+        tools_description = "\n".join(
+            [f"- {t.name}: {t.description}" for t in tools.values()]
+        )
+
+        name = "base"
+        if prompt_type in (PromptType.ADVANCED_REACT, "advanced_react") and self.prompts.get("advanced_react"):
+            name = "advanced_react"
+
+        static, dynamic = self._get_compiled(name).split_lines("query")
+        system = static.render(tools=tools_description).strip()
+
+        question = dynamic.render(query=query).strip() if dynamic.text.strip() else f"Question: {query}"
+
+        if prompt_type in (PromptType.PDDL, "pddl") and self.prompts.get("pddl"):
+            context = self._pddl_context(query, step_type)
+            if context:
+                question = PDDL_QUERY_CONTEXT_TEMPLATE.format(question=question, context=context).strip()
+            else:
+                system = PDDL_CONTEXT_TEMPLATE.format(base=system, context=self.prompts["pddl"].strip()).strip()
+
+        if cache_control:
+            # Explicit breakpoint for providers that need one (e.g. Anthropic via OpenRouter)
+            system_content = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        else:
+            system_content = system
+
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": question},
+        ]
+
     def show_prompt_paths(self):
         """Displaying all known prompt file locations and loaded keys."""
         print("\n🧭 PromptManager Debug Info")
         base_dir = Path(__file__).parent.resolve()
-        prompts_dir = base_dir.parent / "prompts" / "nl"
+        prompts_dir = PROMPTS_DIR
         
         print(f"  Base path: {base_dir}")
         print(f"  Prompts directory: {prompts_dir.resolve()}")
@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: final synthesis ahead of tool selection/search, verification last
+PRIORITIES = {
+    "synthesis": 0,
+    "tool_selection": 1,
+    "search": 1,
+    "verification": 2,
+}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def penalize(self, now, retry_after: Optional[float]):
+        """Draining the bucket after a 429 and pausing for Retry-After if given"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0)
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+
+class _Lane:
+    """Per-endpoint state: bucket, concurrency cap, priority queue and metrics."""
+
+    def __init__(self, name, rate, burst, concurrency, retries):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.cond = threading.Condition()
+        self.queue = []
+        self.in_flight = 0
+
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=1000)
+        self.waits_by_priority: Dict[int, deque] = {}
+
+
+class RequestScheduler:
+    """
+    Central scheduler for outbound LLM and search calls.
+    Each endpoint gets a token bucket, a concurrency cap and a priority queue;
+    429 responses drain the bucket (honouring Retry-After) and are optionally retried.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]] = None, default_limit: Dict[str, float] = None):
+        self.limits = limits or {}
+        self.default_limit = default_limit or {"rate": 1.0, "burst": 5, "concurrency": 4, "retries": 0}
+        self._lanes: Dict[str, _Lane] = {}
+        self._lanes_lock = threading.Lock()
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_config(cls, config):
+        """Building a scheduler from DEFAULT_CONFIG-style settings"""
+        return cls(limits=config.get("rate_limits", {}))
+
+    def _lane(self, endpoint) -> _Lane:
+        with self._lanes_lock:
+            lane = self._lanes.get(endpoint)
+            if lane is None:
+                limit = {**self.default_limit, **self.limits.get(endpoint, {})}
+                lane = _Lane(
+                    endpoint,
+                    rate=limit["rate"],
+                    burst=limit["burst"],
+                    concurrency=int(limit["concurrency"]),
+                    retries=int(limit.get("retries", 0)),
+                )
+                self._lanes[endpoint] = lane
+            return lane
+
+    def submit(self, endpoint: str, fn: Callable[[], Any], priority="synthesis", timeout: float = None) -> Any:
+        """
+        Running fn() once the endpoint's rate limit, concurrency cap and queue allow it
+
+        Args:
+            endpoint: Lane name, e.g. "openrouter" or "tavily"
+            fn: Zero-argument callable doing the request
+            priority: Name from PRIORITIES or an int (lower runs first)
+            timeout: Max seconds to wait in the queue (raises TimeoutError)
+        """
+        lane = self._lane(endpoint)
+        rank = PRIORITIES.get(priority, 1) if isinstance(priority, str) else int(priority)
+        attempts = 0
+
+        while True:
+            self._acquire(lane, rank, timeout)
+            try:
+                result = fn()
+            except Exception as e:
+                retry_after = self._rate_limited(e)
+                with lane.cond:
+                    if retry_after is not False:
+                        lane.throttled += 1
+                        lane.bucket.penalize(time.monotonic(), retry_after)
+                    lane.failed += 1
+                self._release(lane)
+                if retry_after is not False and attempts < lane.retries:
+                    attempts += 1
+                    logger.warning(f"🚦 [{endpoint}] rate limited, retry {attempts}/{lane.retries}")
+                    continue
+                raise
+            else:
+                with lane.cond:
+                    lane.completed += 1
+                self._release(lane)
+                return result
+
+    def _acquire(self, lane: _Lane, rank: int, timeout: Optional[float]):
+        ticket = (rank, next(self._seq))
+        enqueued = time.monotonic()
+        deadline = enqueued + timeout if timeout is not None else None
+
+        with lane.cond:
+            heapq.heappush(lane.queue, ticket)
+            while True:
+                now = time.monotonic()
+                wait = None
+                if lane.queue[0] == ticket and lane.in_flight < lane.concurrency:
+                    wait = lane.bucket.wait_time(now)
+                    if wait <= 0:
+                        lane.bucket.consume()
+                        heapq.heappop(lane.queue)
+                        lane.in_flight += 1
+                        waited = now - enqueued
+                        lane.waits.append(waited)
+                        lane.waits_by_priority.setdefault(rank, deque(maxlen=1000)).append(waited)
+                        # Letting the next waiter re-check now that the head changed
+                        lane.cond.notify_all()
+                        return waited
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        lane.queue.remove(ticket)
+                        heapq.heapify(lane.queue)
+                        lane.timeouts += 1
+                        lane.cond.notify_all()
+                        raise TimeoutError(f"Timed out waiting {timeout:.1f}s for '{lane.name}' slot")
+                    wait = remaining if wait is None else min(wait, remaining)
+                lane.cond.wait(wait)
+
+    def _release(self, lane: _Lane):
+        with lane.cond:
+            lane.in_flight -= 1
+            lane.cond.notify_all()
+
+    @staticmethod
+    def _rate_limited(error):
+        """Returning Retry-After seconds (or None) for 429 errors, False otherwise"""
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+        if status != 429 and "429" not in str(error) and "rate limit" not in str(error).lower():
+            return False
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def get_metrics(self):
+        """Getting queue-wait and throughput metrics per endpoint"""
+        metrics = {}
+        for name, lane in list(self._lanes.items()):
+            with lane.cond:
+                waits = sorted(lane.waits)
+                metrics[name] = {
+                    "completed": lane.completed,
+                    "failed": lane.failed,
+                    "throttled": lane.throttled,
+                    "queue_timeouts": lane.timeouts,
+                    "in_flight": lane.in_flight,
+                    "queued": len(lane.queue),
+                    "wait_avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                    "wait_p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+                    "wait_max": round(waits[-1], 4) if waits else 0.0,
+                    "wait_avg_by_priority": {
+                        rank: round(sum(w) / len(w), 4) for rank, w in lane.waits_by_priority.items() if w
+                    },
+                }
+        return metrics
@@ -0,0 +1,231 @@
+import gzip
+import io
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "step", "close", "never")
+COMPRESSION_SUFFIXES = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def _zstd():
+    """Importing zstandard lazily; it's only needed for .zst logs"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def log_path(directory, stem: str, compression: Optional[str] = None) -> Path:
+    """Building a log file path with the suffix matching the compression"""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression '{compression}'. Valid: gzip, zstd or None")
+    return Path(directory) / f"{stem}{COMPRESSION_SUFFIXES[compression]}"
+
+
+class SessionLog:
+    """
+    Append-only JSONL event log written incrementally while a run progresses.
+
+    fsync policies:
+        always - fsync after every event
+        step   - flush every event, fsync after step and end events (default)
+        close  - flush every event, fsync once on close
+        never  - flush every event, leave syncing to the OS
+    """
+
+    def __init__(self, path, fsync: str = "step", compression: Optional[str] = None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'. Valid: {', '.join(FSYNC_POLICIES)}")
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.compression = compression
+        self._lock = threading.Lock()
+
+        self._raw = open(self.path, "ab")
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        elif compression == "zstd":
+            self._stream = _zstd().ZstdCompressor().stream_writer(self._raw, closefd=False)
+        elif compression is None:
+            self._stream = self._raw
+        else:
+            raise ValueError(f"Unknown compression '{compression}'. Valid: gzip, zstd or None")
+
+    def append(self, event_type: str, **payload) -> None:
+        """Appending one event as a JSON line"""
+        event = {"type": event_type, "ts": datetime.utcnow().isoformat(), **payload}
+        line = (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+        with self._lock:
+            if self._stream is None:
+                logger.warning(f"Dropping '{event_type}' event: log already closed")
+                return
+            self._stream.write(line)
+            self._flush(sync=self.fsync == "always" or (self.fsync == "step" and event_type in ("step", "end")))
+
+    def _flush(self, sync: bool):
+        if self.compression == "zstd":
+            # Ending the frame so a crash never leaves a partial frame behind
+            self._stream.flush(_zstd().FLUSH_FRAME)
+        elif self._stream is not self._raw:
+            self._stream.flush()
+        self._raw.flush()
+        if sync:
+            os.fsync(self._raw.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._stream is None:
+                return
+            if self._stream is not self._raw:
+                self._stream.close()
+            self._raw.flush()
+            if self.fsync != "never":
+                os.fsync(self._raw.fileno())
+            self._raw.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionLogReader:
+    """Reading an event log lazily and rebuilding the session and report formats from it"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _open(self):
+        if self.path.suffix == ".gz":
+            return io.TextIOWrapper(gzip.open(self.path, "rb"), encoding="utf-8")
+        if self.path.suffix == ".zst":
+            raw = open(self.path, "rb")
+            reader = _zstd().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+            return io.TextIOWrapper(reader, encoding="utf-8")
+        return open(self.path, "r", encoding="utf-8")
+
+    def iter_events(self) -> Iterator[Dict[str, Any]]:
+        """Yielding events one at a time, tolerating a truncated last line after a crash"""
+        try:
+            with self._open() as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping truncated event in {self.path.name}")
+        except (EOFError, OSError) as e:
+            # Compressed stream cut off mid-block by a crash
+            logger.warning(f"Log {self.path.name} ends unexpectedly: {e}")
+
+    def iter_steps(self) -> Iterator[Dict[str, Any]]:
+        for event in self.iter_events():
+            if event["type"] == "step":
+                yield event
+
+    def _collect(self):
+        start, end, steps = {}, {}, []
+        for event in self.iter_events():
+            if event["type"] == "start":
+                start = event
+            elif event["type"] == "step":
+                steps.append(event)
+            elif event["type"] == "end":
+                end = event
+        return start, end, steps
+
+    def session(self) -> Dict[str, Any]:
+        """Rebuilding the MemoryLayer session dict"""
+        start, end, steps = self._collect()
+        session = {
+            "query": start.get("query", ""),
+            "timestamp": start.get("session", self.path.name.split(".")[0]),
+            "start_time": start.get("ts"),
+            "steps": [
+                {k: v for k, v in step.items() if k not in ("type", "ts")} | {"timestamp": step["ts"]}
+                for step in steps
+            ],
+        }
+        if end:
+            session["end_time"] = end["ts"]
+            session["total_steps"] = len(steps)
+        return session
+
+    def result(self) -> Dict[str, Any]:
+        """Rebuilding the agent.run result dict"""
+        _, end, steps = self._collect()
+        return self._build_result(end, steps)
+
+    @staticmethod
+    def _build_result(end, steps) -> Dict[str, Any]:
+        result = {k: v for k, v in end.items() if k not in ("type", "ts")}
+        result.setdefault("answer", "")
+        result.setdefault("iterations", len(steps))
+        result.setdefault("success", False)
+        result["steps"] = [
+            {k: v for k, v in step.items() if k not in ("type", "ts", "step", "verification")}
+            for step in steps
+        ]
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        """Rebuilding the query report written to output/ (formerly main.save_output_to_json)"""
+        # Reading (and decompressing) the log once for both the metadata and the steps
+        start, end, steps = self._collect()
+        result = self._build_result(end, steps)
+        steps = result["steps"]
+
+        reasoning_steps, thoughts, actions, observations, conclusions = [], [], [], [], []
+        for i, step in enumerate(steps, 1):
+            reasoning_steps.append({
+                "step_number": i,
+                "thought": step.get("thought", ""),
+                "action": step.get("action", "none"),
+                "action_input": step.get("action_input", ""),
+                "observation": step.get("observation", ""),
+                "final_answer": step.get("final_answer", "")
+            })
+            if step.get("thought"):
+                thoughts.append({"step": i, "content": step["thought"]})
+            if step.get("action") and step.get("action") != "none":
+                actions.append({"step": i, "action": step["action"], "input": step.get("action_input", "")})
+            if step.get("observation"):
+                observations.append({"step": i, "content": step["observation"]})
+            if step.get("final_answer"):
+                conclusions.append({"step": i, "content": step["final_answer"]})
+
+        return {
+            "metadata": {
+                "query": start.get("query", ""),
+                "mode": start.get("mode", "base"),
+                "flags": start.get("flags", {}),
+                "timestamp": start.get("ts"),
+                "iterations": result.get("iterations", 0),
+                "success": result.get("success", False)
+            },
+            "execution": {
+                "reasoning_steps": reasoning_steps,
+                "thoughts": thoughts,
+                "actions": actions,
+                "observations": observations,
+                "conclusions": conclusions
+            },
+            "verification": result.get("verification"),
+            "answer": result.get("answer", ""),
+            "raw_result": result
+        }
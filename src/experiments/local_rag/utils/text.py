@@ -0,0 +1,43 @@
+import re
+from typing import List
+
+# Rough chars-per-token ratio for English text with BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9\[\(])')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimating token count without loading a tokenizer"""
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def normalize_text(text: str) -> str:
+    """Collapsing whitespace so layout differences don't matter"""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def split_sentences(text: str, min_chars: int = 20) -> List[str]:
+    """Splitting text into sentences, merging fragments shorter than min_chars"""
+    text = normalize_text(text)
+    if not text:
+        return []
+
+    sentences = []
+    buffer = ""
+    for piece in _SENTENCE_SPLIT.split(text):
+        buffer = f"{buffer} {piece}".strip() if buffer else piece
+        if len(buffer) >= min_chars:
+            sentences.append(buffer)
+            buffer = ""
+
+    if buffer:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {buffer}"
+        else:
+            sentences.append(buffer)
+
+    return sentences
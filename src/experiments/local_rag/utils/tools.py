@@ -1,11 +1,118 @@
+import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from chromadb.utils import embedding_functions
 import chromadb
+import logging
+
+from utils.hierarchy import group_by_parent
+from utils.web_index import format_web_chunks
+
+logger = logging.getLogger(__name__)
+
+# Filters the agent may pass to vectorstore_search in a JSON action_input
+SEARCH_FILTER_KEYS = ("source", "title", "year", "year_min", "year_max", "section", "page", "contains")
+MAX_SEARCH_RESULTS = 10
+NO_DOCUMENTS = "No relevant documents found."
+# Session web chunks appended to a vectorstore_search observation
+WEB_CHUNKS_IN_SEARCH = 2
+
+
+def parse_search_input(action_input) -> Tuple[str, Dict[str, Any], Optional[int]]:
+    """
+    Splitting a vectorstore_search input into (query text, filters, n_results)
+
+    Accepts a plain string, a dict, or a JSON object string such as
+    {"query": "reward shaping", "source": "ARE.pdf", "year_min": 2023}.
+    """
+    data = action_input
+    if isinstance(data, str) and data.strip().startswith("{"):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            pass
+    if not isinstance(data, dict):
+        return Tool.normalize_input(data), {}, None
+
+    query = data.get("query", "")
+    query = " ".join(map(str, query)) if isinstance(query, list) else str(query or "")
+    filters = {k: data[k] for k in SEARCH_FILTER_KEYS if data.get(k) not in (None, "", [])}
+
+    n_results = data.get("n_results") or data.get("k")
+    try:
+        n_results = min(MAX_SEARCH_RESULTS, max(1, int(n_results))) if n_results else None
+    except (TypeError, ValueError):
+        n_results = None
+    return query.strip(), filters, n_results
+
+
+def build_where(filters: Dict[str, Any], catalogue: Dict[str, Any] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Translating search filters into Chroma where / where_document clauses
+
+    Title and section filters are matched case-insensitively against the catalogue of
+    stored values and pushed down as exact $in conditions.
+
+    Raises:
+        ValueError: when a title/section filter matches nothing in the catalogue
+    """
+    catalogue = catalogue or {}
+    conditions = []
+
+    if "source" in filters:
+        sources = filters["source"] if isinstance(filters["source"], list) else [filters["source"]]
+        known = {s.lower(): s for s in catalogue.get("sources", [])}
+        resolved = []
+        for source in map(str, sources):
+            name = source if source.lower().endswith(".pdf") else f"{source}.pdf"
+            resolved.append(known.get(name.lower(), name))
+        conditions.append({"source": resolved[0]} if len(resolved) == 1 else {"source": {"$in": resolved}})
+
+    if "title" in filters and catalogue.get("titles") is not None:
+        if not catalogue["titles"]:
+            # Collections ingested before titles were stored have none to match
+            raise ValueError("no paper titles are stored in this collection (re-ingest to enable title filters)")
+        needle = str(filters["title"]).lower()
+        sources = sorted({src for title, srcs in catalogue["titles"].items() if needle in title.lower() for src in srcs})
+        if not sources:
+            raise ValueError(f"No paper title matches '{filters['title']}'")
+        conditions.append({"source": {"$in": sources}})
+
+    if "section" in filters and catalogue.get("sections") is not None:
+        needle = str(filters["section"]).lower()
+        sections = sorted(s for s in catalogue["sections"] if needle in s.lower())
+        if not sections:
+            raise ValueError(f"No section matches '{filters['section']}'")
+        conditions.append({"section": {"$in": sections}})
+
+    for key, field, op in (("year", "year", "$eq"), ("year_min", "year", "$gte"),
+                           ("year_max", "year", "$lte"), ("page", "page", "$eq")):
+        if key in filters:
+            try:
+                conditions.append({field: {op: int(filters[key])}})
+            except (TypeError, ValueError):
+                raise ValueError(f"'{key}' must be a number, got {filters[key]!r}")
+
+    where = None
+    if len(conditions) == 1:
+        where = conditions[0]
+    elif conditions:
+        where = {"$and": conditions}
+
+    where_document = {"$contains": str(filters["contains"])} if filters.get("contains") else None
+    return where, where_document
 
 
 class Tool:
     """Base class for agent tools"""
+    
+    # Tools that take a deadline=Deadline keyword and shrink their work to fit it
+    accepts_deadline = False
+    # Tools the agent may skip when the query deadline is near
+    optional = False
+    # Tools that take the run's web_index=WebSessionIndex keyword
+    uses_web_index = False
+    
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -14,6 +121,12 @@ class Tool:
         """
         Main execute method that normalizes input before calling _execute
         """
+        # Calling subclass implementation
+        return self._execute(self.normalize_input(query), **kwargs)
+    
+    @staticmethod
+    def normalize_input(query) -> str:
+        """Normalizing query input to handle lists, dicts, None"""
         # 🔧 Normalizing query input to handle lists, dicts, None
         if isinstance(query, list):
             query = " ".join(map(str, query))
@@ -31,9 +144,7 @@ class Tool:
             query = ""
         else:
             query = str(query)
-        
-        # Calling subclass implementation
-        return self._execute(query, **kwargs)
+        return query
     
     def _execute(self, query: str, **kwargs) -> str:
         """Override this in subclasses"""
@@ -42,23 +153,68 @@ class Tool:
 
 class WebSearchTool(Tool):
     """Tool for performing web searches using Tavily"""
-    def __init__(self, tavily_client):
+    
+    accepts_deadline = True
+    optional = True
+    uses_web_index = True
+    
+    def __init__(self, tavily_client, scheduler=None, web_cache=None):
         super().__init__(
             name="web_search",
             description="Search the internet for current information. Use this when you need information not in the knowledge base or need recent/current data. Input should be a search query string."
         )
         self.client = tavily_client
+        # Shared RequestScheduler enforcing Tavily rate limits
+        self.scheduler = scheduler
+        # WebResultCache of web chunks behind earlier verified answers (checked before Tavily)
+        self.web_cache = web_cache
     
-    def _execute(self, query: str, n_results: int = 3) -> str:
+    def _execute(self, query: str, n_results: int = 3, deadline=None, web_index=None) -> str:
         """
         Execute web search with normalized string query
+        
+        With the run's WebSessionIndex, queries it already covers are answered from it
+        without a request, and fetched results are returned as the chunks most relevant
+        to the query rather than every snippet.
         """
         try:
-            response = self.client.search(query=query, max_results=n_results)
+            if web_index is not None:
+                hits = web_index.lookup(query)
+                if hits:
+                    logger.info(f"🌐 Web search served from this session's index ({len(hits)} chunks)")
+                    return "(From web results fetched earlier in this session)\n" + format_web_chunks(hits)
+            
+            if self.web_cache:
+                hits = self.web_cache.lookup(query)
+                if hits:
+                    logger.info(f"🌐 Web search served from the local web cache ({len(hits)} chunks)")
+                    if web_index is not None:
+                        web_index.add(query, hits)
+                    return "(From the local web cache)\n" + format_web_chunks(hits)
+            
+            params = {"query": query, "max_results": n_results}
+            if deadline and deadline.enabled:
+                # Tavily's request timeout is capped by what is left of the query budget
+                params["timeout"] = deadline.timeout(None, "web search")
+            if self.scheduler:
+                response = self.scheduler.submit(
+                    "tavily",
+                    lambda: self.client.search(**params),
+                    priority="search",
+                    timeout=deadline.remaining() if deadline else None
+                )
+            else:
+                response = self.client.search(**params)
             
             if not response or not response.get('results'):
                 return "No relevant web results found."
             
+            if web_index is not None:
+                web_index.add(query, response['results'])
+                hits = web_index.search(query)
+                if hits:
+                    return format_web_chunks(hits)
+            
             context = "\n\n".join([
                 f"[Source: {res.get('url', 'Unknown')}]\n{res.get('content', res.get('snippet', ''))}"
                 for res in response['results']
@@ -71,48 +227,113 @@ class WebSearchTool(Tool):
 
 class RAGTool(Tool):
     """Tool for searching the knowledge base"""
-    def __init__(self, collection, retriever=None):
+    
+    # The agent may pass a JSON object with filters instead of a plain string
+    structured_input = True
+    accepts_deadline = True
+    uses_web_index = True
+    
+    def __init__(self, collection, retriever=None, compressor=None):
         super().__init__(
             name="vectorstore_search",
-            description="Retrieve relevant info from a vectorstore that contains AI research papers. Input should be a search query string."
+            description=(
+                "Retrieve relevant info from a vectorstore that contains AI research papers. "
+                "Input should be a search query string, or a JSON object to narrow the search: "
+                '{"query": "...", "source": "paper file name", "title": "part of the paper title", '
+                '"year": 2023, "year_min": 2022, "year_max": 2024, "section": "e.g. Method", '
+                '"page": 3, "contains": "exact phrase"} (all keys except query are optional).'
+            )
         )
         self.retriever = retriever
         self.collection = collection
+        self.compressor = compressor
+    
+    def execute(self, query=None, **kwargs) -> str:
+        """Splitting structured input into query text and filters"""
+        text, filters, n_results = parse_search_input(query)
+        if n_results:
+            kwargs["n_results"] = n_results
+        return self._execute(text, filters=filters, **kwargs)
     
-    def _execute(self, query: str, n_results: int = 3) -> str:
+    def _execute(self, query: str, n_results: int = 3, filters: Dict[str, Any] = None, deadline=None,
+                 web_index=None) -> str:
         """
-        Execute vectorstore search with normalized string query
+        Execute vectorstore search with normalized string query and optional filters
         """
         try:
-            if self.retriever:
-                results = self.retriever.retrieve_formatted(query=query, n_results=n_results)
-            else:
-                # Fallback to direct collection query
-                raw_results = self.collection.query(
-                    query_texts=[query],
-                    n_results=n_results
-                )
-                
-                if not raw_results["documents"][0]:
-                    return "No relevant documents found."
-                
-                # Formatting results
-                formatted = []
-                for i, (doc, metadata) in enumerate(zip(
-                    raw_results["documents"][0], 
-                    raw_results["metadatas"][0]
-                )):
-                    source = metadata.get("source", "unknown")
-                    formatted.append(f"[{i+1}] From {source}:\n{doc[:500]}...")
-                
-                results = "\n\n".join(formatted)
+            note = ""
+            where, where_document = None, None
+            if filters:
+                try:
+                    catalogue = self.retriever.catalogue() if self.retriever else None
+                    where, where_document = build_where(filters, catalogue)
+                except ValueError as e:
+                    note = f"(Filter ignored: {e}. Showing unfiltered results.)\n"
+                    logger.info(f"🔎 {note.strip()}")
+            
+            results = self._search(query, n_results, where, where_document, deadline)
+            
+            # Falling back to the whole corpus when the filters excluded everything
+            if results == NO_DOCUMENTS and (where or where_document):
+                if deadline and not deadline.allows_optional():
+                    return f"(No documents matched filters {json.dumps(filters)}; no time left for an unfiltered search.)\n{results}"
+                note = f"(No documents matched filters {json.dumps(filters)}. Showing unfiltered results.)\n"
+                results = self._search(query, n_results, None, None, deadline)
+            elif where or where_document:
+                logger.info(f"🔎 Filtered search: where={where} where_document={where_document}")
             
-            return results
+            # Adding web chunks fetched earlier in this run that match the query (unfiltered searches only)
+            if web_index is not None and not filters:
+                hits = web_index.search(query, k=WEB_CHUNKS_IN_SEARCH)
+                if hits:
+                    results += "\n\nWeb results fetched earlier in this session:\n" + format_web_chunks(hits)
+            
+            return note + results
             
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             return f"Error searching papers: {str(e)}\nDetails: {error_details}"
+    
+    def _search(self, query, n_results, where=None, where_document=None, deadline=None) -> str:
+        if self.retriever:
+            return self.retriever.retrieve_formatted(
+                query=query,
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+                deadline=deadline
+            )
+        
+        # Fallback to direct collection query
+        raw_results = self.collection.query(
+            query_texts=[query],
+            n_results=n_results,
+            where=where,
+            where_document=where_document
+        )
+        
+        if not raw_results["documents"][0]:
+            return NO_DOCUMENTS
+        
+        documents = [
+            {"content": doc, "metadata": metadata}
+            for doc, metadata in zip(raw_results["documents"][0], raw_results["metadatas"][0])
+        ]
+        
+        # Compressing against the query instead of truncating blindly (unless time is short)
+        compress = self.compressor and (deadline is None or deadline.allows_optional())
+        if compress:
+            documents = self.compressor.compress(query, documents)
+        
+        # Formatting results
+        formatted = []
+        for i, doc in enumerate(documents):
+            source = doc["metadata"].get("source", "unknown")
+            content = doc["content"] if compress else f"{doc['content'][:500]}..."
+            formatted.append(f"[{i+1}] From {source}:\n{content}")
+        
+        return "\n\n".join(formatted)
         
 
 class VectorStoreRetriever:
@@ -122,21 +343,93 @@ class VectorStoreRetriever:
         self, 
         collection_name: str = "research_papers_v2",
         chroma_db_path: str = None,
-        embedding_model: str = "all-MiniLM-L6-v2"
+        embedding_model: str = "all-MiniLM-L6-v2",
+        compressor=None,
+        version_watcher=None,
+        parent_store=None,
+        child_candidates: int = 4,
+        parent_return: str = "window",
+        parent_window_chars: int = 150,
+        parent_window_children: int = 2,
+        embed_fn=None,
+        client=None
     ):
         
         if chroma_db_path is None:
             chroma_db_path = Path(__file__).parent / "chroma_db"
         
-        self.embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
+        # Reusing the caller's embedding model and Chroma client when given
+        # (loading the model and opening the database again doubles cold start)
+        self.embed_fn = embed_fn or embedding_functions.SentenceTransformerEmbeddingFunction(
             model_name=embedding_model
         )
         
-        self.client = chromadb.PersistentClient(path=str(chroma_db_path))
+        self.collection_name = collection_name
+        self.client = client or chromadb.PersistentClient(path=str(chroma_db_path))
         self.collection = self.client.get_collection(
             name=collection_name,
             embedding_function=self.embed_fn
         )
+        
+        # Optional ObservationCompressor applied in retrieve_formatted
+        self.compressor = compressor
+        
+        # Optional VersionWatcher; callbacks get the changed sources (None = unknown, drop everything)
+        self.version_watcher = version_watcher
+        self.on_version_change = []
+        
+        # Distinct metadata values used to resolve title/section filters (rebuilt after ingests)
+        self._catalogue = None
+        
+        # Optional ParentStore: search small child chunks, return their parent sections
+        self.parent_store = parent_store
+        self.child_candidates = child_candidates
+        self.parent_return = parent_return
+        self.parent_window_chars = parent_window_chars
+        self.parent_window_children = parent_window_children
+    
+    def catalogue(self) -> Dict[str, Any]:
+        """Getting distinct sources, titles and sections stored in the collection"""
+        self.refresh_if_stale()
+        if self._catalogue is None:
+            sources, titles, sections = set(), {}, set()
+            page_size, offset = 5000, 0
+            while True:
+                page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+                for metadata in page["metadatas"]:
+                    metadata = metadata or {}
+                    source = metadata.get("source")
+                    if source:
+                        sources.add(source)
+                    if metadata.get("title"):
+                        titles.setdefault(metadata["title"], set()).add(source)
+                    if metadata.get("section"):
+                        sections.add(metadata["section"])
+                if len(page["ids"]) < page_size:
+                    break
+                offset += page_size
+            self._catalogue = {"sources": sources, "titles": titles, "sections": sections}
+        return self._catalogue
+    
+    def refresh_if_stale(self):
+        """Re-opening the collection and notifying caches after the ingest worker published a new version"""
+        if not self.version_watcher:
+            return
+        change = self.version_watcher.poll()
+        if change is None:
+            return
+        version, changed_sources = change
+        try:
+            self.collection = self.client.get_collection(
+                name=self.collection_name,
+                embedding_function=self.embed_fn
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not re-open collection after version {version}: {e}")
+        self._catalogue = None
+        logger.info(f"🔄 Collection moved to version {version} ({', '.join(changed_sources or []) or 'full refresh'})")
+        for callback in self.on_version_change:
+            callback(changed_sources)
     
     def retrieve(
         self, 
@@ -146,6 +439,7 @@ class VectorStoreRetriever:
         where_document: Optional[Dict] = None
     ) -> List[Dict[str, Any]]:
 
+        self.refresh_if_stale()
         results = self.collection.query(
             query_texts=[query],
             n_results=n_results,
@@ -165,6 +459,27 @@ class VectorStoreRetriever:
         
         return documents
     
+    def retrieve_parents(
+        self,
+        query: str,
+        n_results: int = 3,
+        where: Optional[Dict] = None,
+        where_document: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Searching child chunks and returning up to n_results distinct parents
+        (trimmed to windows around the matched children unless parent_return="parent")
+        """
+        children = self.retrieve(
+            query,
+            n_results=n_results * max(1, self.child_candidates),
+            where=where,
+            where_document=where_document
+        )
+        return group_by_parent(children, self.parent_store, n_results,
+                               mode=self.parent_return, window_chars=self.parent_window_chars,
+                               max_children=self.parent_window_children)
+    
     def retrieve_with_scores(
         self, 
         query: str, 
@@ -172,6 +487,7 @@ class VectorStoreRetriever:
         score_threshold: float = None
     ) -> List[tuple[Dict[str, Any], float]]:
 
+        self.refresh_if_stale()
         results = self.collection.query(
             query_texts=[query],
             n_results=n_results
@@ -217,7 +533,11 @@ class VectorStoreRetriever:
         self, 
         query: str, 
         n_results: int = 3,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        compress: bool = True,
+        where: Optional[Dict] = None,
+        where_document: Optional[Dict] = None,
+        deadline=None
     ) -> str:
         """
         Retrieve and format documents as a string
@@ -226,22 +546,44 @@ class VectorStoreRetriever:
             query: Search query
             n_results: Number of results
             include_metadata: Whether to include source info
+            compress: Whether to apply the compressor (if one is configured)
+            where: Optional Chroma metadata filter
+            where_document: Optional Chroma document filter (e.g. {"$contains": "..."})
+            deadline: Optional query Deadline; near it, compression is replaced by truncation
             
         Returns:
             Formatted string with all retrieved documents
         """
-        documents = self.retrieve(query, n_results)
+        if self.parent_store:
+            documents = self.retrieve_parents(query, n_results, where=where, where_document=where_document)
+        else:
+            documents = self.retrieve(query, n_results, where=where, where_document=where_document)
         
         if not documents:
-            return "No relevant documents found."
+            return NO_DOCUMENTS
+        
+        truncate = False
+        if compress and self.compressor:
+            if deadline is None or deadline.allows_optional():
+                documents = self.compressor.compress(query, documents)
+            else:
+                logger.info("⏳ Skipping compression, query deadline is near")
+                truncate = True
         
         formatted_docs = []
         for i, doc in enumerate(documents, 1):
             if include_metadata:
-                header = f"[Document {i} - Source: {doc['metadata'].get('source', 'Unknown')}]"
+                metadata = doc['metadata']
+                details = [f"Source: {metadata.get('source', 'Unknown')}"]
+                if metadata.get("page"):
+                    details.append(f"p. {metadata['page']}")
+                if metadata.get("section"):
+                    details.append(f"Section: {metadata['section']}")
+                header = f"[Document {i} - {', '.join(details)}]"
             else:
                 header = f"[Document {i}]"
             
-            formatted_docs.append(f"{header}\n{doc['content']}")
+            content = f"{doc['content'][:500]}..." if truncate else doc['content']
+            formatted_docs.append(f"{header}\n{content}")
         
         return "\n\n" + "="*80 + "\n\n".join(formatted_docs)
\ No newline at end of file
@@ -0,0 +1,181 @@
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+
+class WebResultCache:
+    """
+    Local corpus of web chunks that backed verified answers, in its own Chroma collection.
+
+    Chunks are written back after a run whose answer passed verification, keyed by a hash
+    of their text (near-duplicates of stored chunks are skipped) and stamped with source
+    URL, fetch time and expiry. web_search looks here before going to the network, and
+    compact() deletes expired entries so recent-topic answers don't go stale.
+    """
+
+    def __init__(self, collection, ttl_days: float = 14, reuse_score: float = 0.6, min_score: float = 0.35,
+                 top_k: int = 4, duplicate_score: float = 0.95, embed_fn=None, embedding_cache=None):
+        self.collection = collection
+        self.ttl_seconds = ttl_days * DAY_SECONDS
+        # Best-chunk similarity at which a web query is answered locally
+        self.reuse_score = reuse_score
+        self.min_score = min_score
+        self.top_k = top_k
+        # Similarity to a stored chunk above which a new chunk counts as a near-duplicate
+        self.duplicate_score = duplicate_score
+        self.embed_fn = embed_fn
+        self.embedding_cache = embedding_cache
+
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "written": 0, "refreshed": 0, "duplicates": 0, "expired": 0}
+
+    @classmethod
+    def from_config(cls, config, client, embed_fn, embedding_cache=None):
+        """Opening the web_cache collection from DEFAULT_CONFIG-style settings (None when disabled)"""
+        if not config.get("web_cache_enabled", False):
+            return None
+        collection = client.get_or_create_collection(
+            name=config.get("web_cache_collection", "web_cache"),
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=embed_fn
+        )
+        return cls(
+            collection,
+            ttl_days=config.get("web_cache_ttl_days", 14),
+            reuse_score=config.get("web_cache_reuse_score", 0.6),
+            min_score=config.get("web_cache_min_score", 0.35),
+            top_k=config.get("web_index_top_k", 4),
+            embed_fn=embed_fn,
+            embedding_cache=embedding_cache,
+        )
+
+    @staticmethod
+    def chunk_id(content: str) -> str:
+        return "web_" + hashlib.sha1(normalize_text(content).lower().encode("utf-8")).hexdigest()
+
+    def _bump(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def write_back(self, chunks: List[Dict]) -> int:
+        """
+        Storing web chunks ({content, url, title, query}) that contributed to a verified answer
+
+        Chunks already stored get a new fetch time and expiry; near-duplicates of other
+        stored chunks are skipped.
+
+        Returns:
+            Number of chunks added
+        """
+        unique = {}
+        for chunk in chunks:
+            unique.setdefault(self.chunk_id(chunk["content"]), chunk)
+        if not unique:
+            return 0
+
+        ids = list(unique)
+        texts = [unique[i]["content"] for i in ids]
+        embeddings = self.embedding_cache.embed(texts, self.embed_fn) if self.embedding_cache else None
+        existing = set(self.collection.get(ids=ids, include=[])["ids"])
+
+        # Skipping new chunks that nearly repeat a stored one (same passage from another URL)
+        keep = [i for i in ids if i in existing]
+        new = [i for i in ids if i not in existing]
+        if new and self.collection.count():
+            positions = [ids.index(i) for i in new]
+            query = ({"query_embeddings": [embeddings[p] for p in positions]} if embeddings
+                     else {"query_texts": [texts[p] for p in positions]})
+            nearest = self.collection.query(n_results=1, include=["distances"], **query)
+            for chunk_id, distances in zip(new, nearest["distances"]):
+                if distances and 1 - distances[0] >= self.duplicate_score:
+                    self._bump("duplicates")
+                else:
+                    keep.append(chunk_id)
+        else:
+            keep.extend(new)
+        if not keep:
+            return 0
+
+        now = time.time()
+        metadatas = [{
+            "source": unique[i].get("url") or "Unknown",
+            "url": unique[i].get("url") or "Unknown",
+            "title": unique[i].get("title") or "",
+            "query": unique[i].get("query") or "",
+            "fetched_at": now,
+            "expires_at": now + self.ttl_seconds,
+            "kind": "web",
+        } for i in keep]
+        upsert = {"ids": keep, "documents": [unique[i]["content"] for i in keep], "metadatas": metadatas}
+        if embeddings:
+            upsert["embeddings"] = [embeddings[ids.index(i)] for i in keep]
+        self.collection.upsert(**upsert)
+
+        added = len([i for i in keep if i not in existing])
+        self._bump("written", added)
+        self._bump("refreshed", len(keep) - added)
+        logger.info(f"🌐 Web cache: {added} chunks written back, {len(keep) - added} refreshed")
+        return added
+
+    def lookup(self, query: str, k: Optional[int] = None) -> Optional[List[Dict]]:
+        """Unexpired chunks answering a web query locally, or None when the cache doesn't cover it"""
+        self._bump("lookups")
+        if not self.collection.count():
+            return None
+        try:
+            results = self.collection.query(
+                query_texts=[query],
+                n_results=k or self.top_k,
+                where={"expires_at": {"$gt": time.time()}},
+                include=["documents", "metadatas", "distances"]
+            )
+        except Exception as e:
+            # Chroma raises when the filter leaves fewer entries than n_results on some versions
+            logger.warning(f"Web cache lookup failed: {e}")
+            return None
+
+        hits = []
+        for content, metadata, distance in zip(results["documents"][0], results["metadatas"][0],
+                                               results["distances"][0]):
+            score = 1 - distance
+            if score >= self.min_score:
+                hits.append({
+                    "content": content,
+                    "url": metadata.get("url", "Unknown"),
+                    "title": metadata.get("title", ""),
+                    "fetched_at": metadata.get("fetched_at"),
+                    "score": round(score, 3),
+                    "from_cache": True,
+                })
+        if hits and hits[0]["score"] >= self.reuse_score:
+            self._bump("hits")
+            return hits
+        return None
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Deleting expired entries; returns how many were removed"""
+        where = {"expires_at": {"$lte": now or time.time()}}
+        expired = self.collection.get(where=where, include=[])["ids"]
+        if expired:
+            self.collection.delete(ids=expired)
+            self._bump("expired", len(expired))
+            logger.info(f"🧹 Web cache: expired {len(expired)} entries")
+        return len(expired)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["entries"] = self.count()
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        return stats
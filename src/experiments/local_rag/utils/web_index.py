@@ -0,0 +1,148 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.embeddings import embed_texts, cosine_scores, top_k_indices
+from utils.text import normalize_text, split_sentences
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_web_text(text: str, chunk_chars: int = 600) -> List[str]:
+    """Packing whole sentences of a fetched page/snippet into chunks of about chunk_chars"""
+    chunks, current = [], ""
+    for sentence in split_sentences(text):
+        if current and len(current) + len(sentence) + 1 > chunk_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def format_web_chunks(chunks: List[Dict]) -> str:
+    """Formatting ranked web chunks like WebSearchTool output"""
+    return "\n\n".join(f"[Source: {chunk['url']}]\n{chunk['content']}" for chunk in chunks)
+
+
+class WebSessionIndex:
+    """
+    In-memory vector index over the web results fetched during one agent run.
+
+    Tavily results are chunked and embedded as they arrive; later web_search calls
+    that the index already covers are answered from it without a network request, and
+    every web/vectorstore search gets only the web chunks relevant to its own query
+    instead of whole result lists. It lives in the RunContext and is dropped with it.
+    """
+
+    def __init__(self, embed_fn, chunk_chars: int = 600, top_k: int = 4, min_score: float = 0.35,
+                 reuse_score: float = 0.6, max_chunks: int = 500):
+        self.embed_fn = embed_fn
+        self.chunk_chars = chunk_chars
+        self.top_k = top_k
+        self.min_score = min_score
+        # Best-chunk similarity at which a new web query counts as already answered
+        self.reuse_score = reuse_score
+        self.max_chunks = max_chunks
+
+        self.chunks = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._hashes = set()
+        # Chunks returned to the agent at least once (candidates for web-cache write-back)
+        self._served = set()
+        self.stats = {"fetches": 0, "searches": 0, "reused": 0, "chunks_served": 0, "chars_fetched": 0}
+
+    @classmethod
+    def from_config(cls, config, embed_fn):
+        """Building a session index from DEFAULT_CONFIG-style settings"""
+        return cls(
+            embed_fn,
+            chunk_chars=config.get("web_index_chunk_chars", 600),
+            top_k=config.get("web_index_top_k", 4),
+            min_score=config.get("web_index_min_score", 0.35),
+            reuse_score=config.get("web_index_reuse_score", 0.6),
+            max_chunks=config.get("web_index_max_chunks", 500),
+        )
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def add(self, query: str, results: List[Dict]) -> int:
+        """
+        Chunking and embedding Tavily results
+
+        Returns:
+            Number of new chunks (chunks already in the index are skipped)
+        """
+        self.stats["fetches"] += 1
+        new_chunks = []
+        for result in results:
+            text = result.get("raw_content") or result.get("content") or result.get("snippet") or ""
+            self.stats["chars_fetched"] += len(text)
+            for content in chunk_web_text(text, self.chunk_chars):
+                digest = hashlib.sha1(normalize_text(content).lower().encode("utf-8")).hexdigest()
+                if digest in self._hashes:
+                    continue
+                self._hashes.add(digest)
+                new_chunks.append({
+                    "content": content,
+                    "url": result.get("url", "Unknown"),
+                    "title": result.get("title", ""),
+                    "query": query,
+                    # Chunks served from the local web cache are never written back again
+                    "from_cache": bool(result.get("from_cache")),
+                })
+
+        room = self.max_chunks - len(self.chunks)
+        if room <= 0 or not new_chunks:
+            return 0
+        new_chunks = new_chunks[:room]
+        vectors = embed_texts(self.embed_fn, [c["content"] for c in new_chunks])
+        self._vectors = vectors if not self.chunks else np.vstack([self._vectors, vectors])
+        self.chunks.extend(new_chunks)
+        logger.info(f"🌐 Web index: +{len(new_chunks)} chunks ({len(self.chunks)} this session)")
+        return len(new_chunks)
+
+    def _rank(self, query, k, min_score):
+        self.stats["searches"] += 1
+        min_score = self.min_score if min_score is None else min_score
+        scores = cosine_scores(embed_texts(self.embed_fn, [query])[0], self._vectors)
+        return [(i, float(scores[i])) for i in top_k_indices(scores, k or self.top_k) if scores[i] >= min_score]
+
+    def _serve(self, ranked):
+        self._served.update(i for i, _ in ranked)
+        self.stats["chunks_served"] += len(ranked)
+        return [{**self.chunks[i], "score": round(score, 3)} for i, score in ranked]
+
+    def search(self, query: str, k: Optional[int] = None, min_score: Optional[float] = None) -> List[Dict]:
+        """Most relevant web chunks for a query (best first, each with its score)"""
+        if not self.chunks:
+            return []
+        return self._serve(self._rank(query, k, min_score))
+
+    def lookup(self, query: str, k: Optional[int] = None) -> Optional[List[Dict]]:
+        """Chunks answering a web query without a request, or None when the index doesn't cover it"""
+        if not self.chunks:
+            return None
+        ranked = self._rank(query, k, None)
+        if ranked and ranked[0][1] >= self.reuse_score:
+            self.stats["reused"] += 1
+            return self._serve(ranked)
+        return None
+
+    def contributing(self, answer: str, min_score: float = 0.5) -> List[Dict]:
+        """Fetched (not cache-served) chunks shown to the agent that some answer sentence draws on"""
+        served = sorted(i for i in self._served if not self.chunks[i]["from_cache"])
+        sentences = split_sentences(answer) or [answer]
+        if not served or not answer:
+            return []
+        support = embed_texts(self.embed_fn, sentences) @ self._vectors[served].T
+        best = support.max(axis=0)
+        return [self.chunks[i] for i, score in zip(served, best) if score >= min_score]
+
+    def get_stats(self):
+        return {**self.stats, "chunks": len(self.chunks)}